@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import functools
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Any
+
+import lovelysunday_capture as capture
+
+
+class CountingHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+        self._count_lock = threading.Lock()
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        # One call per accepted TCP connection, i.e. one handshake.
+        with self._count_lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+def asset_handler(asset_bytes: int, handshake_ms: float = 0.0) -> type[http.server.BaseHTTPRequestHandler]:
+    body = bytes(range(256)) * (asset_bytes // 256) + b"\0" * (asset_bytes % 256)
+
+    class AssetHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this, keep-alive responses stall on
+        # Nagle + delayed ACK, which a real CDN does not do.
+        disable_nagle_algorithm = True
+
+        def setup(self) -> None:
+            # Stand-in for the TCP+TLS round trips a new connection costs against a real CDN.
+            if handshake_ms:
+                time.sleep(handshake_ms / 1000)
+            super().setup()
+
+        def do_GET(self) -> None:  # noqa: N802
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            return None
+
+    return AssetHandler
+
+
+def start_server(handler: type[http.server.BaseHTTPRequestHandler]) -> CountingHTTPServer:
+    server = CountingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def urllib_download(url: str, download_root: pathlib.Path, output_root: pathlib.Path) -> dict[str, Any]:
+    # The pre-pool download path: a fresh urllib request (and connection) per asset.
+    req = urllib.request.Request(url, headers={"User-Agent": capture.USER_AGENT})
+    with urllib.request.urlopen(req, timeout=45) as resp:  # noqa: S310
+        body = resp.read()
+        content_type = resp.headers.get("Content-Type", "")
+    target = capture.asset_target_path(download_root, url, content_type)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(body)
+    return {"url": url, "status": "success", "sha256": hashlib.sha256(body).hexdigest()}
+
+
+def bench_http(args: argparse.Namespace) -> list[dict[str, Any]]:
+    rows = []
+    for workers in args.asset_workers:
+        for mode in ["urllib", "pooled"]:
+            server = start_server(asset_handler(args.asset_bytes, args.handshake_ms))
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            urls = [f"{base}/assets/{index}.png" for index in range(args.assets)]
+            client = capture.HttpClient(max_per_host=workers)
+            with tempfile.TemporaryDirectory() as tmp:
+                root = pathlib.Path(tmp)
+                started = time.perf_counter()
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    if mode == "urllib":
+                        results = list(executor.map(lambda url: urllib_download(url, root, root), urls))
+                    else:
+                        results = list(executor.map(lambda url: capture.download_one_asset(url, root, root, client), urls))
+                elapsed = time.perf_counter() - started
+            client.close()
+            server.shutdown()
+            server.server_close()
+            failed = len([item for item in results if item.get("status") != "success"])
+            rows.append(
+                {
+                    "mode": mode,
+                    "assetWorkers": workers,
+                    "assets": len(urls),
+                    "failed": failed,
+                    "seconds": round(elapsed, 3),
+                    "assetsPerSecond": round(len(urls) / elapsed, 1),
+                    "handshakes": server.connections,
+                }
+            )
+    return rows
+
+
+class SiteHandler(http.server.SimpleHTTPRequestHandler):
+    # Static stand-in for the live site: sitemap, pages and assets straight from the generated tree.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        return None
+
+
+def synthetic_body(index: int, size: int) -> bytes:
+    seed = hashlib.sha256(str(index).encode("ascii")).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+def generate_site(root: pathlib.Path, base_url: str, args: argparse.Namespace) -> dict[str, int]:
+    # N pages and M assets; asset i and media file i belong to page i % N, and every page shares the
+    # site stylesheet and script, so the crawler deduplicates URLs the way it does on the live site.
+    pages: list[list[str]] = [[] for _ in range(args.pages)]
+    for index in range(args.assets):
+        rel = f"assets/img-{index:05d}.png"
+        # Sizes spread from half to one and a half times --asset-bytes.
+        size = args.asset_bytes // 2 + (index * 7919) % max(args.asset_bytes, 1)
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_bytes(synthetic_body(index, size))
+        pages[index % args.pages].append(f'<img src="/{rel}" alt="image {index}">')
+    for index in range(args.media):
+        rel = f"media/clip-{index:03d}.mp4"
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        # Sparse file: large media costs the crawler a full download without costing the bench a full write.
+        with open(root / rel, "wb") as handle:
+            handle.truncate(args.media_bytes)
+        pages[index % args.pages].append(f'<video src="/{rel}"></video>')
+    (root / "assets" / "site.css").parent.mkdir(parents=True, exist_ok=True)
+    (root / "assets" / "site.css").write_text("body { margin: 0; }\n", encoding="utf-8")
+    (root / "assets" / "site.js").write_text("void 0;\n", encoding="utf-8")
+
+    paths = ["/"] + [f"/pages/page-{index:05d}" for index in range(1, args.pages)]
+    for index, (path, media) in enumerate(zip(paths, pages)):
+        next_path = paths[(index + 1) % len(paths)]
+        nav = "".join(f'<li><a href="{link}">Page {number}</a></li>' for number, link in enumerate(paths)) if path == "/" else ""
+        html = (
+            f"<html><head><title>Page {index}</title>"
+            f'<link rel="canonical" href="{base_url}{path}">'
+            '<link rel="stylesheet" href="/assets/site.css"><script src="/assets/site.js"></script></head>'
+            f"<body><nav><ul>{nav}</ul></nav><main><h1>Page {index}</h1>"
+            f"<p>Synthetic page {index} of {args.pages}.</p>{''.join(media)}"
+            f'<p><a href="{next_path}">Next</a> <a href="/">Home</a></p></main></body></html>'
+        )
+        target = root / path.lstrip("/") / "index.html"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(html, encoding="utf-8")
+
+    namespace = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+    urlsets = [
+        "".join(
+            f"<url><loc>{base_url}{path}</loc><lastmod>2026-01-01</lastmod><priority>{0.5 + 0.5 * (path == '/')}</priority></url>"
+            for path in paths[shard :: args.sitemap_shards]
+        )
+        for shard in range(args.sitemap_shards)
+    ]
+    if args.sitemap_shards == 1:
+        (root / "sitemap.xml").write_text(f'<?xml version="1.0" encoding="UTF-8"?><urlset {namespace}>{urlsets[0]}</urlset>', encoding="utf-8")
+    else:
+        # A sitemap index over gzipped urlsets, as large sites publish them.
+        for shard, entries in enumerate(urlsets):
+            (root / f"sitemap-{shard}.xml.gz").write_bytes(
+                gzip.compress(f'<?xml version="1.0" encoding="UTF-8"?><urlset {namespace}>{entries}</urlset>'.encode("utf-8"))
+            )
+        children = "".join(f"<sitemap><loc>{base_url}/sitemap-{shard}.xml.gz</loc></sitemap>" for shard in range(args.sitemap_shards))
+        (root / "sitemap.xml").write_text(
+            f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {namespace}>{children}</sitemapindex>', encoding="utf-8"
+        )
+    return {"pages": len(paths), "assets": args.assets + args.media + 2}
+
+
+def fake_browser_bin(bin_dir: pathlib.Path) -> None:
+    # lovelysunday_capture.py runs `agent-browser` from PATH, so the stub goes first on it.
+    target = bin_dir / "agent-browser"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    fake = pathlib.Path(__file__).resolve().parent / "fake_agent_browser.py"
+    target.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake}" "$@"\n', encoding="utf-8")
+    target.chmod(0o755)
+
+
+def run_capture(args: argparse.Namespace, run: int) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="capture-bench-") as tmp:
+        root = pathlib.Path(tmp)
+        site = root / "site"
+        site.mkdir()
+        server = start_server(functools.partial(SiteHandler, directory=str(site)))
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        counts = generate_site(site, base_url, args)
+        fake_browser_bin(root / "bin")
+        env = dict(os.environ)
+        env.update(
+            {
+                "PATH": f"{root / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+                "FAKE_AGENT_BROWSER_ROOT": str(site),
+                "FAKE_AGENT_BROWSER_STATE": str(root / "state"),
+                "FAKE_AGENT_BROWSER_LATENCY_MS": str(args.browser_latency_ms),
+                "FAKE_AGENT_BROWSER_FAIL_RATE": str(args.browser_fail_rate),
+            }
+        )
+        output = root / "capture"
+        cmd = [
+            sys.executable,
+            str(pathlib.Path(capture.__file__).resolve()),
+            "--site",
+            f"{base_url}/",
+            "--output",
+            str(output),
+            "--workers",
+            str(args.workers),
+            "--asset-workers",
+            str(args.capture_asset_workers),
+            *args.capture_args,
+        ]
+        log_path = root / "capture.log"
+        started = time.perf_counter()
+        try:
+            with open(log_path, "wb") as log:
+                proc = subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT)  # noqa: S603
+                # wait4 rather than wait: ru_maxrss of this one child, not of every child the bench reaped.
+                _, status, usage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+            elapsed = time.perf_counter() - started
+        finally:
+            server.shutdown()
+            server.server_close()
+        if proc.returncode != 0:
+            raise RuntimeError(f"capture run {run} exited {proc.returncode}:\n{log_path.read_text(errors='replace')[-4000:]}")
+        summary = json.loads((output / "manifests" / "summary.json").read_text(encoding="utf-8"))
+
+    timings = summary["timings"]
+    stage_seconds = {
+        name.split(".", 1)[1]: round(value["totalMs"] / 1000, 3) for name, value in timings.items() if name.startswith("stage.")
+    }
+    crawl_seconds = stage_seconds.get("crawl") or elapsed
+    asset_seconds = stage_seconds.get("assets") or elapsed
+    return {
+        "run": run,
+        "pages": counts["pages"],
+        "crawled": summary["crawl"]["success"],
+        "pageFailures": summary["crawl"]["failed"],
+        "assets": counts["assets"],
+        "downloaded": summary["assets"]["downloaded"],
+        "seconds": round(elapsed, 3),
+        "pagesPerSecond": round(summary["crawl"]["success"] / crawl_seconds, 2),
+        "assetsPerSecond": round(summary["assets"]["downloaded"] / asset_seconds, 2),
+        # Linux reports ru_maxrss in KiB.
+        "peakRssMb": round(usage.ru_maxrss / 1024, 1),
+        "stages": stage_seconds,
+    }
+
+
+# Gated metrics and whether a larger value is better.
+GATED_METRICS = {"pagesPerSecond": True, "assetsPerSecond": True, "peakRssMb": False}
+
+
+def median_metrics(rows: list[dict[str, Any]]) -> dict[str, float]:
+    return {metric: round(statistics.median(row[metric] for row in rows), 2) for metric in GATED_METRICS}
+
+
+def regressions(current: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    failures = []
+    for metric, higher_is_better in GATED_METRICS.items():
+        if metric not in baseline or not baseline[metric]:
+            continue
+        change = (current[metric] - baseline[metric]) / baseline[metric]
+        if (-change if higher_is_better else change) > tolerance:
+            failures.append(f"{metric}: {current[metric]} vs baseline {baseline[metric]} ({change:+.1%})")
+    return failures
+
+
+def bench_e2e(args: argparse.Namespace) -> int:
+    rows = [run_capture(args, run) for run in range(1, args.runs + 1)]
+    print_rows([{key: value for key, value in row.items() if key != "stages"} for row in rows])
+    print()
+    print_rows([{"run": row["run"], **row["stages"]} for row in rows])
+    medians = median_metrics(rows)
+    print(f"\n[median] {json.dumps(medians)}")
+    if args.json_out:
+        capture.write_json(pathlib.Path(args.json_out), {"generatedAt": capture.utc_now(), "median": medians, "runs": rows})
+    if not args.baseline:
+        return 0
+    baseline = json.loads(pathlib.Path(args.baseline).read_text(encoding="utf-8"))["median"]
+    failures = regressions(medians, baseline, args.max_regression)
+    for failure in failures:
+        print(f"[regression] {failure}")
+    return 1 if failures else 0
+
+
+def print_rows(rows: list[dict[str, Any]]) -> None:
+    columns = list(rows[0])
+    print("  ".join(f"{column:>15}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{row[column]!s:>15}" for column in columns))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for lovelysunday_capture.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    http_parser = sub.add_parser("http", help="Per-request urllib vs pooled keep-alive asset downloads")
+    http_parser.add_argument("--assets", type=int, default=2000, help="Assets to download per run")
+    http_parser.add_argument("--asset-bytes", type=int, default=16 * 1024, help="Size of each synthetic asset")
+    http_parser.add_argument(
+        "--handshake-ms",
+        type=float,
+        default=0.0,
+        help="Delay added to every new connection to emulate TCP+TLS setup against a remote host",
+    )
+    http_parser.add_argument(
+        "--asset-workers",
+        type=int,
+        nargs="+",
+        default=[8, 32, 64],
+        help="Asset worker counts to compare",
+    )
+
+    e2e_parser = sub.add_parser(
+        "e2e",
+        help="Full lovelysunday_capture.py run against a generated local site and the fake agent-browser",
+    )
+    e2e_parser.add_argument("--pages", type=int, default=200, help="Pages in the synthetic site, including home")
+    e2e_parser.add_argument(
+        "--sitemap-shards",
+        type=int,
+        default=1,
+        help="Above 1, sitemap.xml is a sitemap index over this many gzipped urlsets",
+    )
+    e2e_parser.add_argument("--assets", type=int, default=1000, help="Images spread across the pages")
+    e2e_parser.add_argument("--asset-bytes", type=int, default=32 * 1024, help="Mean image size")
+    e2e_parser.add_argument("--media", type=int, default=4, help="Large video files spread across the pages")
+    e2e_parser.add_argument("--media-bytes", type=int, default=64 * 1024**2, help="Size of each video file")
+    e2e_parser.add_argument("--workers", type=int, default=4, help="Crawler --workers")
+    e2e_parser.add_argument("--capture-asset-workers", type=int, default=8, help="Crawler --asset-workers")
+    e2e_parser.add_argument("--browser-latency-ms", type=float, default=0.0, help="Delay the fake adds to every browser command")
+    e2e_parser.add_argument(
+        "--browser-fail-rate",
+        type=float,
+        default=0.0,
+        help="Share of page commands the fake fails (deterministic per URL and command)",
+    )
+    e2e_parser.add_argument("--runs", type=int, default=3, help="Repeat the capture; the gate compares medians")
+    e2e_parser.add_argument("--json-out", default="", help="Write per-run results and medians here (usable as --baseline)")
+    e2e_parser.add_argument("--baseline", default="", help="Earlier --json-out file to gate against")
+    e2e_parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.15,
+        help="Exit 1 when pages/sec or assets/sec drop, or peak RSS grows, by more than this share of the baseline",
+    )
+    e2e_parser.add_argument(
+        "capture_args",
+        nargs=argparse.REMAINDER,
+        help="Extra lovelysunday_capture.py arguments after --, e.g. -- --verify-mode http --readiness load",
+    )
+    args = parser.parse_args()
+    if getattr(args, "capture_args", None) and args.capture_args[0] == "--":
+        args.capture_args = args.capture_args[1:]
+    return args
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "http":
+        print_rows(bench_http(args))
+    elif args.command == "e2e":
+        return bench_e2e(args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
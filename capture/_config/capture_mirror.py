@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import re
+import urllib.parse
+from typing import Any
+
+import lovelysunday_capture as capture
+
+ASSET_PREFIX = "_assets"
+CSS_TYPES = ("text/css",)
+# What may follow a URL the matcher rewrites: a delimiter, an escaped quote, or a #fragment. A URL that
+# carries on (an unknown query, a longer path) is left alone and reported instead.
+URL_END = rb"(?=[\s\"'()<>,\\#]|&quot;|&#39;|$)"
+URL_CHARS = rb"[^\s\"'()<>,\\]"
+CSS_REFERENCE = re.compile(rb"""url\(\s*(["']?)([^"')]*?)\1\s*\)|(@import\s+)(["'])([^"']+)\4""")
+
+
+def trie_pattern(words: list[bytes]) -> bytes:
+    # One regex for the whole key set, factored on shared prefixes so matching a position costs one walk
+    # down the trie instead of one attempt per key. Optional tails are greedy, so the longest key wins.
+    trie: dict[int, Any] = {}
+    for word in words:
+        node = trie
+        for byte in word:
+            node = node.setdefault(byte, {})
+        node[-1] = {}
+
+    def compile_node(node: dict[int, Any]) -> bytes:
+        branches = [re.escape(bytes([byte])) + compile_node(child) for byte, child in sorted(node.items()) if byte >= 0]
+        if not branches:
+            return b""
+        body = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+        return b"(?:" + body + b")?" if -1 in node else body
+
+    return compile_node(trie)
+
+
+def url_keys(url: str, site_netloc: str) -> list[bytes]:
+    # How a captured URL can appear in HTML: with either scheme or none (//host/...), root-relative on the
+    # site's own host, and with the query's & written as &amp;.
+    parsed = urllib.parse.urlparse(url)
+    rest = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    forms = [f"//{parsed.netloc}{rest}"]
+    if rest == "/":
+        forms.append(f"//{parsed.netloc}")
+    if parsed.netloc == site_netloc:
+        forms.append(rest)
+    keys: set[str] = set()
+    for form in forms:
+        keys.update({form, form.replace("&", "&amp;")})
+    return [key.encode() for key in keys]
+
+
+class MirrorRewriter:
+    # URL -> mirror href for every captured page and asset, compiled into one matcher per process.
+    def __init__(self, site: str, hrefs: dict[str, str], page_urls: set[str], hosts: list[str]) -> None:
+        self.site = urllib.parse.urlparse(site)
+        self.hrefs = hrefs
+        self.local = set(hrefs.values())
+        self.keys: dict[bytes, bytes] = {}
+        for url, href in hrefs.items():
+            for key in url_keys(url, self.site.netloc):
+                self.keys[key] = href.encode()
+            if url in page_urls and urllib.parse.urlparse(url).path != "/":
+                for key in url_keys(url + "/", self.site.netloc):
+                    self.keys.setdefault(key, href.encode())
+        self.matcher = re.compile(
+            rb"(?:https?:|(?<=[\"'(=\s,]))(" + trie_pattern(sorted(self.keys)) + rb")" + URL_END
+        )
+        # Anything still pointing at a captured host (or root-relative in an attribute) after rewriting.
+        host_alternation = b"|".join(re.escape(host.encode()) for host in sorted(hosts, key=len, reverse=True))
+        self.leftover = re.compile(
+            rb"(?:(https?:)?//(?:" + host_alternation + rb")" + URL_CHARS + rb"*)"
+            rb"|(?:(?<==\")|(?<==')|(?<=\())/(?![/\s])" + URL_CHARS + rb"*"
+        )
+
+    def rewrite_html(self, body: bytes) -> tuple[bytes, int, list[str]]:
+        count = 0
+
+        def replace(match: re.Match[bytes]) -> bytes:
+            nonlocal count
+            count += 1
+            return self.keys[match[1]]
+
+        rewritten = self.matcher.sub(replace, body)
+        return rewritten, count, self.unresolved(rewritten)
+
+    def rewrite_css(self, body: bytes, css_url: str) -> tuple[bytes, int, list[str]]:
+        # Stylesheet references are delimited by url()/@import, so each is resolved against the
+        # stylesheet's own URL and looked up directly.
+        count = 0
+        unresolved: list[str] = []
+
+        def replace(match: re.Match[bytes]) -> bytes:
+            nonlocal count
+            quote, raw = (match[1], match[2]) if match[3] is None else (match[4], match[5])
+            reference = raw.decode("utf-8", "replace").strip()
+            if not reference or reference.startswith(("data:", "#")):
+                return match[0]
+            resolved = urllib.parse.urljoin(css_url, reference)
+            fragment = urllib.parse.urldefrag(resolved).fragment
+            href = self.hrefs.get(capture.normalize_url(resolved) or "")
+            if href is None:
+                unresolved.append(capture.normalize_url(resolved) or reference)
+                return match[0]
+            count += 1
+            target = (href + (f"#{fragment}" if fragment else "")).encode()
+            if match[3] is None:
+                return b"url(" + quote + target + quote + b")"
+            return match[3] + quote + target + quote
+
+        return CSS_REFERENCE.sub(replace, body), count, unresolved
+
+    def unresolved(self, body: bytes) -> list[str]:
+        found = []
+        for match in self.leftover.finditer(body):
+            raw = match[0].decode("utf-8", "replace").replace("&amp;", "&")
+            if match[0].startswith(b"/") and not match[0].startswith(b"//"):
+                if re.split(r"[?#]", raw, maxsplit=1)[0] in self.local:
+                    continue  # already a mirror href
+                raw = urllib.parse.urljoin(f"{self.site.scheme}://{self.site.netloc}", raw)
+            elif raw.startswith("//"):
+                raw = f"{self.site.scheme}:{raw}"
+            found.append(capture.normalize_url(raw) or raw)
+        return found
+
+
+_rewriter: MirrorRewriter | None = None
+_archive: capture.WarcArchive | None = None
+
+
+def init_worker(site: str, hrefs: dict[str, str], page_urls: set[str], hosts: list[str]) -> None:
+    # Runs once per worker process, so the matcher is compiled once per process rather than per file.
+    global _rewriter
+    _rewriter = MirrorRewriter(site, hrefs, page_urls, hosts)
+
+
+def read_source(capture_root: str, source: str | dict[str, Any]) -> bytes:
+    global _archive
+    if isinstance(source, str):
+        return pathlib.Path(source).read_bytes()
+    if _archive is None:
+        _archive = capture.WarcArchive(pathlib.Path(capture_root) / "warc")
+    return _archive.read(source).body
+
+
+def rewrite_one(capture_root: str, url: str, kind: str, source: str | dict[str, Any], target: str) -> dict[str, Any]:
+    # Runs in a worker process: read one page or stylesheet once, rewrite it in one pass, write it out.
+    assert _rewriter is not None
+    body = read_source(capture_root, source)
+    if kind == "page":
+        rewritten, count, unresolved = _rewriter.rewrite_html(body)
+    else:
+        rewritten, count, unresolved = _rewriter.rewrite_css(body, url)
+    path = pathlib.Path(target)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(rewritten)
+    return {"url": url, "kind": kind, "file": target, "replacements": count, "unresolved": unresolved}
+
+
+def page_path(url: str) -> str:
+    # Mirror route for a page: <path>/index.html, one directory per path segment (empty segments collapse,
+    # so /lookbook//looks/x and /lookbook/looks/x share a route).
+    parsed = urllib.parse.urlparse(url)
+    parts = [capture.sanitize_segment(part) for part in parsed.path.split("/") if part and part not in {".", ".."}]
+    if parsed.query:
+        parts.append(f"__q{hashlib.sha1(parsed.query.encode()).hexdigest()[:8]}")
+    return "/".join(parts)
+
+
+def load_manifest(path: pathlib.Path, key: str) -> Any:
+    return json.loads(capture.read_text(path)).get(key, []) if path.exists() else []
+
+
+def asset_source(root: pathlib.Path, asset: dict[str, Any], store: capture.AssetStore | None) -> str | dict[str, Any] | None:
+    if asset.get("file") and (root / asset["file"]).exists():
+        return str(root / asset["file"])
+    if store is not None and asset.get("sha256") and store.object_path(asset["sha256"]).exists():
+        return str(store.object_path(asset["sha256"]))
+    if asset.get("warc") and (root / "warc").exists():
+        return asset["warc"]
+    return None
+
+
+def build_mirror(args: argparse.Namespace) -> dict[str, Any]:
+    root = pathlib.Path(args.capture)
+    output = pathlib.Path(args.output) if args.output else root / "mirror"
+    manifests = root / "manifests"
+    site = args.site
+    if not site and (manifests / "summary.json").exists():
+        site = json.loads(capture.read_text(manifests / "summary.json")).get("site", "")
+    site = capture.normalize_url(site or "https://www.lovelysunday.co/") or ""
+    site_netloc = urllib.parse.urlparse(site).netloc
+    store = capture.AssetStore(pathlib.Path(args.asset_store)) if args.asset_store else None
+
+    hrefs: dict[str, str] = {}
+    tasks: list[tuple[str, str, str | dict[str, Any], str]] = []
+    missing: list[str] = []
+
+    pages = [page for page in load_manifest(manifests / "crawl_results.json", "pages") if page.get("status") == "success"]
+    rewrite_map = load_manifest(manifests / "internal_url_rewrite_map.json", "rewriteMap") or {}
+    redirected = {capture.normalize_url(source) for source in rewrite_map}
+    for page in pages:
+        url = capture.normalize_url(page["url"])
+        if url is None:
+            continue
+        route = page_path(url)
+        hrefs[url] = f"/{route}/" if route else "/"
+        if url in redirected:
+            continue  # served by its rewrite-map target, which owns the same route
+        if page.get("rawHtmlFile") and (root / page["rawHtmlFile"]).exists():
+            source: str | dict[str, Any] = str(root / page["rawHtmlFile"])
+        elif page.get("rawHtmlWarc") and (root / "warc").exists():
+            source = page["rawHtmlWarc"]
+        else:
+            missing.append(url)
+            continue
+        tasks.append((url, "page", source, str(output / route / "index.html")))
+    for source_url, target_url in rewrite_map.items():
+        source_key, target_key = capture.normalize_url(source_url), capture.normalize_url(target_url)
+        if source_key and target_key in hrefs:
+            hrefs[source_key] = hrefs[target_key]
+    page_urls = set(hrefs)
+
+    assets = [asset for asset in load_manifest(manifests / "assets_manifest.json", "assets") if asset.get("status") == "success"]
+    hosts = {site_netloc}
+    linked: collections.Counter[str] = collections.Counter()
+    for asset in assets:
+        url = capture.normalize_url(asset["url"])
+        if url is None:
+            continue
+        hosts.add(urllib.parse.urlparse(url).netloc)
+        source = asset_source(root, asset, store)
+        if source is None:
+            missing.append(url)
+            continue
+        target = capture.asset_target_path(output / ASSET_PREFIX, url, asset.get("contentType"))
+        hrefs[url] = "/" + target.relative_to(output).as_posix()
+        content_type = (asset.get("contentType") or "").split(";")[0].strip().lower()
+        if content_type in CSS_TYPES or target.suffix == ".css":
+            tasks.append((url, "stylesheet", source, str(target)))
+        elif isinstance(source, str):
+            linked[capture.clone_file(pathlib.Path(source), target)] += 1
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(read_source(str(root), source))
+            linked["warc"] += 1
+
+    # Renditions skipped by --image-variants point at the downloaded rendition that stands in for them.
+    for group in load_manifest(manifests / "assets_manifest.json", "variantGroups"):
+        for variant in group["variants"]:
+            url, resolved = capture.normalize_url(variant["url"]), capture.normalize_url(variant["resolvesTo"])
+            if url and url not in hrefs and resolved in hrefs:
+                hrefs[url] = hrefs[resolved]
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.workers or None,
+        initializer=init_worker,
+        initargs=(site, hrefs, page_urls, sorted(hosts)),
+    ) as executor:
+        futures = [executor.submit(rewrite_one, str(root), *task) for task in tasks]
+        files = [future.result() for future in futures]
+
+    unresolved: dict[str, dict[str, Any]] = {}
+    for item in files:
+        item["file"] = pathlib.Path(item["file"]).relative_to(output).as_posix()
+        for url in item["unresolved"]:
+            entry = unresolved.setdefault(
+                url,
+                {
+                    "url": url,
+                    "kind": "page" if urllib.parse.urlparse(url).netloc == site_netloc and not capture.looks_like_static_url(url) else "asset",
+                    "captured": url in missing,
+                    "references": 0,
+                    "files": [],
+                },
+            )
+            entry["references"] += 1
+            if item["file"] not in entry["files"] and len(entry["files"]) < 5:
+                entry["files"].append(item["file"])
+        item["unresolved"] = len(item["unresolved"])
+
+    summary = {
+        "pages": len([item for item in files if item["kind"] == "page"]),
+        "stylesheets": len([item for item in files if item["kind"] == "stylesheet"]),
+        "assets": sum(linked.values()),
+        "assetLinks": dict(linked),
+        "missingSources": len(missing),
+        "replacements": sum(item["replacements"] for item in files),
+        "unresolved": len(unresolved),
+        "unresolvedReferences": sum(entry["references"] for entry in unresolved.values()),
+    }
+    capture.write_json(
+        manifests / "mirror_manifest.json",
+        {
+            "generatedAt": capture.utc_now(),
+            "site": site,
+            "output": os.path.relpath(output, root),
+            "summary": summary,
+            "files": sorted(files, key=lambda item: item["file"]),
+            "unresolved": sorted(unresolved.values(), key=lambda entry: (-entry["references"], entry["url"])),
+            "missingSources": sorted(missing),
+        },
+    )
+    for entry in sorted(unresolved.values(), key=lambda entry: -entry["references"])[: args.show]:
+        print(f"{entry['references']:>5}  {entry['kind']:<5}  {entry['url']}")
+    return summary
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build a self-hosted static mirror from a finished capture")
+    parser.add_argument("capture", help="Capture output directory")
+    parser.add_argument("--output", default="", help="Mirror directory (default: <capture>/mirror)")
+    parser.add_argument("--site", default="", help="Site the capture was taken from (default: manifests/summary.json)")
+    parser.add_argument(
+        "--asset-store",
+        default="",
+        help="Content-addressed asset store the capture was written with, for assets whose output file is gone",
+    )
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--show", type=int, default=20, help="Unresolved URLs printed, most referenced first")
+    return parser.parse_args()
+
+
+def main() -> int:
+    summary = build_mirror(parse_args())
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import collections
+import http.server
+import json
+import mimetypes
+import pathlib
+import re
+import threading
+from typing import Any, NamedTuple
+
+import lovelysunday_capture as capture
+
+# Bodies whose absolute URLs are pointed at the replay origin when the browser asks for them.
+REWRITE_TYPES = ("text/html", "text/css", "text/xml", "application/xml", "image/svg+xml")
+
+
+class ReplayEntry(NamedTuple):
+    content_type: str
+    file: pathlib.Path | None
+    warc: dict[str, Any] | None
+
+
+class ReplayIndex:
+    # URL -> where a finished capture keeps its body: raw HTML for pages, the downloaded file (or WARC
+    # record, or asset-store object) for assets, and the saved sitemaps. Built once from the manifests,
+    # so a lookup is one dict hit on the normalized URL; internal_url_rewrite_map.json adds aliases.
+    def __init__(self, root: pathlib.Path, site: str, asset_store: pathlib.Path | None = None) -> None:
+        self.root = root
+        self.entries: dict[str, ReplayEntry] = {}
+        self.aliases: dict[str, str] = {}
+        self.counts: collections.Counter[str] = collections.Counter()
+        self.archive = capture.WarcArchive(root / "warc") if (root / "warc").exists() else None
+        store = capture.AssetStore(asset_store) if asset_store else None
+        manifests = root / "manifests"
+
+        for page in self._manifest(manifests / "crawl_results.json", "pages"):
+            if page.get("status") != "success":
+                continue
+            html_file = root / page["rawHtmlFile"] if page.get("rawHtmlFile") else None
+            if self._add(page["url"], "text/html; charset=utf-8", html_file, page.get("rawHtmlWarc"), "pages"):
+                if page.get("finalUrl"):
+                    self._alias(page["finalUrl"], page["url"])
+
+        for asset in self._manifest(manifests / "assets_manifest.json", "assets"):
+            if asset.get("status") != "success":
+                continue
+            asset_file = root / asset["file"] if asset.get("file") else None
+            if (asset_file is None or not asset_file.exists()) and store is not None:
+                stored = store.lookup(asset["url"]) or ({"sha256": asset["sha256"]} if asset.get("sha256") else None)
+                asset_file = store.object_path(stored["sha256"]) if stored else None
+            content_type = asset.get("contentType") or mimetypes.guess_type(asset["url"])[0] or "application/octet-stream"
+            self._add(asset["url"], content_type, asset_file, asset.get("warc"), "assets")
+
+        for group in self._manifest(manifests / "assets_manifest.json", "variantGroups"):
+            for variant in group["variants"]:
+                self._alias(variant["url"], variant["resolvesTo"])
+
+        documents = self._manifest(manifests / "sitemaps.json", "sitemaps") or [
+            {"url": capture.urllib.parse.urljoin(site, "/sitemap.xml"), "file": "manifests/sitemap.xml"}
+        ]
+        for document in documents:
+            if document.get("file"):
+                self._add(document["url"], "application/xml", root / document["file"], None, "sitemaps")
+
+        rewrite_map = manifests / "internal_url_rewrite_map.json"
+        if rewrite_map.exists():
+            for source, target in json.loads(capture.read_text(rewrite_map)).get("rewriteMap", {}).items():
+                self._alias(source, target)
+
+    @staticmethod
+    def _manifest(path: pathlib.Path, key: str) -> list[dict[str, Any]]:
+        return json.loads(capture.read_text(path)).get(key, []) if path.exists() else []
+
+    @staticmethod
+    def _key(url: str) -> str | None:
+        return capture.normalize_url(url, default_scheme="http")
+
+    def _add(self, url: str, content_type: str, file: pathlib.Path | None, warc: dict[str, Any] | None, kind: str) -> bool:
+        key = self._key(url)
+        if key is None:
+            return False
+        if file is not None and file.exists():
+            self.entries[key] = ReplayEntry(content_type, file, None)
+        elif warc is not None and self.archive is not None:
+            self.entries[key] = ReplayEntry(content_type, None, warc)
+        else:
+            return False
+        self.counts[kind] += 1
+        return True
+
+    def _alias(self, source: str, target: str) -> None:
+        source_key, target_key = self._key(source), self._key(target)
+        if source_key and target_key and source_key != target_key and source_key not in self.entries:
+            self.aliases[source_key] = target_key
+
+    def hosts(self) -> set[str]:
+        return {capture.urllib.parse.urlparse(url).netloc for url in [*self.entries, *self.aliases]}
+
+    def lookup(self, url: str) -> ReplayEntry | None:
+        key = self._key(url)
+        if key is None:
+            return None
+        return self.entries.get(key) or self.entries.get(self.aliases.get(key, ""))
+
+    def body(self, entry: ReplayEntry) -> bytes:
+        if entry.file is not None:
+            return entry.file.read_bytes()
+        assert self.archive is not None and entry.warc is not None
+        return self.archive.read(entry.warc).body
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], index: ReplayIndex, site: str) -> None:
+        super().__init__(address, ReplayHandler)
+        self.index = index
+        self.routes = capture.ReplayRoutes(f"http://{address[0]}:{self.server_address[1]}", site)
+        self.misses: collections.Counter[str] = collections.Counter()
+        self.served = 0
+        self.lock = threading.Lock()
+        # One pass over a body rewrites every captured host, with or without a scheme (//host/...). An empty
+        # capture has no hosts, and an empty alternation would match every "//".
+        hosts = sorted(index.hosts(), key=len, reverse=True)
+        self._hosts = (
+            re.compile(rb"(?:(https?):)?//(" + b"|".join(re.escape(host.encode()) for host in hosts) + rb")(?=[/?#\"'\s)<>,]|$)")
+            if hosts
+            else None
+        )
+        self._site = capture.urllib.parse.urlparse(site)
+
+    @property
+    def origin(self) -> str:
+        return self.routes.origin
+
+    def rewrite(self, body: bytes) -> bytes:
+        def replace(match: re.Match[bytes]) -> bytes:
+            host = match[2].decode()
+            if host == self._site.netloc:
+                return self.origin.encode()
+            scheme = (match[1] or b"https").decode()
+            return f"{self.origin}{capture.REPLAY_PREFIX}{scheme}/{host}".encode()
+
+        return self._hosts.sub(replace, body) if self._hosts is not None else body
+
+    def miss_report(self) -> dict[str, Any]:
+        with self.lock:
+            misses = [{"url": url, "requests": count} for url, count in self.misses.most_common()]
+        return {"generatedAt": capture.utc_now(), "served": self.served, "misses": misses}
+
+
+class ReplayHandler(http.server.BaseHTTPRequestHandler):
+    # Absolute-form requests ("GET https://host/path", the crawler's HTTP client with --replay) get the
+    # captured bytes unchanged. Origin-form requests come from the browser and are mapped through
+    # ReplayRoutes; their HTML/CSS/XML is rewritten so follow-up requests come back here too.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: ReplayServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        return None
+
+    def do_GET(self) -> None:  # noqa: N802
+        self.serve(send_body=True)
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self.serve(send_body=False)
+
+    def serve(self, send_body: bool) -> None:
+        proxied = self.path.startswith(("http://", "https://"))
+        url = self.path if proxied else self.server.routes.from_replay(self.path)
+        entry = self.server.index.lookup(url)
+        if entry is None:
+            with self.server.lock:
+                self.server.misses[url] += 1
+            self.respond(404, "text/plain; charset=utf-8", b"not in capture\n", send_body)
+            return
+        with self.server.lock:
+            self.server.served += 1
+        rewrite = not proxied and entry.content_type.split(";")[0].strip().lower() in REWRITE_TYPES
+        if entry.file is not None and not rewrite:
+            self.respond_file(entry, send_body)
+            return
+        body = self.server.index.body(entry)
+        self.respond(200, entry.content_type, self.server.rewrite(body) if rewrite else body, send_body)
+
+    def byte_range(self, size: int) -> tuple[int, int] | None:
+        # A single "bytes=" range, as browsers send for media; anything else is answered in full.
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range") or "")
+        if not match or not (match[1] or match[2]):
+            return None
+        if not match[1]:
+            return max(size - int(match[2]), 0), size - 1
+        start, end = int(match[1]), min(int(match[2]) if match[2] else size - 1, size - 1)
+        return (start, end) if start <= end else None
+
+    def respond_file(self, entry: ReplayEntry, send_body: bool) -> None:
+        assert entry.file is not None
+        size = entry.file.stat().st_size
+        span = self.byte_range(size)
+        start, end = span or (0, size - 1)
+        self.send_response(206 if span else 200)
+        self.send_header("Content-Type", entry.content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        if span:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body:
+            return
+        with entry.file.open("rb") as handle:
+            handle.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = handle.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def respond(self, status: int, content_type: str, body: bytes, send_body: bool) -> None:
+        span = self.byte_range(len(body)) if status == 200 else None
+        start, end = span or (0, len(body) - 1)
+        self.send_response(206 if span else status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        if span:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body[start : end + 1])
+
+
+def capture_site(root: pathlib.Path) -> str:
+    summary = root / "manifests" / "summary.json"
+    if summary.exists():
+        site = json.loads(capture.read_text(summary)).get("site")
+        if site:
+            return site
+    return "https://www.lovelysunday.co/"
+
+
+def start_replay_server(
+    root: pathlib.Path,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    site: str | None = None,
+    asset_store: pathlib.Path | None = None,
+) -> ReplayServer:
+    site = site or capture_site(root)
+    server = ReplayServer((host, port), ReplayIndex(root, site, asset_store), site)
+    threading.Thread(target=server.serve_forever, name="replay", daemon=True).start()
+    return server
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve a finished capture over HTTP for offline crawls and verification")
+    parser.add_argument("capture", help="Capture output directory")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (0 = any free port)")
+    parser.add_argument("--site", default="", help="Site the capture was taken from (default: manifests/summary.json)")
+    parser.add_argument(
+        "--asset-store",
+        default="",
+        help="Content-addressed asset store the capture was written with, for assets whose output file is gone",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    root = pathlib.Path(args.capture)
+    server = start_replay_server(
+        root,
+        args.host,
+        args.port,
+        site=args.site or None,
+        asset_store=pathlib.Path(args.asset_store) if args.asset_store else None,
+    )
+    counts = " ".join(f"{kind}={count}" for kind, count in sorted(server.index.counts.items()))
+    print(f"[replay] {root} at {server.origin} (site {server.routes.site}): {counts} aliases={len(server.index.aliases)}")
+    print(f"[replay] crawl it with: lovelysunday_capture.py --site {server.routes.site}/ --replay {server.origin}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+    report = server.miss_report()
+    capture.write_json(root / "manifests" / "replay_misses.json", report)
+    print(f"[replay] served={report['served']} missed={len(report['misses'])} (manifests/replay_misses.json)")
+    for item in report["misses"][:20]:
+        print(f"  {item['requests']:>5}  {item['url']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import urllib.parse
+from typing import Any
+
+import lovelysunday_capture as capture
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the diff command needs it
+    np = None  # type: ignore[assignment]
+
+try:
+    from PIL import Image
+except ImportError:  # optional: both commands need it, checked at startup
+    Image = None  # type: ignore[assignment]
+
+
+def require(*modules: tuple[Any, str]) -> None:
+    missing = [name for module, name in modules if module is None]
+    if missing:
+        raise SystemExit(f"capture_screenshots.py needs {', '.join(missing)} (pip install {' '.join(missing)})")
+
+
+def pixel_hash(image: Any) -> str:
+    # Hash of the decoded pixels, so the same screenshot encoded twice still deduplicates.
+    digest = hashlib.sha256(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def optimize_one(
+    source: str,
+    output_root: str,
+    image_format: str,
+    webp_quality: int,
+    thumb_width: int,
+    thumb_max_height: int,
+) -> dict[str, Any]:
+    # Runs in a worker process: re-encode one screenshot and write its thumbnail.
+    root = pathlib.Path(output_root)
+    path = root / source
+    before = path.stat().st_size
+    with Image.open(path) as opened:
+        image = opened.convert("RGBA") if opened.mode in {"P", "LA"} else opened.copy()
+    sha256 = pixel_hash(image)
+
+    if image_format == "webp":
+        target = path.with_suffix(".webp")
+        if webp_quality >= 100:
+            image.save(target, "WEBP", lossless=True, method=6)
+        else:
+            image.save(target, "WEBP", quality=webp_quality, method=6)
+        if target != path:
+            path.unlink()
+    else:
+        target = path
+        temp = path.with_suffix(".png.tmp")
+        image.save(temp, "PNG", optimize=True)
+        # Keep whichever encoding is smaller; the pixels are identical either way.
+        if temp.stat().st_size < before:
+            os.replace(temp, path)
+        else:
+            temp.unlink()
+
+    viewport = pathlib.Path(source).parent.name
+    thumb = root / "screenshots" / "thumbs" / viewport / f"{pathlib.Path(source).stem}.webp"
+    thumb.parent.mkdir(parents=True, exist_ok=True)
+    scale = thumb_width / image.width
+    thumb_image = image.crop((0, 0, image.width, min(image.height, round(thumb_max_height / scale))))
+    thumb_image.thumbnail((thumb_width, thumb_max_height), Image.Resampling.LANCZOS)
+    thumb_image.save(thumb, "WEBP", quality=80, method=6)
+
+    return {
+        "source": source,
+        "file": target.relative_to(root).as_posix(),
+        "width": image.width,
+        "height": image.height,
+        "pixelSha256": sha256,
+        "bytesBefore": before,
+        "bytesAfter": target.stat().st_size,
+        "thumbnail": thumb.relative_to(root).as_posix(),
+    }
+
+
+def capture_pages(output_root: pathlib.Path) -> list[dict[str, Any]]:
+    results = output_root / "manifests" / "crawl_results.json"
+    if not results.exists():
+        raise SystemExit(f"no crawl_results.json under {output_root}/manifests")
+    return [page for page in json.loads(capture.read_text(results)).get("pages", []) if page.get("status") == "success"]
+
+
+def update_screenshot_references(output_root: pathlib.Path, renamed: dict[str, str]) -> None:
+    # Point crawl records, the page store and any page_json export at the re-encoded files.
+    results_file = output_root / "manifests" / "crawl_results.json"
+    results = json.loads(capture.read_text(results_file))
+    store = capture.PageStore.open_existing(output_root / capture.PAGE_STORE_FILE)
+    for record in results.get("pages", []):
+        changed = False
+        fields = capture.screenshot_fields(record)
+        for field in fields.values():
+            if record.get(field) in renamed:
+                record[field] = renamed[record[field]]
+                changed = True
+        if not changed:
+            continue
+        page = store.get(record["url"]) if store is not None else None
+        json_file = output_root / record["jsonFile"] if record.get("jsonFile") else None
+        if page is None and json_file is not None and json_file.exists():
+            page = json.loads(capture.read_text(json_file))
+        if page is None:
+            continue
+        for field in fields.values():
+            page.setdefault("_capture", {})[field] = record.get(field)
+        if store is not None:
+            store.put(record["url"], page)
+        if json_file is not None and json_file.exists():
+            capture.write_json(json_file, page)
+    capture.write_json(results_file, results)
+    if store is not None:
+        store.close()
+
+
+def optimize(args: argparse.Namespace) -> dict[str, Any]:
+    require((Image, "pillow"))
+    output_root = pathlib.Path(args.capture)
+    sources = sorted(
+        {
+            page[field]
+            for page in capture_pages(output_root)
+            for field in capture.screenshot_fields(page).values()
+            if (output_root / page[field]).exists()
+        }
+    )
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers or None) as executor:
+        futures = [
+            executor.submit(
+                optimize_one,
+                source,
+                str(output_root),
+                args.format,
+                args.webp_quality,
+                args.thumb_width,
+                args.thumb_max_height,
+            )
+            for source in sources
+        ]
+        items = [future.result() for future in futures]
+
+    # Identical screenshots keep their own paths but share one file on disk.
+    first_by_hash: dict[str, dict[str, Any]] = {}
+    for item in sorted(items, key=lambda entry: entry["file"]):
+        original = first_by_hash.setdefault(item["pixelSha256"], item)
+        if original is not item:
+            item["duplicateOf"] = original["file"]
+            item["link"] = capture.clone_file(output_root / original["file"], output_root / item["file"])
+            item["bytesAfter"] = 0
+
+    renamed = {item["source"]: item["file"] for item in items if item["source"] != item["file"]}
+    if renamed:
+        update_screenshot_references(output_root, renamed)
+
+    summary = {
+        "screenshots": len(items),
+        "unique": len(first_by_hash),
+        "bytesBefore": sum(item["bytesBefore"] for item in items),
+        "bytesAfter": sum(item["bytesAfter"] for item in items),
+        "format": args.format,
+    }
+    capture.write_json(
+        output_root / "manifests" / "screenshots_manifest.json",
+        {"generatedAt": capture.utc_now(), "summary": summary, "screenshots": sorted(items, key=lambda item: item["file"])},
+    )
+    return summary
+
+
+def region_deltas(a: Any, b: Any, region: int) -> tuple[Any, float]:
+    # Per-pixel delta is the largest channel difference (0-255). Rows or columns only one image has count
+    # as fully changed. Returns the mean delta per region x region block and the overall mean.
+    # Everything stays uint8 until the block sums, which avoids int16 copies of full-page images.
+    height, width = max(a.shape[0], b.shape[0]), max(a.shape[1], b.shape[1])
+    rows, cols = -(-height // region), -(-width // region)
+    delta = np.zeros((rows * region, cols * region), dtype=np.uint8)
+    delta[:height, :width] = 255
+    common_height, common_width = min(a.shape[0], b.shape[0]), min(a.shape[1], b.shape[1])
+    left, right = a[:common_height, :common_width], b[:common_height, :common_width]
+    channels = np.maximum(left, right)
+    channels -= np.minimum(left, right)
+    np.maximum(np.maximum(channels[..., 0], channels[..., 1]), channels[..., 2], out=delta[:common_height, :common_width])
+
+    # Sum down each band of rows first (contiguous), then across each band's columns.
+    sums = delta.reshape(rows, region, cols * region).sum(axis=1, dtype=np.uint32)
+    sums = sums.reshape(rows, cols, region).sum(axis=2, dtype=np.uint64)
+    block_heights = np.full(rows, region)
+    block_heights[-1] = height - (rows - 1) * region
+    block_widths = np.full(cols, region)
+    block_widths[-1] = width - (cols - 1) * region
+    blocks = sums / np.outer(block_heights, block_widths)
+    return blocks, float(sums.sum() / (height * width))
+
+
+def diff_one(key: str, left: str, right: str, region: int, threshold: float, top: int) -> dict[str, Any]:
+    # Runs in a worker process.
+    with Image.open(left) as image:
+        a = np.asarray(image.convert("RGB"))
+    with Image.open(right) as image:
+        b = np.asarray(image.convert("RGB"))
+    blocks, mean_delta = region_deltas(a, b, region)
+    changed = blocks > threshold
+    order = np.argsort(blocks, axis=None)[::-1][:top]
+    regions = []
+    for flat in order:
+        row, col = divmod(int(flat), blocks.shape[1])
+        if blocks[row, col] <= threshold:
+            break
+        regions.append({"x": col * region, "y": row * region, "size": region, "meanDelta": round(float(blocks[row, col]), 1)})
+    return {
+        "key": key,
+        "left": left,
+        "right": right,
+        "leftSize": [a.shape[1], a.shape[0]],
+        "rightSize": [b.shape[1], b.shape[0]],
+        "score": round(float(changed.mean()), 4),
+        "meanDelta": round(mean_delta, 2),
+        "changedRegions": int(changed.sum()),
+        "topRegions": regions,
+    }
+
+
+def route_filename(url: str) -> str:
+    # Same naming as scripts/ci/capture-screenshots.mjs uses for the Astro rebuild.
+    route = urllib.parse.urlparse(url).path.rstrip("/") or "/"
+    return "index.png" if route == "/" else route.lstrip("/").replace("/", "--") + ".png"
+
+
+def screenshot_pairs(output_root: pathlib.Path, against: pathlib.Path) -> tuple[list[tuple[str, str, str]], list[str]]:
+    # `against` is either another capture (matched by URL) or a directory with one subdirectory per viewport
+    # (desktop/, mobile/, ...) of screenshots named by route, like the PR screenshot workflow produces.
+    pairs: list[tuple[str, str, str]] = []
+    missing: list[str] = []
+    other = {}
+    if (against / "manifests" / "crawl_results.json").exists():
+        other = {page["url"]: page for page in capture_pages(against)}
+    for page in capture_pages(output_root):
+        for viewport, field in capture.screenshot_fields(page).items():
+            key = f"{viewport} {page['url']}"
+            if other:
+                counterpart = other.get(page["url"], {}).get(field)
+                right = against / counterpart if counterpart else None
+            else:
+                right = against / viewport / route_filename(page["url"])
+            if right is None or not right.exists():
+                missing.append(key)
+                continue
+            pairs.append((key, str(output_root / page[field]), str(right)))
+    return pairs, missing
+
+
+def diff(args: argparse.Namespace) -> dict[str, Any]:
+    require((Image, "pillow"), (np, "numpy"))
+    output_root = pathlib.Path(args.capture)
+    pairs, missing = screenshot_pairs(output_root, pathlib.Path(args.against))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers or None) as executor:
+        futures = [
+            executor.submit(diff_one, key, left, right, args.region, args.threshold, args.top_regions)
+            for key, left, right in pairs
+        ]
+        pages = [future.result() for future in futures]
+    pages.sort(key=lambda item: (-item["score"], -item["meanDelta"], item["key"]))
+    summary = {
+        "pairs": len(pages),
+        "changed": len([item for item in pages if item["score"] > 0]),
+        "missing": len(missing),
+        "region": args.region,
+        "threshold": args.threshold,
+    }
+    capture.write_json(
+        output_root / "manifests" / "visual_diff_report.json",
+        {"generatedAt": capture.utc_now(), "against": args.against, "summary": summary, "pages": pages, "missing": missing},
+    )
+    for item in pages[: args.show]:
+        print(f"{item['score']:>7.4f}  {item['meanDelta']:>7.2f}  {item['key']}")
+    return summary
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Post-capture screenshot storage and visual diff")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    optimize_parser = sub.add_parser("optimize", help="Re-encode, deduplicate and thumbnail a capture's screenshots")
+    optimize_parser.add_argument("capture", help="Capture output directory")
+    optimize_parser.add_argument(
+        "--format",
+        choices=["png", "webp"],
+        default="png",
+        help="png: lossless in-place recompression (paths unchanged); webp: replace with WebP and update references",
+    )
+    optimize_parser.add_argument("--webp-quality", type=int, default=100, help="WebP quality; 100 = lossless")
+    optimize_parser.add_argument("--thumb-width", type=int, default=320, help="Thumbnail width in pixels")
+    optimize_parser.add_argument(
+        "--thumb-max-height",
+        type=int,
+        default=1280,
+        help="Thumbnails show the top of the page down to this height",
+    )
+    optimize_parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+
+    diff_parser = sub.add_parser("diff", help="Score per-region pixel deltas against another capture or the Astro rebuild")
+    diff_parser.add_argument("capture", help="Capture output directory")
+    diff_parser.add_argument(
+        "--against",
+        required=True,
+        help="Another capture directory (matched by URL), or a screenshots directory with one subdirectory per "
+        "viewport (desktop/, mobile/, ...) named by route (scripts/ci/capture-screenshots.mjs output)",
+    )
+    diff_parser.add_argument("--region", type=int, default=64, help="Region size in pixels")
+    diff_parser.add_argument("--threshold", type=float, default=8.0, help="Mean delta (0-255) above which a region counts as changed")
+    diff_parser.add_argument("--top-regions", type=int, default=10, help="Regions listed per page in the report")
+    diff_parser.add_argument("--show", type=int, default=20, help="Pages printed from the top of the ranking")
+    diff_parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "optimize":
+        summary = optimize(args)
+    else:
+        summary = diff(args)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
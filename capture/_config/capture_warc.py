@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import sys
+
+import lovelysunday_capture as capture
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Read records from a capture written with --archive warc")
+    parser.add_argument("capture", help="Capture output directory (the one holding warc/index.cdxj)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="Print every indexed URL with its status, type and location")
+
+    get_parser = sub.add_parser("get", help="Write the payload stored for a URL to stdout or a file")
+    get_parser.add_argument("url")
+    get_parser.add_argument("--headers", action="store_true", help="Print the WARC and HTTP headers as JSON instead")
+    get_parser.add_argument("--output", default="", help="Write the payload to this file instead of stdout")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    archive = capture.WarcArchive(pathlib.Path(args.capture) / "warc")
+    if not archive.index:
+        print(f"no WARC index under {args.capture}/warc", file=sys.stderr)
+        return 1
+
+    if args.command == "list":
+        for url in archive.urls():
+            entry = archive.index[url]
+            print(f"{entry.get('status') or '-'}\t{entry.get('mime') or '-'}\t{entry['filename']}:{entry['offset']}\t{url}")
+        return 0
+
+    record = archive.get(args.url)
+    if record is None:
+        print(f"not in archive: {args.url}", file=sys.stderr)
+        return 1
+    if args.headers:
+        print(json.dumps({"warc": record.headers, "status": record.http_status, "http": record.http_headers}, indent=2))
+    elif args.output:
+        capture.write_bytes(pathlib.Path(args.output), record.body)
+    else:
+        sys.stdout.buffer.write(record.body)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
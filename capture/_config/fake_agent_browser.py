@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# Stand-in `agent-browser` CLI for offline benchmarks (capture_bench.py e2e), and the one place that
+# answers page_extract.js / page_ready.js / page_verify.js the way a browser would: the tests'
+# in-process FakeBrowserSession (tests/conftest.py) drives the same Browser class. Stdlib only and
+# deliberately independent of lovelysunday_capture.py, so a command costs about what a real CLI round
+# trip costs rather than a full crawler import.
+#
+# Pages are served from disk: a URL maps to FAKE_AGENT_BROWSER_ROOT/<path>, and `get html` / `eval`
+# answer from that file's markup. Without a root every URL gets a small generated page. Environment knobs:
+#   FAKE_AGENT_BROWSER_ROOT        directory holding the synthetic site (required)
+#   FAKE_AGENT_BROWSER_STATE       directory for per-session state
+#   FAKE_AGENT_BROWSER_LATENCY_MS  delay added to every command
+#   FAKE_AGENT_BROWSER_FAIL_RATE   share of page commands that fail, picked deterministically per session, URL path,
+#                                  command and how often the session has already run that command on that path
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import struct
+import sys
+import time
+import urllib.parse
+import zlib
+from html.parser import HTMLParser
+from typing import Any
+
+TEXT_TAGS = {"title", "h1", "h2", "h3", "p", "li", "a"}
+
+
+def tiny_png(width: int = 1, height: int = 1) -> bytes:
+    # A valid white RGB PNG of the given size, standing in for a screenshot.
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    rows = b"".join(b"\x00" + b"\xff\xff\xff" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+SCREENSHOT_PNG = tiny_png()
+
+
+class PageParser(HTMLParser):
+    def __init__(self, base_url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.title = ""
+        self.canonical: str | None = None
+        self.headings: dict[str, list[str]] = {"h1": [], "h2": [], "h3": []}
+        self.paragraphs: list[str] = []
+        self.list_items: list[str] = []
+        self.links: list[dict[str, str | None]] = []
+        self.images: list[dict[str, Any]] = []
+        self.videos: list[dict[str, str | None]] = []
+        self.scripts: list[dict[str, str | None]] = []
+        self.stylesheets: list[dict[str, str | None]] = []
+        self.main_text: list[str] = []
+        self._text_tag: str | None = None
+        self._text: list[str] = []
+        self._in_main = False
+
+    def absolute(self, value: str | None) -> str | None:
+        return urllib.parse.urljoin(self.base_url, value) if value else None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attr = dict(attrs)
+        if tag == "main":
+            self._in_main = True
+        elif tag == "img":
+            srcset = [self.absolute(entry.strip().split(" ")[0]) for entry in (attr.get("srcset") or "").split(",") if entry.strip()]
+            self.images.append({"src": self.absolute(attr.get("src")), "alt": attr.get("alt") or "", "srcset": srcset})
+        elif tag in {"video", "source"} and attr.get("src"):
+            self.videos.append({"tag": tag, "src": self.absolute(attr.get("src")), "type": attr.get("type") or ""})
+        elif tag == "script" and attr.get("src"):
+            self.scripts.append({"src": self.absolute(attr.get("src")), "type": attr.get("type") or ""})
+        elif tag == "link" and attr.get("rel") == "stylesheet":
+            self.stylesheets.append({"href": self.absolute(attr.get("href")), "rel": "stylesheet", "as": ""})
+        elif tag == "link" and attr.get("rel") == "canonical":
+            self.canonical = self.absolute(attr.get("href"))
+        elif tag == "a" and attr.get("href"):
+            self.links.append({"href": self.absolute(attr.get("href")), "text": "", "rel": "", "target": ""})
+        if tag in TEXT_TAGS:
+            self._text_tag = tag
+            self._text = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "main":
+            self._in_main = False
+        if tag != self._text_tag:
+            return
+        text = re.sub(r"\s+", " ", "".join(self._text)).strip()
+        self._text_tag = None
+        if tag == "title":
+            self.title = text
+        elif tag in self.headings:
+            self.headings[tag].append(text)
+        elif tag == "p":
+            self.paragraphs.append(text)
+        elif tag == "li":
+            self.list_items.append(text)
+        elif tag == "a" and self.links:
+            self.links[-1]["text"] = text
+        if self._in_main and tag != "title":
+            self.main_text.append(text)
+
+    def handle_data(self, data: str) -> None:
+        if self._text_tag is not None:
+            self._text.append(data)
+
+
+def generated_page(url: str) -> str:
+    title = urllib.parse.urlparse(url).path.strip("/") or "home"
+    return (
+        f"<html><head><title>{title}</title><link rel=\"canonical\" href=\"{url}\"></head>"
+        f"<body><main><h1>{title}</h1><p>{url}</p></main></body></html>"
+    )
+
+
+class Browser:
+    def __init__(self, root: pathlib.Path | None, state: dict[str, Any]) -> None:
+        self.root = root
+        self.state = state
+
+    def page_file(self) -> pathlib.Path | None:
+        if self.root is None:
+            return None
+        path = urllib.parse.urlparse(self.state.get("url") or "about:blank").path.lstrip("/")
+        candidate = self.root / (path or "index.html")
+        if candidate.is_dir():
+            candidate = candidate / "index.html"
+        return candidate if candidate.is_file() else None
+
+    def html(self) -> str:
+        if self.root is None:
+            return generated_page(self.state.get("url") or "about:blank")
+        page = self.page_file()
+        return page.read_text(encoding="utf-8") if page is not None else "<html><head></head><body></body></html>"
+
+    def parse(self) -> PageParser:
+        parser = PageParser(self.state.get("url") or "about:blank")
+        parser.feed(self.html())
+        parser.close()
+        return parser
+
+    def evaluate(self, script: str) -> Any:
+        page = self.parse()
+        url = self.state.get("url") or "about:blank"
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        if "pendingImages" in script:
+            return {"mode": "stub", "readyState": "complete", "waitedMs": 0, "timedOut": False, "pendingImages": 0}
+        if "mainTextHash" in script:
+            text = " ".join(page.main_text)
+            text_hash = 0
+            for unit in text.encode("utf-16-le").hex(" ", 2).split():
+                text_hash = (text_hash * 31 + int.from_bytes(bytes.fromhex(unit), "little")) & 0xFFFFFFFF
+            return {
+                "checkedAt": now,
+                "url": url,
+                "title": page.title,
+                "canonical": page.canonical,
+                "h1": page.headings["h1"],
+                "imageCount": len(page.images),
+                "linkCount": len(page.links),
+                "mainTextHash": text_hash,
+            }
+        if "resourceEntries" in script:
+            resources = [
+                {"name": item[key], "initiatorType": kind, "transferSize": 0}
+                for kind, items, key in [
+                    ("img", page.images, "src"),
+                    ("video", page.videos, "src"),
+                    ("script", page.scripts, "src"),
+                    ("link", page.stylesheets, "href"),
+                ]
+                for item in items
+                if item.get(key)
+            ]
+            result = {
+                "capturedAt": now,
+                "url": url,
+                "title": page.title,
+                "canonical": page.canonical,
+                "headings": page.headings,
+                "paragraphs": page.paragraphs,
+                "listItems": page.list_items,
+                "mainText": " ".join(page.main_text),
+                "links": page.links,
+                "images": page.images,
+                "videos": page.videos,
+                "scripts": page.scripts,
+                "stylesheets": page.stylesheets,
+                "icons": [],
+                "resourceEntries": resources,
+                "counts": {
+                    "links": len(page.links),
+                    "images": len(page.images),
+                    "paragraphs": len(page.paragraphs),
+                    "resources": len(resources),
+                },
+            }
+            # The extraction profile's sections, from the options page_extract.js is called with.
+            options = re.search(r"\}\)\((\{.*\})\);?\s*$", script, re.S)
+            fields = json.loads(options.group(1)).get("fields") if options else None
+            if fields is not None:
+                core = {"capturedAt", "url", "title", "canonical", "headings", "counts"}
+                result = {key: value for key, value in result.items() if key in core or key in fields}
+            return result
+        # nav_extract.js: every link on the page.
+        return [link["href"] for link in page.links]
+
+    def handle(self, command: dict[str, Any]) -> dict[str, Any]:
+        action = command["action"]
+        fail_if_unlucky(self.state, command)
+        if action == "navigate":
+            self.state["url"] = command["url"]
+            self.state["requests"] = []
+            return {}
+        if action in {"wait", "close"}:
+            return {}
+        if action == "viewport":
+            self.state["viewport"] = [command["width"], command["height"]]
+            return {}
+        if action == "route":
+            self.state.setdefault("routes", []).append(command["url"])
+            return {}
+        if action == "screenshot":
+            path = pathlib.Path(command["path"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(SCREENSHOT_PNG)
+            return {"path": str(path)}
+        if action == "innerhtml":
+            return {"html": self.html()}
+        if action == "evaluate":
+            return {"result": self.evaluate(command["script"])}
+        if action == "requests":
+            page = self.parse()
+            requests = [{"url": image["src"]} for image in page.images if image.get("src")]
+            if command.get("clear"):
+                return {"requests": []}
+            return {"requests": requests}
+        raise ValueError(f"unsupported command: {action}")
+
+
+def fail_if_unlucky(state: dict[str, Any], command: dict[str, Any]) -> None:
+    rate = float(os.environ.get("FAKE_AGENT_BROWSER_FAIL_RATE") or 0)
+    url = command["url"] if command["action"] == "navigate" else state.get("url") or ""
+    if not rate or command["action"] in {"route", "requests", "viewport"} or not url.startswith("http"):
+        return
+    # Keyed on the path, so the same pages fail on every run whatever port the stand-in site got, and
+    # on the session and repeat count, so a retried command can succeed.
+    parsed = urllib.parse.urlparse(url)
+    key = f"{state.get('session')}|{parsed.path}?{parsed.query}|{command['action']}|{command.get('script', '')[:64]}"
+    seen = state.setdefault("seen", {})
+    seen[key] = seen.get(key, 0) + 1
+    digest = hashlib.sha1(f"{key}|{seen[key]}".encode("utf-8")).digest()
+    if int.from_bytes(digest[:4], "big") / 0xFFFFFFFF < rate:
+        raise RuntimeError(f"injected failure: {command['action']} {url}")
+
+
+def cli_command(args: list[str]) -> dict[str, Any]:
+    # The argument forms the crawler sends, as the command dicts Browser.handle takes.
+    if args[:1] == ["open"]:
+        return {"action": "navigate", "url": args[1]}
+    if args[:1] == ["wait"]:
+        return {"action": "wait", "timeout": int(args[1])}
+    if args[:2] == ["screenshot", "--full"]:
+        return {"action": "screenshot", "path": args[2], "fullPage": True}
+    if args[:1] == ["screenshot"]:
+        return {"action": "screenshot", "path": args[1], "fullPage": False}
+    if args[:2] == ["get", "html"]:
+        return {"action": "innerhtml", "selector": args[2]}
+    if args[:1] == ["eval"]:
+        return {"action": "evaluate", "script": args[1]}
+    if args[:2] == ["set", "viewport"]:
+        return {"action": "viewport", "width": int(args[2]), "height": int(args[3])}
+    if args[:2] == ["network", "route"]:
+        return {"action": "route", "url": args[2], "abort": "--abort" in args}
+    if args[:2] == ["network", "requests"]:
+        return {"action": "requests", "clear": "--clear" in args}
+    if args == ["close"]:
+        return {"action": "close"}
+    raise ValueError(f"unsupported command: {' '.join(args)}")
+
+
+def cli_output(command: dict[str, Any], data: dict[str, Any]) -> str:
+    if command["action"] == "evaluate":
+        return json.dumps(data["result"])
+    if command["action"] == "innerhtml":
+        return data["html"]
+    if command["action"] == "requests":
+        return json.dumps(data["requests"])
+    return ""
+
+
+def state_dir() -> pathlib.Path:
+    path = pathlib.Path(os.environ.get("FAKE_AGENT_BROWSER_STATE") or "/tmp/fake-agent-browser")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def sleep_latency() -> None:
+    latency = float(os.environ.get("FAKE_AGENT_BROWSER_LATENCY_MS") or 0)
+    if latency:
+        time.sleep(latency / 1000)
+
+
+def main(argv: list[str]) -> int:
+    session = "default"
+    if argv[:1] == ["--session"]:
+        session, argv = argv[1], argv[2:]
+    command = cli_command(argv)
+
+    sleep_latency()
+    state_file = state_dir() / f"{session}.json"
+    if command["action"] == "close":
+        state_file.unlink(missing_ok=True)
+        return 0
+    state = json.loads(state_file.read_text()) if state_file.exists() else {"url": "about:blank", "session": session}
+    browser = Browser(pathlib.Path(os.environ["FAKE_AGENT_BROWSER_ROOT"]), state)
+    try:
+        data = browser.handle(command)
+    except Exception as exc:  # noqa: BLE001
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        state_file.write_text(json.dumps(state))
+    sys.stdout.write(cli_output(command, data))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
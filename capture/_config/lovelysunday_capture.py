@@ -2,29 +2,62 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import base64
+import codecs
+import collections
 import concurrent.futures
+import contextlib
+import email.utils
+import functools
+import gzip
 import hashlib
+import http.client
+import heapq
 import json
+import math
 import mimetypes
 import os
 import pathlib
+import random
 import re
+import shutil
+import socket
+import sqlite3
+import ssl
 import subprocess
 import threading
 import time
 import urllib.parse
-import urllib.request
+import uuid
 import xml.etree.ElementTree as ET
+import zlib
 from datetime import datetime, timezone
-from typing import Any
+from html.parser import HTMLParser
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows; clone_file falls back to hardlinks
+    fcntl = None  # type: ignore[assignment]
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # optional: br responses are only requested when it is installed
+    brotli = None
+
+AGENT_BROWSER_BIN = "agent-browser"
 ALLOWED_HOSTS = {"www.lovelysunday.co", "lovelysunday.co"}
+LOOPBACK_HOSTS = {"127.0.0.1", "localhost"}
 USER_AGENT = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
     "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"
 )
 DESKTOP_VIEWPORT = (1440, 900)
 MOBILE_VIEWPORT = (390, 844)
+# Named sizes --viewports accepts on their own (or by width); screenshots land in screenshots/<name>/.
+VIEWPORT_PRESETS = {"desktop": DESKTOP_VIEWPORT, "laptop": (1024, 768), "tablet": (768, 1024), "mobile": MOBILE_VIEWPORT}
+VIEWPORT_MODES = ("resize", "sessions")
 STATIC_EXTENSIONS = {
     ".css",
     ".js",
@@ -81,6 +114,62 @@ RUNTIME_HOST_BLOCKLIST = {
 }
 
 ASSET_INITIATOR_ALLOWLIST = {"img", "image", "link", "script", "css", "font", "video", "audio"}
+FIXED_WAIT_MS = 1200
+VERIFY_MODES = ("browser", "http")
+# Elements whose rendered innerText starts on a new line; collapsed to a single space like page_verify.js does.
+TEXT_BLOCK_TAGS = set(
+    "address article aside blockquote br dd div dl dt fieldset figcaption figure footer form h1 h2 h3 h4 h5 h6 "
+    "header hr li main nav ol p pre section table td th tr ul".split()
+)
+READINESS_MODES = ("fixed", "load", "network-idle", "images")
+HTTP_CHUNK_SIZE = 64 * 1024
+FICLONE = 0x40049409  # Linux ioctl: reflink one file's extents into another
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Asset fetch failures worth another attempt; everything else (404, 403, bad URLs) is recorded once.
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (TimeoutError, ConnectionError, http.client.HTTPException, socket.gaierror)
+# Base delay before a failed page is handed out again; doubles with every attempt.
+PAGE_RETRY_BACKOFF_SECONDS = 2.0
+DEAD_SESSION_MARKERS = ("connection closed", "not running", "no such session", "target closed", "browser has been closed")
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+BLOCKED_REQUEST_REASONS = {"runtime_host_blocklist", "internal_api_endpoint"}
+PAGE_ARTIFACT_FIELDS = ("rawHtmlFile",)
+PAGE_STORE_FILE = "manifests/page_store.sqlite"
+JOURNAL_DIR = "manifests/journal"
+WARC_INDEX_JOURNAL = "index.cdxj.journal"
+PAGE_VALIDATOR_FIELDS = ("sitemapLastmod", "httpEtag", "httpLastModified", "contentHash")
+SITEMAP_MAX_DEPTH = 4
+# page_extract.js sections per --extract-profile; url, title, canonical, h1 and counts always come back.
+EXTRACT_PROFILES = {
+    "inventory": ("meta", "headings", "navLinks", "links"),
+    "assets": ("headings", "openGraph", "twitter", "images", "videos", "scripts", "stylesheets", "icons", "resourceEntries"),
+    "content": ("meta", "openGraph", "twitter", "headings", "navLinks", "paragraphs", "listItems", "links", "images", "jsonLd"),
+    "full": (
+        "meta",
+        "openGraph",
+        "twitter",
+        "headings",
+        "navLinks",
+        "mainText",
+        "paragraphs",
+        "listItems",
+        "links",
+        "images",
+        "videos",
+        "scripts",
+        "stylesheets",
+        "icons",
+        "jsonLd",
+        "resourceEntries",
+    ),
+}
+URL_PREFIX_MARK = "\x01"
+CRAWL_ORDERS = ("weight", "priority", "lastmod")
+REPLAY_PREFIX = "/_replay/"
+# Squarespace CDN renditions of one upload: ?format=100w ... 2500w, or ?format=original.
+IMAGE_VARIANT_PARAM = "format"
+IMAGE_VARIANT_POLICIES = ("all", "largest", "widths")
+INLINE_SCRIPT_RE = re.compile(rb"<script\b(?![^>]*\bsrc=)[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
 
 
 def utc_now() -> str:
@@ -96,6 +185,11 @@ def write_text(path: pathlib.Path, text: str) -> None:
     path.write_text(text, encoding="utf-8")
 
 
+def write_bytes(path: pathlib.Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
 def write_json(path: pathlib.Path, payload: Any) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
@@ -123,9 +217,198 @@ def run_cmd(
     return proc.stdout.strip()
 
 
+class BrowserCommandError(RuntimeError):
+    # An agent-browser command that ran and reported failure; `command` is its argument list.
+    def __init__(self, message: str, command: list[str]) -> None:
+        super().__init__(message)
+        self.command = command
+
+
+class Tracer:
+    # Spans around browser commands, HTTP fetches, per-page work and stage boundaries. Durations are
+    # always kept per operation for the summary percentiles; individual events only when a Chrome
+    # trace file was requested (--trace), so a run can be opened in chrome://tracing or Perfetto.
+    def __init__(self, keep_events: bool = False) -> None:
+        self.keep_events = keep_events
+        self.origin = time.perf_counter()
+        self._durations: dict[str, list[float]] = collections.defaultdict(list)
+        self._events: list[dict[str, Any]] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, started: float, ended: float, **args: Any) -> None:
+        duration_ms = (ended - started) * 1000
+        with self._lock:
+            self._durations[name].append(duration_ms)
+            if not self.keep_events:
+                return
+            thread = threading.current_thread()
+            self._threads[thread.ident or 0] = thread.name
+            self._events.append(
+                {
+                    "name": name,
+                    "cat": name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": round((started - self.origin) * 1_000_000, 1),
+                    "dur": round(duration_ms * 1000, 1),
+                    "pid": os.getpid(),
+                    "tid": thread.ident or 0,
+                    "args": {key: value for key, value in args.items() if value is not None},
+                }
+            )
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter(), **args)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        def percentile(values: list[float], pct: float) -> float:
+            # Nearest rank.
+            return values[max(0, min(len(values) - 1, -(-len(values) * pct // 100) - 1))]
+
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+        return {
+            name: {
+                "count": len(values),
+                "totalMs": round(sum(values), 1),
+                "p50Ms": round(percentile(values, 50), 1),
+                "p95Ms": round(percentile(values, 95), 1),
+                "p99Ms": round(percentile(values, 99), 1),
+                "maxMs": round(values[-1], 1),
+            }
+            for name, values in sorted(durations.items())
+        }
+
+    def write_chrome_trace(self, path: pathlib.Path) -> None:
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in sorted(threads.items())
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": metadata + events, "displayTimeUnit": "ms"}), encoding="utf-8")
+
+
+_tracer = Tracer()
+
+
+def configure_tracer(keep_events: bool) -> Tracer:
+    global _tracer
+    _tracer = Tracer(keep_events=keep_events)
+    return _tracer
+
+
+def tracer() -> Tracer:
+    return _tracer
+
+
+def trace_span(name: str, **args: Any) -> contextlib.AbstractContextManager[None]:
+    return _tracer.span(name, **args)
+
+
+def end_stage(name: str, started: float) -> float:
+    ended = time.perf_counter()
+    _tracer.record(f"stage.{name}", started, ended)
+    return ended
+
+
+def browser_op_name(args: list[str]) -> str:
+    # "browser.open", "browser.screenshot", "browser.eval.page", ...; eval is split by which script ran.
+    verb = " ".join(args[:2]) if args[:1] in (["set"], ["network"], ["get"]) else args[0] if args else "?"
+    name = "browser." + verb.replace(" ", ".")
+    if args[:1] == ["eval"] and len(args) > 1:
+        script = args[1]
+        for marker, label in [("pendingImages", "ready"), ("mainTextHash", "verify"), ("resourceEntries", "page")]:
+            if marker in script:
+                return f"{name}.{label}"
+        return f"{name}.other"
+    return name
+
+
+class SubprocessBrowserSession:
+    # One `agent-browser` process per command; the CLI hands each one to the session's browser.
+    kind = "subprocess"
+
+    def __init__(self, session: str, env: dict[str, str]) -> None:
+        self.session = session
+        self.env = env
+
+    def run(self, args: list[str], timeout: int = 180) -> str:
+        cmd = [AGENT_BROWSER_BIN, "--session", self.session, *args]
+        with trace_span(browser_op_name(args), session=self.session, driver="subprocess"):
+            try:
+                return run_cmd(cmd, env=self.env, timeout=timeout, check=True)
+            except RuntimeError as exc:
+                raise BrowserCommandError(str(exc), args) from exc
+
+    def run_batch(self, commands: list[tuple[list[str], int]]) -> list[str]:
+        return [self.run(args, timeout=timeout) for args, timeout in commands]
+
+    def close(self) -> None:
+        return None
+
+    @staticmethod
+    def end_session(session: str, env: dict[str, str]) -> None:
+        try:
+            run_cmd([AGENT_BROWSER_BIN, "--session", session, "close"], env=env, timeout=30, check=False)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+
+# Tests register an in-process stand-in here (tests/conftest.py).
+BROWSER_DRIVERS: dict[str, Any] = {"subprocess": SubprocessBrowserSession}
+_browser_driver = "subprocess"
+_browser_sessions: dict[str, Any] = {}
+_browser_sessions_lock = threading.Lock()
+
+
+def configure_browser_driver(kind: str) -> None:
+    global _browser_driver
+    if kind not in BROWSER_DRIVERS:
+        raise ValueError(f"unknown browser driver: {kind}")
+    close_browser_sessions()
+    _browser_driver = kind
+
+
+def browser_session(session: str, env: dict[str, str]) -> Any:
+    with _browser_sessions_lock:
+        driver = _browser_sessions.get(session)
+        if driver is None:
+            driver = BROWSER_DRIVERS[_browser_driver](session, env)
+            _browser_sessions[session] = driver
+        return driver
+
+
+def close_browser_sessions() -> None:
+    with _browser_sessions_lock:
+        sessions = list(_browser_sessions.values())
+        _browser_sessions.clear()
+    for driver in sessions:
+        driver.close()
+
+
+def restart_browser_session(session: str, env: dict[str, str]) -> None:
+    # Drops the session's driver and asks agent-browser to close it; the next command starts a fresh one.
+    with _browser_sessions_lock:
+        driver = _browser_sessions.pop(session, None)
+    if driver is not None:
+        driver.close()
+    BROWSER_DRIVERS[_browser_driver].end_session(session, env)
+
+
 def agent_browser(session: str, args: list[str], env: dict[str, str], timeout: int = 180) -> str:
-    cmd = ["agent-browser", "--session", session, *args]
-    return run_cmd(cmd, env=env, timeout=timeout, check=True)
+    return browser_session(session, env).run(args, timeout=timeout)
+
+
+def agent_browser_batch(session: str, commands: list[tuple[list[str], int]], env: dict[str, str]) -> list[str]:
+    return browser_session(session, env).run_batch(commands)
 
 
 def normalize_url(raw: str, *, default_scheme: str = "https", force_https: bool = False) -> str | None:
@@ -175,6 +458,10 @@ def normalize_url(raw: str, *, default_scheme: str = "https", force_https: bool
 
 def normalize_crawl_url(raw: str) -> str | None:
     # Canonicalize crawl inventory to HTTPS to avoid duplicate HTTP/HTTPS page fetches.
+    # Loopback stand-in sites (capture_bench.py) only speak plain HTTP, so they keep their scheme.
+    normalized = normalize_url(raw)
+    if normalized is None or urllib.parse.urlparse(normalized).hostname in LOOPBACK_HOSTS:
+        return normalized
     return normalize_url(raw, force_https=True)
 
 
@@ -191,6 +478,16 @@ def looks_like_static_url(url: str) -> bool:
     return False
 
 
+_site_hosts: frozenset[str] = frozenset(ALLOWED_HOSTS)
+
+
+def configure_site_hosts(site: str) -> None:
+    # The live hosts plus the --site host, so a staging or local stand-in site is internal too. Rebuilt
+    # from ALLOWED_HOSTS on every call, so one run's --site never leaks into the next.
+    global _site_hosts
+    _site_hosts = frozenset({*ALLOWED_HOSTS, urllib.parse.urlparse(site).hostname or ""} - {""})
+
+
 def classify_asset_url(resource_url: str, initiator_type: str | None) -> tuple[bool, str]:
     parsed = urllib.parse.urlparse(resource_url)
     scheme = (parsed.scheme or "").lower()
@@ -204,7 +501,7 @@ def classify_asset_url(resource_url: str, initiator_type: str | None) -> tuple[b
         return False, "missing_host"
     if host in RUNTIME_HOST_BLOCKLIST:
         return False, "runtime_host_blocklist"
-    if host in ALLOWED_HOSTS and path.startswith("/api/"):
+    if host in _site_hosts and path.startswith("/api/"):
         return False, "internal_api_endpoint"
     if host in STATIC_HOST_ALLOWLIST:
         return True, "static_host_allowlist"
@@ -220,10 +517,22 @@ def resource_entry_download_candidate(resource_url: str, initiator_type: str | N
     return include
 
 
+def browser_block_patterns() -> list[str]:
+    # The same rules classify_asset_url applies after the fact, as browser route globs.
+    patterns = [f"*://{host}/**" for host in sorted(RUNTIME_HOST_BLOCKLIST)]
+    patterns.extend(f"*://{host}/api/**" for host in sorted(_site_hosts))
+    return patterns
+
+
+def is_blocked_request(url: str) -> bool:
+    _, reason = classify_asset_url(url, None)
+    return reason in BLOCKED_REQUEST_REASONS
+
+
 def is_internal(url: str) -> bool:
     parsed = urllib.parse.urlparse(url)
     host = parsed.hostname.lower() if parsed.hostname else ""
-    return host in ALLOWED_HOSTS
+    return host in _site_hosts
 
 
 def page_id_from_url(url: str) -> str:
@@ -244,32 +553,471 @@ def sanitize_segment(value: str) -> str:
     return cleaned or "file"
 
 
-def fetch_url(url: str, timeout: int = 90) -> bytes:
-    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:  # noqa: S310
-        return resp.read()
+class HttpStatusError(RuntimeError):
+    def __init__(self, url: str, status: int, reason: str, headers: Any) -> None:
+        super().__init__(f"HTTP Error {status}: {reason} ({url})")
+        self.url = url
+        self.status = status
+        self.headers = headers
+
+
+class HttpResponse(NamedTuple):
+    url: str
+    status: int
+    headers: Any
+    body: bytes
+
+
+class DecodedResponse:
+    # Wraps an http.client response and undoes gzip/deflate/br Content-Encoding as it is read.
+    def __init__(
+        self,
+        resp: http.client.HTTPResponse,
+        url: str,
+        method: str = "GET",
+        request_headers: dict[str, str] | None = None,
+    ) -> None:
+        self.raw = resp
+        self.url = url
+        self.method = method
+        self.request_headers = request_headers or {}
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+        encoding = (resp.headers.get("Content-Encoding") or "").strip().lower()
+        self._decoder: Any = None
+        if encoding in {"gzip", "x-gzip"}:
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decoder = zlib.decompressobj()
+        elif encoding == "br" and brotli is not None:
+            self._decoder = brotli.Decompressor()
+        self._buffer = b""
+        self._eof = False
+
+    def _decode(self, chunk: bytes) -> bytes:
+        process = getattr(self._decoder, "process", None) or self._decoder.decompress
+        return process(chunk)
+
+    def read(self, amt: int | None = None) -> bytes:
+        if self._decoder is None:
+            return self.raw.read() if amt is None else self.raw.read(amt)
+        while not self._eof and (amt is None or len(self._buffer) < amt):
+            chunk = self.raw.read(HTTP_CHUNK_SIZE)
+            if not chunk:
+                self._eof = True
+                if hasattr(self._decoder, "flush"):
+                    self._buffer += self._decoder.flush()
+                break
+            self._buffer += self._decode(chunk)
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+
+class HttpClient:
+    # Keep-alive connections pooled per (scheme, host, port) with a per-host concurrency cap.
+    # Shared by the sitemap, page probe and asset fetches so repeat hosts skip the TCP+TLS handshake.
+    # With a proxy (a capture_replay.py server) every request goes to it in absolute form instead.
+    def __init__(
+        self,
+        max_per_host: int = 8,
+        timeout: int = 45,
+        max_redirects: int = 5,
+        proxy: str | None = None,
+    ) -> None:
+        self.max_per_host = max(max_per_host, 1)
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.proxy = urllib.parse.urlparse(proxy) if proxy else None
+        self.connections_opened = 0
+        self.requests_sent = 0
+        self._ssl_context = ssl.create_default_context()
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = collections.defaultdict(list)
+        self._slots: dict[tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _target(self, url: str) -> tuple[tuple[str, str, int], str]:
+        parsed = urllib.parse.urlparse(url)
+        scheme = (parsed.scheme or "https").lower()
+        if scheme not in {"http", "https"} or not parsed.hostname:
+            raise ValueError(f"unsupported URL: {url}")
+        port = parsed.port or (443 if scheme == "https" else 80)
+        path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        if self.proxy is not None:
+            return ("http", self.proxy.hostname or "127.0.0.1", self.proxy.port or 80), f"{scheme}://{parsed.netloc}{path}"
+        return (scheme, parsed.hostname.lower(), port), path
+
+    def _slot(self, key: tuple[str, str, int]) -> threading.BoundedSemaphore:
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[key]
+
+    def _checkout(self, key: tuple[str, str, int], timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle[key]
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            self.connections_opened += 1
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _checkin(self, key: tuple[str, str, int], conn: http.client.HTTPConnection, reusable: bool) -> None:
+        if not reusable:
+            conn.close()
+            return
+        with self._lock:
+            self._idle[key].append(conn)
+
+    def _send(
+        self,
+        key: tuple[str, str, int],
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        timeout: float,
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        while True:
+            conn, reused = self._checkout(key, timeout)
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, headers=headers)
+                resp = conn.getresponse()
+            except (ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                # An idle keep-alive connection the server already dropped; retry on a fresh one.
+                if reused:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            with self._lock:
+                self.requests_sent += 1
+            # Time to response headers; the body is read by the caller, inside its own span.
+            tracer().record("http.headers", started, time.perf_counter(), host=key[1], reused=reused)
+            return conn, resp
+
+    @contextlib.contextmanager
+    def open(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        method: str = "GET",
+        timeout: float | None = None,
+    ) -> Iterator[DecodedResponse]:
+        timeout = timeout or self.timeout
+        request_headers = {"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+        for _ in range(self.max_redirects + 1):
+            key, path = self._target(url)
+            with self._slot(key):
+                conn, resp = self._send(key, method, path, request_headers, timeout)
+                reusable = False
+                try:
+                    location = resp.getheader("Location")
+                    if resp.status in REDIRECT_STATUSES and location:
+                        resp.read()
+                        reusable = not resp.will_close
+                    elif resp.status >= 400:
+                        resp.read()
+                        reusable = not resp.will_close
+                        raise HttpStatusError(url, resp.status, resp.reason, resp.headers)
+                    else:
+                        yield DecodedResponse(resp, url, method, request_headers)
+                        # Only a fully drained response leaves the connection reusable.
+                        reusable = resp.isclosed() and not resp.will_close
+                        return
+                finally:
+                    self._checkin(key, conn, reusable)
+            url = urllib.parse.urljoin(url, location)
+            if resp.status == 303:
+                method = "GET"
+        raise HttpStatusError(url, resp.status, "too many redirects", resp.headers)
+
+    def request(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        method: str = "GET",
+        timeout: float | None = None,
+    ) -> HttpResponse:
+        with self.open(url, headers=headers, method=method, timeout=timeout) as resp:
+            return HttpResponse(resp.url, resp.status, resp.headers, resp.read())
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "connectionsOpened": self.connections_opened,
+                "requests": self.requests_sent,
+                "connectionsReused": max(self.requests_sent - self.connections_opened, 0),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [conn for conns in self._idle.values() for conn in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+
+_http_client: HttpClient | None = None
+_http_client_lock = threading.Lock()
+
+
+def configure_http_client(max_per_host: int, proxy: str | None = None) -> HttpClient:
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = HttpClient(max_per_host=max_per_host, proxy=proxy)
+        return _http_client
+
+
+class ReplayRoutes:
+    # URL mapping between a capture and the capture_replay.py server replaying it. The browser can only
+    # reach the server as a plain-HTTP origin, so the site is served at its root (root-relative links
+    # keep resolving) and every other host under /_replay/<scheme>/<host>/.
+    def __init__(self, origin: str, site: str) -> None:
+        self.origin = origin.rstrip("/")
+        parsed = urllib.parse.urlparse(site)
+        self.site = f"{parsed.scheme}://{parsed.netloc}"
+        self._replayed = re.compile(re.escape(self.origin) + r"(?:" + re.escape(REPLAY_PREFIX) + r"(https?)/([^/?#\s\"'<>\\]+))?")
+
+    def to_replay(self, url: str) -> str:
+        parsed = urllib.parse.urlparse(url)
+        rest = urllib.parse.urlunparse(("", "", parsed.path or "/", parsed.params, parsed.query, parsed.fragment))
+        if f"{parsed.scheme}://{parsed.netloc}" == self.site:
+            return self.origin + rest
+        return f"{self.origin}{REPLAY_PREFIX}{parsed.scheme}/{parsed.netloc}{rest}"
+
+    def from_replay(self, path: str) -> str:
+        # A request path on the server -> the captured URL it stands for.
+        if path.startswith(REPLAY_PREFIX):
+            scheme, _, rest = path[len(REPLAY_PREFIX) :].partition("/")
+            netloc, _, tail = rest.partition("/")
+            return f"{scheme}://{netloc}/{tail}"
+        return self.site + path
+
+    def restore(self, value: Any) -> Any:
+        # Browser output (URLs, HTML, page JSON) with replay URLs turned back into the captured ones.
+        if isinstance(value, str):
+            return self._replayed.sub(lambda match: f"{match[1]}://{match[2]}" if match[1] else self.site, value)
+        if isinstance(value, list):
+            return [self.restore(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.restore(item) for key, item in value.items()}
+        return value
+
 
+_replay: ReplayRoutes | None = None
 
-def parse_sitemap_urls(xml_bytes: bytes) -> list[str]:
-    root = ET.fromstring(xml_bytes)
-    ns = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-    loc_nodes = root.findall(".//sm:url/sm:loc", ns)
-    urls = []
-    for node in loc_nodes:
-        if node.text:
-            normalized = normalize_crawl_url(node.text)
-            if normalized:
-                urls.append(normalized)
-    return sorted(set(urls))
+
+def configure_replay(origin: str | None, site: str) -> None:
+    global _replay
+    _replay = ReplayRoutes(origin, site) if origin else None
+
+
+def browser_url(url: str) -> str:
+    return _replay.to_replay(url) if _replay is not None else url
+
+
+def from_browser(value: Any) -> Any:
+    return _replay.restore(value) if _replay is not None else value
+
+
+def http_client() -> HttpClient:
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
+
+
+class SitemapEntry(NamedTuple):
+    url: str
+    lastmod: str | None
+    priority: float | None
+
+
+class PrefixedReader:
+    # A stream with bytes already read from its head put back in front, for format sniffing.
+    def __init__(self, prefix: bytes, raw: Any, tee: Any = None) -> None:
+        self._prefix = prefix
+        self._raw = raw
+        self._tee = tee
+
+    def read(self, amt: int | None = -1) -> bytes:
+        if amt is None or amt < 0:
+            data, self._prefix = self._prefix + self._raw.read(), b""
+        else:
+            data, self._prefix = self._prefix[:amt], self._prefix[amt:]
+            if len(data) < amt:
+                data += self._raw.read(amt - len(data))
+        if self._tee is not None:
+            self._tee.write(data)
+        return data
+
+
+def iter_sitemap(stream: Any) -> Iterator[tuple[str, SitemapEntry]]:
+    # Streams ("url", entry) from a <urlset> or ("sitemap", entry) from a <sitemapindex> with iterparse,
+    # clearing each element once read so a 50,000-URL sitemap costs one element of memory. Namespace
+    # prefixes are ignored: some generators omit or misspell the sitemaps.org namespace. Fields are only
+    # read from direct children of <url>/<sitemap>, so extension children such as Squarespace's
+    # <image:image><image:loc> never stand in for the page's own <loc>.
+    root = None
+    path: list[str] = []
+    fields: dict[str, str] = {}
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag.rpartition("}")[2]
+        if event == "start":
+            if root is None:
+                root = elem
+            if tag in {"url", "sitemap"}:
+                fields = {}
+            path.append(tag)
+            continue
+        path.pop()
+        if tag in {"loc", "lastmod", "priority"}:
+            if path and path[-1] in {"url", "sitemap"}:
+                fields[tag] = (elem.text or "").strip()
+        elif tag in {"url", "sitemap"}:
+            try:
+                priority = float(fields["priority"]) if fields.get("priority") else None
+            except ValueError:
+                priority = None
+            if fields.get("loc"):
+                yield tag, SitemapEntry(fields["loc"], fields.get("lastmod") or None, priority)
+            assert root is not None
+            root.clear()
+
+
+def read_sitemap(url: str, save_to: pathlib.Path | None = None, timeout: int = 90) -> Iterator[tuple[str, SitemapEntry]]:
+    # Sitemaps arrive plain, with a gzip/deflate Content-Encoding (undone by DecodedResponse), or as
+    # .xml.gz files served as-is; the last are recognised by their gzip magic rather than by name.
+    with trace_span("http.sitemap", url=url), http_client().open(url, timeout=timeout) as resp:
+        head = resp.read(2)
+        stream: Any = PrefixedReader(head, resp)
+        if head == b"\x1f\x8b":
+            stream = gzip.GzipFile(fileobj=stream, mode="rb")
+        with contextlib.ExitStack() as stack:
+            if save_to is not None:
+                save_to.parent.mkdir(parents=True, exist_ok=True)
+                stream = PrefixedReader(b"", stream, tee=stack.enter_context(save_to.open("wb")))
+            yield from iter_sitemap(stream)
+
+
+def collect_sitemap_entries(
+    root_url: str,
+    manifests_dir: pathlib.Path,
+    workers: int = 8,
+) -> tuple[dict[str, SitemapEntry], list[dict[str, Any]]]:
+    # Follows <sitemapindex> children breadth-first, fetching each level's sitemaps concurrently. Page URLs
+    # listed by several sitemaps keep the newest <lastmod> and the highest <priority>. The root document is
+    # saved as manifests/sitemap.xml and children under manifests/sitemaps/. A failing child sitemap is
+    # reported in the returned document list; only a failing root raises.
+    entries: dict[str, SitemapEntry] = {}
+    documents: list[dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def merge(entry: SitemapEntry) -> None:
+        url = normalize_crawl_url(entry.url)
+        if not url:
+            return
+        with lock:
+            current = entries.get(url)
+            if current is None:
+                entries[url] = entry._replace(url=url)
+                return
+            lastmod = max(filter(None, [current.lastmod, entry.lastmod]), default=None)
+            priority = max((value for value in [current.priority, entry.priority] if value is not None), default=None)
+            entries[url] = SitemapEntry(url, lastmod, priority)
+
+    def load(url: str, depth: int) -> tuple[dict[str, Any], list[str]]:
+        if depth == 0:
+            save_to = manifests_dir / "sitemap.xml"
+        else:
+            parsed = urllib.parse.urlparse(url)
+            name = sanitize_segment(f"{parsed.path.strip('/')}{'-' + parsed.query if parsed.query else ''}")
+            save_to = manifests_dir / "sitemaps" / f"{name.removesuffix('.gz')}"
+        document: dict[str, Any] = {
+            "url": url,
+            "depth": depth,
+            "kind": None,
+            "entries": 0,
+            "file": save_to.relative_to(manifests_dir.parent).as_posix(),
+        }
+        children = []
+        for kind, entry in read_sitemap(url, save_to):
+            document["kind"] = "index" if kind == "sitemap" else "urlset"
+            document["entries"] += 1
+            if kind == "sitemap":
+                children.append(urllib.parse.urljoin(url, entry.url))
+            else:
+                merge(entry)
+        return document, children
+
+    root_document, level = load(root_url, 0)
+    documents.append(root_document)
+    seen = {root_url}
+    depth = 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="sitemap") as executor:
+        while level and depth <= SITEMAP_MAX_DEPTH:
+            level = [url for url in dict.fromkeys(level) if url not in seen]
+            seen.update(level)
+            futures = {executor.submit(load, url, depth): url for url in level}
+            level = []
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    document, children = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    documents.append({"url": futures[future], "depth": depth, "kind": None, "entries": 0, "error": str(exc)})
+                    print(f"[inventory] sitemap failed, skipping: {futures[future]}: {exc}")
+                    continue
+                documents.append(document)
+                level.extend(children)
+            depth += 1
+    documents.sort(key=lambda item: (item["depth"], item["url"]))
+    return entries, documents
+
+
+def crawl_order_weights(
+    order: str,
+    page_weights: dict[str, float],
+    sitemap: dict[str, SitemapEntry],
+) -> dict[str, float]:
+    # UrlQueue hands out the highest weight first: the slowest pages last time, the highest sitemap
+    # <priority>, or the most recently modified <lastmod>. URLs without the field get the average.
+    if order == "priority":
+        return {url: entry.priority for url, entry in sitemap.items() if entry.priority is not None}
+    if order == "lastmod":
+        weights = {}
+        for url, entry in sitemap.items():
+            try:
+                modified = datetime.fromisoformat((entry.lastmod or "").replace("Z", "+00:00"))
+            except ValueError:
+                continue
+            weights[url] = (modified if modified.tzinfo else modified.replace(tzinfo=timezone.utc)).timestamp()
+        return weights
+    return page_weights
 
 
 def collect_nav_urls(site_url: str, nav_js: str, env: dict[str, str]) -> list[str]:
     session = "nav-inventory"
-    agent_browser(session, ["open", site_url], env=env, timeout=120)
+    agent_browser(session, ["open", browser_url(site_url)], env=env, timeout=120)
     raw = agent_browser(session, ["eval", nav_js], env=env, timeout=120)
     parsed = json.loads(raw)
     if isinstance(parsed, str):
         parsed = json.loads(parsed)
+    parsed = from_browser(parsed)
     urls = []
     for value in parsed:
         normalized = normalize_crawl_url(value)
@@ -278,85 +1026,784 @@ def collect_nav_urls(site_url: str, nav_js: str, env: dict[str, str]) -> list[st
     return sorted(set(urls))
 
 
+def install_request_blocking(session: str, env: dict[str, str]) -> None:
+    agent_browser_batch(
+        session,
+        [(["network", "route", pattern, "--abort"], 45) for pattern in browser_block_patterns()],
+        env=env,
+    )
+
+
+def parse_tracked_requests(output: str) -> list[str]:
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return re.findall(r"https?://[^\s\"'<>]+", output)
+    if isinstance(data, dict):
+        data = (data.get("data") or data).get("requests") or []
+    urls = []
+    for item in data if isinstance(data, list) else []:
+        if isinstance(item, str):
+            urls.append(item)
+        elif isinstance(item, dict) and isinstance(item.get("url"), str):
+            urls.append(item["url"])
+    return urls
+
+
+def blocked_request_stats(request_urls: list[str], bytes_by_host: dict[str, float]) -> dict[str, Any]:
+    hosts = collections.Counter(
+        (urllib.parse.urlparse(url).hostname or "").lower() for url in request_urls if is_blocked_request(url)
+    )
+    return {
+        "requests": sum(hosts.values()),
+        "byHost": dict(sorted(hosts.items())),
+        "estimatedBytesSaved": round(sum(bytes_by_host.get(host, 0) * count for host, count in hosts.items())),
+    }
+
+
+def blocked_bytes_by_host(pages: Iterable[dict[str, Any]], known: dict[str, float]) -> dict[str, float]:
+    # Average transfer size per blocked host, learned from captures that still loaded them.
+    # Once blocking is on those requests no longer show up, so the table is carried between runs.
+    totals: collections.Counter[str] = collections.Counter()
+    counts: collections.Counter[str] = collections.Counter()
+    for page in pages:
+        for entry in page.get("resourceEntries", []):
+            name = entry.get("name")
+            if isinstance(name, str) and is_blocked_request(name):
+                host = (urllib.parse.urlparse(name).hostname or "").lower()
+                totals[host] += entry.get("transferSize") or entry.get("encodedBodySize") or 0
+                counts[host] += 1
+    learned = {host: round(totals[host] / counts[host], 1) for host in counts}
+    return dict(sorted({**known, **learned}.items()))
+
+
+def start_request_blocking(session: str, env: dict[str, str], progress_lock: threading.Lock) -> bool:
+    try:
+        install_request_blocking(session, env)
+        return True
+    except Exception as exc:  # noqa: BLE001
+        with progress_lock:
+            print(f"[block] session={session} request blocking unavailable, continuing unblocked: {exc}")
+        return False
+
+
+def run_page_script(session: str, steps: list[tuple[str, tuple[list[str], int]]], env: dict[str, str]) -> dict[str, str]:
+    # Sends a named per-page command script as one batch and returns outputs by step name.
+    outputs = agent_browser_batch(session, [command for _, command in steps], env=env)
+    return dict(zip([name for name, _ in steps], outputs))
+
+
+def readiness_command(mode: str, ready_js: str, timeout_ms: int, quiet_ms: int = 250) -> tuple[list[str], int]:
+    if mode == "fixed":
+        return ["wait", str(FIXED_WAIT_MS)], 45
+    options = {"mode": mode, "timeoutMs": timeout_ms, "quietMs": quiet_ms}
+    return ["eval", ready_js.replace("READY_OPTIONS", json.dumps(options))], timeout_ms // 1000 + 45
+
+
+def parse_readiness(args: list[str], output: str) -> dict[str, Any]:
+    if args[0] == "wait":
+        return {"mode": "fixed", "waitedMs": int(args[1]), "timedOut": False}
+    result = json.loads(output)
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result
+
+
+class Viewport(NamedTuple):
+    name: str
+    width: int
+    height: int
+
+
+def parse_viewports(spec: str) -> list[Viewport]:
+    # "desktop,tablet,mobile", "1440,1024,768,390" or "wide=1920x1080,mobile"; the first one is the
+    # viewport the page is opened, extracted and saved in, the rest only add screenshots.
+    viewports: list[Viewport] = []
+    by_width = {width: (name, height) for name, (width, height) in VIEWPORT_PRESETS.items()}
+    for token in (item.strip().lower() for item in spec.split(",")):
+        if not token:
+            continue
+        name, _, size = token.rpartition("=")
+        if token in VIEWPORT_PRESETS:
+            viewport = Viewport(token, *VIEWPORT_PRESETS[token])
+        elif match := re.fullmatch(r"(\d+)(?:x(\d+))?", size):
+            width = int(match.group(1))
+            preset_name, preset_height = by_width.get(width, (f"w{width}", DESKTOP_VIEWPORT[1]))
+            viewport = Viewport(name or preset_name, width, int(match.group(2) or preset_height))
+        else:
+            raise argparse.ArgumentTypeError(f"bad viewport {token!r}: use a preset, WIDTH, WIDTHxHEIGHT or NAME=WIDTHxHEIGHT")
+        if not re.fullmatch(r"[a-z][a-z0-9]*", viewport.name) or viewport.width <= 0 or viewport.height <= 0:
+            raise argparse.ArgumentTypeError(f"bad viewport {token!r}: names are lowercase letters and digits")
+        if any(item.name == viewport.name for item in viewports):
+            raise argparse.ArgumentTypeError(f"viewport {viewport.name!r} given twice")
+        viewports.append(viewport)
+    if not viewports:
+        raise argparse.ArgumentTypeError("at least one viewport is needed")
+    return viewports
+
+
+DEFAULT_VIEWPORTS = [Viewport("desktop", *DESKTOP_VIEWPORT), Viewport("mobile", *MOBILE_VIEWPORT)]
+
+
+def extract_command(page_js: str, profile: str, *, links: bool = False, dedupe: bool = False, compact_urls: bool = False) -> str:
+    fields = list(EXTRACT_PROFILES[profile])
+    if links and "links" not in fields:
+        fields.append("links")
+    options = {"profile": profile, "fields": fields, "dedupe": dedupe, "compactUrls": compact_urls}
+    return page_js.replace("EXTRACT_OPTIONS", json.dumps(options))
+
+
+def expand_page_urls(data: dict[str, Any]) -> dict[str, Any]:
+    # Undoes page_extract.js compactUrls: "\x01<i>\x01rest" -> _urlPrefixes[i] + rest.
+    prefixes = data.pop("_urlPrefixes", None)
+    if not prefixes:
+        return data
+
+    def expand(value: Any) -> Any:
+        if isinstance(value, str):
+            if value.startswith(URL_PREFIX_MARK):
+                index, _, rest = value[1:].partition(URL_PREFIX_MARK)
+                return prefixes[int(index)] + rest
+            return value
+        if isinstance(value, list):
+            return [expand(item) for item in value]
+        if isinstance(value, dict):
+            return {key: expand(item) for key, item in value.items()}
+        return value
+
+    return expand(data)
+
+
+def viewport_args(width: int, height: int) -> list[str]:
+    return ["set", "viewport", str(width), str(height)]
+
+
 def set_viewport(session: str, width: int, height: int, env: dict[str, str]) -> None:
-    agent_browser(session, ["set", "viewport", str(width), str(height)], env=env, timeout=45)
+    agent_browser(session, viewport_args(width, height), env=env, timeout=45)
+
+
+class UrlQueue:
+    # Shared pull queue: workers take the heaviest remaining URL, so a run finishes close to
+    # total work / workers instead of waiting on whichever static chunk drew the heavy pages.
+    # An open queue (closed=False) blocks getters until producers put more URLs or close it.
+    # With close_when_idle, the queue's own workers are its producers (link discovery): it closes
+    # once nothing is queued, waiting out a retry, or handed out and not yet marked done.
+    def __init__(
+        self,
+        urls: list[str],
+        weights: dict[str, float] | None = None,
+        closed: bool = True,
+        name: str = "queue",
+        close_when_idle: bool = False,
+    ) -> None:
+        self.name = name
+        self._weights = weights or {}
+        known = [self._weights[url] for url in urls if url in self._weights] or list(self._weights.values())
+        self._default_weight = sum(known) / len(known) if known else 0.0
+        self._heap = [(-self._weights.get(url, self._default_weight), url) for url in urls]
+        heapq.heapify(self._heap)
+        self._cond = threading.Condition()
+        # An idle-closing queue is only closed by _close_if_idle: until then a page in progress can add work.
+        self._closed = closed and not close_when_idle
+        # Failed URLs waiting out their backoff, as (ready_at, url); they count as pending work.
+        self._delayed: list[tuple[float, str]] = []
+        self.attempts: dict[str, int] = collections.defaultdict(int)
+        self._close_when_idle = close_when_idle
+        self._in_progress = 0
+        self.total = len(self._heap)
+        self.completed = 0
+
+    def _close_if_idle(self) -> None:
+        if self._close_when_idle and not self._heap and not self._delayed and not self._in_progress:
+            self._closed = True
+            self._cond.notify_all()
+
+    def put(self, url: str) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (-self._weights.get(url, self._default_weight), url))
+            self.total += 1
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def retry(self, url: str, delay: float) -> None:
+        # Hands a failed URL out again after `delay`; it keeps its place in `total`.
+        with self._cond:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, url))
+            self._in_progress -= 1
+            self._cond.notify()
+
+    def start_attempt(self, url: str) -> int:
+        with self._cond:
+            self.attempts[url] += 1
+            return self.attempts[url]
+
+    def get(self) -> str | None:
+        # Time a worker spends blocked here shows up as <name>.idle.
+        started = time.perf_counter()
+        waited = False
+        try:
+            with self._cond:
+                while True:
+                    while self._delayed and self._delayed[0][0] <= time.monotonic():
+                        _, url = heapq.heappop(self._delayed)
+                        heapq.heappush(self._heap, (-self._weights.get(url, self._default_weight), url))
+                    if self._heap:
+                        self._in_progress += 1
+                        return heapq.heappop(self._heap)[1]
+                    self._close_if_idle()
+                    if self._closed and not self._delayed:
+                        return None
+                    waited = True
+                    self._cond.wait(self._delayed[0][0] - time.monotonic() if self._delayed else None)
+        finally:
+            if waited:
+                tracer().record(f"{self.name}.idle", started, time.perf_counter())
+
+    def mark_done(self) -> int:
+        with self._cond:
+            self.completed += 1
+            self._in_progress -= 1
+            self._close_if_idle()
+            return self.completed
+
+
+class LinkFrontier:
+    # Breadth-first link discovery over captured pages: internal links[].href from page_extract.js,
+    # normalized like the inventory, so orphan and legacy URLs reached only by links still get crawled.
+    # Every page's outgoing internal edges are kept for manifests/link_graph.json, discovery or not.
+    def __init__(self, seeds: list[str], enabled: bool, max_depth: int, max_pages: int) -> None:
+        self.enabled = enabled
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.depth = {url: 0 for url in seeds}
+        self.discovered: list[str] = []
+        self.edges: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+
+    def add_page(self, url: str, page_data: dict[str, Any]) -> list[str]:
+        # Records the page's edges; returns the link targets newly admitted to the crawl.
+        targets: dict[str, None] = {}
+        for link in page_data.get("links") or []:
+            target = normalize_crawl_url(link.get("href") or "")
+            if target is None or target == url or not is_internal(target) or looks_like_static_url(target):
+                continue
+            if urllib.parse.urlparse(target).path.startswith("/api/"):
+                continue
+            targets[target] = None
+        admitted = []
+        with self._lock:
+            self.edges[url] = list(targets)
+            depth = self.depth.get(url, 0) + 1
+            if not self.enabled or depth > self.max_depth:
+                return admitted
+            for target in targets:
+                if target in self.depth:
+                    continue
+                if self.max_pages and len(self.discovered) >= self.max_pages:
+                    break
+                self.depth[target] = depth
+                self.discovered.append(target)
+                admitted.append(target)
+        return admitted
+
+    def manifest(self) -> dict[str, Any]:
+        with self._lock:
+            discovered = set(self.discovered)
+            return {
+                "generatedAt": utc_now(),
+                "discovery": {"enabled": self.enabled, "maxDepth": self.max_depth, "maxPages": self.max_pages},
+                "nodes": [
+                    {"url": url, "depth": depth, "discovered": url in discovered}
+                    for url, depth in sorted(self.depth.items())
+                ],
+                "edges": [{"from": source, "to": target} for source in sorted(self.edges) for target in self.edges[source]],
+            }
+
+
+def load_page_weights(crawl_results_path: pathlib.Path) -> dict[str, float]:
+    # Weight = previous crawl duration in ms. Records from before durations were kept are
+    # estimated from their resource + image counts, scaled by the ms/resource seen elsewhere.
+    if not crawl_results_path.exists():
+        return {}
+    try:
+        pages = json.loads(read_text(crawl_results_path)).get("pages", [])
+    except (OSError, ValueError):
+        return {}
+
+    def size(page: dict[str, Any]) -> int:
+        counts = page.get("counts") or {}
+        return 1 + int(counts.get("resources") or 0) + int(counts.get("images") or 0)
+
+    timed = [page for page in pages if isinstance(page.get("durationMs"), (int, float))]
+    ms_per_unit = (sum(page["durationMs"] for page in timed) / sum(size(page) for page in timed)) if timed else 1.0
+    weights = {}
+    for page in pages:
+        if not page.get("url"):
+            continue
+        if isinstance(page.get("durationMs"), (int, float)):
+            weights[page["url"]] = float(page["durationMs"])
+        else:
+            weights[page["url"]] = size(page) * ms_per_unit
+    return weights
+
+
+def permanent_http_status(url: str) -> int | None:
+    # A page the server answers with a client error will not render on a retry either.
+    try:
+        http_client().request(url, timeout=30)
+    except HttpStatusError as exc:
+        if 400 <= exc.status < 500 and exc.status not in RETRY_STATUSES:
+            return exc.status
+    except Exception:  # noqa: BLE001
+        pass
+    return None
+
+
+def classify_page_failure(exc: BaseException) -> str:
+    # timeout, dead_session, navigation, eval or browser; http_status (permanent) is decided by the caller.
+    # Only the stderr part of a command error: the command line itself can hold page scripts that mention timeouts.
+    message = str(exc).lower().rpartition("stderr:")[2]
+    if isinstance(exc, (subprocess.TimeoutExpired, TimeoutError)) or "timed out" in message or "timeout" in message:
+        return "timeout"
+    if isinstance(exc, OSError) or any(marker in message for marker in DEAD_SESSION_MARKERS):
+        return "dead_session"
+    if isinstance(exc, ValueError):
+        # json.JSONDecodeError: the eval returned something that is not the expected JSON.
+        return "eval"
+    if isinstance(exc, BrowserCommandError):
+        if exc.command[:1] == ["open"]:
+            return "navigation"
+        if exc.command[:1] == ["eval"]:
+            return "eval"
+    return "browser"
+
+
+def handle_page_failure(
+    queue: UrlQueue,
+    item: dict[str, Any],
+    exc: BaseException,
+    session: str,
+    env: dict[str, str],
+    retries: int,
+) -> bool:
+    # Classifies a failed page into `item`, restarts a dead session, and requeues the page with
+    # exponential backoff while its attempt budget lasts. Returns True when the page was requeued.
+    url = item["url"]
+    attempt = item["attempts"]
+    failure = classify_page_failure(exc)
+    if failure == "dead_session":
+        restart_browser_session(session, env)
+    elif failure in {"navigation", "timeout"} and attempt <= retries:
+        # The extra GET only decides whether to retry, so it is skipped once the retries are spent.
+        status = permanent_http_status(url)
+        if status is not None:
+            failure = "http_status"
+            item["httpStatus"] = status
+    item["failureClass"] = failure
+    if failure == "http_status" or attempt > retries:
+        return False
+    queue.retry(url, PAGE_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    return True
 
 
 def crawl_worker(
     worker_id: int,
-    urls: list[str],
+    queue: UrlQueue,
     page_js: str,
     output: pathlib.Path,
     env: dict[str, str],
     progress_lock: threading.Lock,
-) -> list[dict[str, Any]]:
+    on_capture: Callable[[dict[str, Any], dict[str, Any] | None], None] | None = None,
+    ready: tuple[list[str], int] = (["wait", str(FIXED_WAIT_MS)], 45),
+    block_bytes: dict[str, float] | None = None,
+    store: PageStore | None = None,
+    warc: WarcWriter | None = None,
+    retries: int = 0,
+    viewports: list[Viewport] = DEFAULT_VIEWPORTS,
+    viewport_mode: str = "resize",
+    extract_profile: str = "full",
+) -> int:
+    # Finished records go to on_capture (the run's journal) as they land; returns how many there were.
+    # resize: one session walks every page through the viewport matrix. sessions: each extra viewport
+    # gets its own session, sized once, which screenshots the same URL alongside the main one.
     session = f"agent-{worker_id}"
-    records: list[dict[str, Any]] = []
-
-    for index, url in enumerate(urls, start=1):
-        record: dict[str, Any] = {
-            "worker": worker_id,
-            "url": url,
-            "requestedAt": utc_now(),
-            "status": "error",
-        }
-        page_id = page_id_from_url(url)
-        record["pageId"] = page_id
-
-        desktop_png = output / "screenshots" / "desktop" / f"{page_id}.png"
-        mobile_png = output / "screenshots" / "mobile" / f"{page_id}.png"
-        html_file = output / "raw_html" / f"{page_id}.html"
-        json_file = output / "page_json" / f"{page_id}.json"
-        desktop_png_rel = desktop_png.relative_to(output).as_posix()
-        mobile_png_rel = mobile_png.relative_to(output).as_posix()
-        html_file_rel = html_file.relative_to(output).as_posix()
-        json_file_rel = json_file.relative_to(output).as_posix()
+    threading.current_thread().name = f"crawl-{worker_id}"
+    finished = 0
+    blocking = block_bytes is not None and start_request_blocking(session, env, progress_lock)
+    primary, extra = viewports[0], viewports[1:]
+    extra_sessions = {viewport.name: f"{session}-{viewport.name}" for viewport in extra} if viewport_mode == "sessions" else {}
+    for name in extra_sessions.values() if block_bytes is not None else ():
+        start_request_blocking(name, env, progress_lock)
+    # Sessions whose viewport is already set; a restarted session is sized again.
+    sized: set[str] = set()
+    screenshot_pool = (
+        concurrent.futures.ThreadPoolExecutor(max_workers=len(extra_sessions), thread_name_prefix=f"crawl-{worker_id}-viewport")
+        if extra_sessions
+        else None
+    )
 
-        try:
-            set_viewport(session, *DESKTOP_VIEWPORT, env=env)
-            agent_browser(session, ["open", url], env=env, timeout=150)
-            agent_browser(session, ["wait", "1200"], env=env, timeout=45)
-            agent_browser(session, ["screenshot", "--full", str(desktop_png)], env=env, timeout=180)
-
-            html = agent_browser(session, ["get", "html", "html"], env=env, timeout=150)
-            write_text(html_file, html + ("\n" if not html.endswith("\n") else ""))
-
-            page_raw = agent_browser(session, ["eval", page_js], env=env, timeout=180)
-            page_data = json.loads(page_raw)
-
-            set_viewport(session, *MOBILE_VIEWPORT, env=env)
-            agent_browser(session, ["screenshot", "--full", str(mobile_png)], env=env, timeout=180)
-            set_viewport(session, *DESKTOP_VIEWPORT, env=env)
-            page_data["_capture"] = {
-                "requestedUrl": url,
-                "pageId": page_id,
+    try:
+        while (url := queue.get()) is not None:
+            page_started = time.perf_counter()
+            page_data: dict[str, Any] | None = None
+            record: dict[str, Any] = {
                 "worker": worker_id,
-                "capturedAt": utc_now(),
-                "desktopScreenshot": desktop_png_rel,
-                "mobileScreenshot": mobile_png_rel,
-                "rawHtmlFile": html_file_rel,
+                "url": url,
+                "requestedAt": utc_now(),
+                "status": "error",
+                "attempts": queue.start_attempt(url),
             }
-            write_json(json_file, page_data)
-
-            record["status"] = "success"
-            record["jsonFile"] = json_file_rel
-            record["rawHtmlFile"] = html_file_rel
-            record["desktopScreenshot"] = desktop_png_rel
-            record["mobileScreenshot"] = mobile_png_rel
-            record["finalUrl"] = page_data.get("url")
-            record["title"] = page_data.get("title")
-            record["counts"] = page_data.get("counts", {})
-        except Exception as exc:  # noqa: BLE001
-            record["error"] = str(exc)
+            page_id = page_id_from_url(url)
+            record["pageId"] = page_id
+
+            screenshots = {viewport.name: output / "screenshots" / viewport.name / f"{page_id}.png" for viewport in viewports}
+            html_file = output / "raw_html" / f"{page_id}.html"
+            json_file = output / "page_json" / f"{page_id}.json"
+            screenshots_rel = {name: path.relative_to(output).as_posix() for name, path in screenshots.items()}
+            html_file_rel = html_file.relative_to(output).as_posix()
+            json_file_rel = json_file.relative_to(output).as_posix()
+            failed_session = session
+
+            try:
+                # The whole per-page script goes to each session in one round trip.
+                steps = [
+                    ("open", (["open", browser_url(url)], 150)),
+                    ("ready", ready),
+                    (f"{primary.name}_screenshot", (["screenshot", "--full", str(screenshots[primary.name])], 180)),
+                    ("html", (["get", "html", "html"], 150)),
+                    ("page", (["eval", page_js], 180)),
+                ]
+                if viewport_mode == "resize" or session not in sized:
+                    steps.insert(0, (f"{primary.name}_viewport", (viewport_args(primary.width, primary.height), 45)))
+                    sized.add(session)
+                if blocking:
+                    opened = [name for name, _ in steps].index("open")
+                    steps.insert(opened, ("clear_requests", (["network", "requests", "--clear"], 45)))
+                    steps.insert(opened + 3, ("requests", (["network", "requests"], 45)))
+                pending = {}
+                if viewport_mode == "resize" and extra:
+                    for viewport in extra:
+                        steps.append((f"{viewport.name}_viewport", (viewport_args(viewport.width, viewport.height), 45)))
+                        steps.append((f"{viewport.name}_screenshot", (["screenshot", "--full", str(screenshots[viewport.name])], 180)))
+                    steps.append(("restore_viewport", (viewport_args(primary.width, primary.height), 45)))
+                for viewport in extra if screenshot_pool is not None else ():
+                    name = extra_sessions[viewport.name]
+                    viewport_steps = [
+                        ("open", (["open", browser_url(url)], 150)),
+                        ("ready", ready),
+                        ("screenshot", (["screenshot", "--full", str(screenshots[viewport.name])], 180)),
+                    ]
+                    if name not in sized:
+                        viewport_steps.insert(0, ("viewport", (viewport_args(viewport.width, viewport.height), 45)))
+                        sized.add(name)
+                    pending[name] = screenshot_pool.submit(run_page_script, name, viewport_steps, env)
+                try:
+                    outputs = run_page_script(session, steps, env)
+                finally:
+                    concurrent.futures.wait(pending.values())
+                for name, future in pending.items():
+                    if future.exception() is not None:
+                        failed_session = name
+                        raise future.exception()
+                record["readiness"] = parse_readiness(ready[0], outputs["ready"])
+                record["readyWaitMs"] = record["readiness"].get("waitedMs")
+                if blocking:
+                    tracked = from_browser(parse_tracked_requests(outputs["requests"]))
+                    record["blocked"] = blocked_request_stats(tracked, block_bytes or {})
+                html = from_browser(outputs["html"])
+                html = html + ("\n" if not html.endswith("\n") else "")
+                html_location = None
+                if warc is not None:
+                    html_location = warc.write_resource(url, html.encode("utf-8"), "text/html; charset=utf-8")._asdict()
+                else:
+                    write_text(html_file, html)
+                page_data = from_browser(expand_page_urls(json.loads(outputs["page"])))
+
+                page_data["_capture"] = {
+                    "requestedUrl": url,
+                    "pageId": page_id,
+                    "worker": worker_id,
+                    "capturedAt": utc_now(),
+                    **{f"{name}Screenshot": rel for name, rel in screenshots_rel.items()},
+                    "viewports": {viewport.name: [viewport.width, viewport.height] for viewport in viewports},
+                    "extractProfile": extract_profile,
+                }
+                if html_location is not None:
+                    page_data["_capture"]["rawHtmlWarc"] = html_location
+                else:
+                    page_data["_capture"]["rawHtmlFile"] = html_file_rel
+                if store is not None:
+                    store.put(url, page_data)
+                else:
+                    write_json(json_file, page_data)
+
+                record["status"] = "success"
+                record["jsonFile"] = json_file_rel
+                if html_location is not None:
+                    record["rawHtmlWarc"] = html_location
+                else:
+                    record["rawHtmlFile"] = html_file_rel
+                record.update({f"{name}Screenshot": rel for name, rel in screenshots_rel.items()})
+                record["extractProfile"] = extract_profile
+                record["finalUrl"] = page_data.get("url")
+                record["title"] = page_data.get("title")
+                record["counts"] = page_data.get("counts", {})
+            except Exception as exc:  # noqa: BLE001
+                record["error"] = str(exc)
+                requeued = handle_page_failure(queue, record, exc, failed_session, env, retries)
+                if record["failureClass"] == "dead_session":
+                    sized.discard(failed_session)
+                    if block_bytes is not None and failed_session == session:
+                        blocking = start_request_blocking(session, env, progress_lock)
+                    elif block_bytes is not None:
+                        start_request_blocking(failed_session, env, progress_lock)
+                if requeued:
+                    tracer().record("crawl.page", page_started, time.perf_counter(), url=url, status="retry")
+                    with progress_lock:
+                        print(f"[crawl] worker={worker_id} retry={record['attempts']} failure={record['failureClass']} url={url}")
+                    continue
+
+            page_ended = time.perf_counter()
+            record["durationMs"] = round((page_ended - page_started) * 1000)
+            tracer().record("crawl.page", page_started, page_ended, url=url, status=record["status"])
+            finished += 1
+            # Before mark_done: links discovered from this page must be queued before the queue can go idle.
+            if on_capture is not None:
+                on_capture(record, page_data if record["status"] == "success" else None)
+            done = queue.mark_done()
+            with progress_lock:
+                print(f"[crawl] worker={worker_id} page={done}/{queue.total} status={record['status']} url={url}")
+    finally:
+        # Also when a page or on_capture raises, so the viewport threads and their futures go too.
+        if screenshot_pool is not None:
+            screenshot_pool.shutdown(cancel_futures=True)
+    return finished
+
+
+def load_previous_capture(previous_dir: pathlib.Path) -> dict[str, dict[str, dict[str, Any]]]:
+    def load(rel: str, key: str) -> dict[str, dict[str, Any]]:
+        path = previous_dir / "manifests" / rel
+        if not path.exists():
+            return {}
+        try:
+            items = json.loads(read_text(path)).get(key, [])
+        except (OSError, ValueError):
+            return {}
+        return {item["url"]: item for item in items if item.get("url") and item.get("status") == "success"}
+
+    return {
+        "pages": load("crawl_results.json", "pages"),
+        "assets": load("assets_manifest.json", "assets"),
+        "verify": load("verification_live_snapshots.json", "pages"),
+    }
+
+
+def page_content_hash(body: bytes) -> str:
+    # Inline script bodies carry per-request context blobs and nonces; hash the markup around them.
+    stripped = INLINE_SCRIPT_RE.sub(b"<script>", body)
+    return hashlib.sha256(b" ".join(stripped.split())).hexdigest()
+
+
+def probe_page(url: str, previous: dict[str, Any] | None, timeout: int = 30) -> dict[str, Any]:
+    previous = previous or {}
+    headers = {}
+    if previous.get("httpEtag"):
+        headers["If-None-Match"] = previous["httpEtag"]
+    if previous.get("httpLastModified"):
+        headers["If-Modified-Since"] = previous["httpLastModified"]
+    try:
+        with trace_span("http.probe", url=url):
+            resp = http_client().request(url, headers=headers, timeout=timeout)
+    except HttpStatusError as exc:
+        return {"httpStatus": exc.status, "error": str(exc)}
+    except Exception as exc:  # noqa: BLE001
+        return {"error": str(exc)}
+    if resp.status == 304:
+        return {
+            "httpStatus": 304,
+            "httpEtag": resp.headers.get("ETag") or previous.get("httpEtag"),
+            "httpLastModified": resp.headers.get("Last-Modified") or previous.get("httpLastModified"),
+            "contentHash": previous.get("contentHash"),
+        }
+    return {
+        "httpStatus": resp.status,
+        "httpEtag": resp.headers.get("ETag"),
+        "httpLastModified": resp.headers.get("Last-Modified"),
+        "contentHash": page_content_hash(resp.body),
+    }
+
+
+def screenshot_fields(record: dict[str, Any]) -> dict[str, str]:
+    # Viewport name -> record field: every viewport's screenshot is kept as <name>Screenshot.
+    return {key.removesuffix("Screenshot"): key for key in record if key.endswith("Screenshot") and record[key]}
+
+
+def page_artifacts(record: dict[str, Any]) -> list[str]:
+    fields = [*PAGE_ARTIFACT_FIELDS, *screenshot_fields(record).values()]
+    return [record[key] for key in fields if record.get(key)]
+
+
+def load_page_data(record: dict[str, Any], base_dir: pathlib.Path, store: PageStore | None) -> dict[str, Any] | None:
+    # Captures from before the page store only have page_json/<page_id>.json.
+    if store is not None and (page := store.get(record["url"])) is not None:
+        return page
+    page_file = base_dir / record["jsonFile"] if record.get("jsonFile") else None
+    if page_file is None or not page_file.exists():
+        return None
+    return json.loads(read_text(page_file))
+
+
+def has_page_data(record: dict[str, Any], base_dir: pathlib.Path, store: PageStore | None) -> bool:
+    if store is not None and store.has(record["url"]):
+        return True
+    return bool(record.get("jsonFile")) and (base_dir / record["jsonFile"]).exists()
 
-        records.append(record)
-        with progress_lock:
-            print(f"[crawl] worker={worker_id} page={index}/{len(urls)} status={record['status']} url={url}")
 
-    return records
+def plan_incremental(
+    urls: list[str],
+    sitemap_lastmods: dict[str, str | None],
+    previous_pages: dict[str, dict[str, Any]],
+    previous_dir: pathlib.Path,
+    incremental: bool,
+    probe_workers: int,
+    previous_store: PageStore | None = None,
+    viewports: list[Viewport] = DEFAULT_VIEWPORTS,
+    extract_profile: str = "full",
+) -> dict[str, dict[str, Any]]:
+    # Decide per URL whether the browser has to render it again. Cheapest signal first:
+    # an unchanged sitemap <lastmod>, then a conditional GET (304), then a hash of the server HTML.
+    # Only incremental runs probe, so a full run costs no extra request per page; it records the sitemap
+    # <lastmod> alone, and pages an incremental run re-renders pick up their HTTP validators there.
+    # A page captured without one of the requested viewports, or with an extraction profile that
+    # lacks some of the requested sections, is re-rendered (missing_artifacts).
+    sections = set(EXTRACT_PROFILES[extract_profile])
+    plan: dict[str, dict[str, Any]] = {}
+    to_probe = []
+    for url in urls:
+        previous = previous_pages.get(url)
+        lastmod = sitemap_lastmods.get(url)
+        reusable = bool(
+            incremental
+            and previous
+            and page_artifacts(previous)
+            and all((previous_dir / rel).exists() for rel in page_artifacts(previous))
+            and all(previous.get(f"{viewport.name}Screenshot") for viewport in viewports)
+            and sections <= set(EXTRACT_PROFILES.get(previous.get("extractProfile", "full"), ()))
+            and has_page_data(previous, previous_dir, previous_store)
+        )
+        if reusable and lastmod and previous.get("sitemapLastmod") == lastmod:
+            validators = {key: previous.get(key) for key in PAGE_VALIDATOR_FIELDS}
+            plan[url] = {"refresh": False, "reason": "sitemap_lastmod", "validators": validators}
+            continue
+        if not incremental:
+            plan[url] = {"refresh": True, "reason": "full", "validators": {"sitemapLastmod": lastmod}}
+            continue
+        plan[url] = {"refresh": True, "reason": "new", "reusable": reusable}
+        to_probe.append(url)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(probe_workers, 1)) as executor:
+        probes = dict(zip(to_probe, executor.map(lambda url: probe_page(url, previous_pages.get(url)), to_probe)))
+
+    for url in to_probe:
+        entry = plan[url]
+        probe = probes[url]
+        previous = previous_pages.get(url) or {}
+        entry["validators"] = {
+            "sitemapLastmod": sitemap_lastmods.get(url),
+            "httpEtag": probe.get("httpEtag"),
+            "httpLastModified": probe.get("httpLastModified"),
+            "contentHash": probe.get("contentHash"),
+        }
+        if not previous:
+            entry["reason"] = "new"
+        elif not entry.pop("reusable"):
+            entry["reason"] = "missing_artifacts"
+        elif probe.get("error"):
+            entry["reason"] = "probe_error"
+        elif probe.get("httpStatus") == 304:
+            entry.update(refresh=False, reason="http_not_modified")
+        elif probe.get("contentHash") and probe.get("contentHash") == previous.get("contentHash"):
+            entry.update(refresh=False, reason="content_hash")
+        else:
+            entry["reason"] = "changed"
+    for entry in plan.values():
+        entry.pop("reusable", None)
+    return plan
+
+
+def resume_pages(
+    urls: list[str],
+    journaled: dict[str, dict[str, Any]],
+    output_dir: pathlib.Path,
+    store: PageStore,
+    warc: WarcWriter | None = None,
+    resumed_archive: WarcArchive | None = None,
+) -> dict[str, dict[str, Any]]:
+    # Pages an interrupted run finished: their journal record, page data and screenshots are in place.
+    # In WARC mode the raw HTML is copied out of the interrupted run's files, which close() then drops.
+    resumed = {}
+    for url in urls:
+        record = journaled.get(url)
+        if record is None or not store.has(url):
+            continue
+        if not all((output_dir / rel).exists() for rel in page_artifacts(record)):
+            continue
+        if record.get("rawHtmlWarc"):
+            location = warc.copy(resumed_archive, url) if warc is not None and resumed_archive is not None else None
+            if location is None:
+                continue
+            record = {**record, "rawHtmlWarc": location._asdict()}
+        elif warc is not None:
+            continue
+        resumed[url] = record
+    return resumed
+
 
+def carry_forward_file(rel: str, previous_dir: pathlib.Path, output_dir: pathlib.Path) -> None:
+    source = previous_dir / rel
+    target = output_dir / rel
+    if source.resolve() == target.resolve():
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(source, target)
 
-def collect_asset_urls(page_json_files: list[pathlib.Path]) -> list[str]:
+
+def carry_forward_page(
+    record: dict[str, Any],
+    previous_dir: pathlib.Path,
+    output_dir: pathlib.Path,
+    warc: WarcWriter | None = None,
+    previous_archive: WarcArchive | None = None,
+) -> dict[str, Any]:
+    # Raw HTML moves between loose files and the WARC archive when the two runs used different --archive modes.
+    carried = dict(record)
+    for rel in page_artifacts(record):
+        if rel == record.get("rawHtmlFile") and warc is not None:
+            location = warc.write_resource(record["url"], (previous_dir / rel).read_bytes(), "text/html; charset=utf-8")
+            carried["rawHtmlWarc"] = location._asdict()
+            del carried["rawHtmlFile"]
+            continue
+        carry_forward_file(rel, previous_dir, output_dir)
+    if record.get("rawHtmlWarc"):
+        previous_html = previous_archive.get(record["url"]) if previous_archive is not None else None
+        if previous_html is None:
+            raise RuntimeError(f"carried page has no archived raw HTML: {record['url']}")
+        if warc is not None:
+            carried["rawHtmlWarc"] = warc.write_resource(record["url"], previous_html.body, "text/html; charset=utf-8")._asdict()
+        else:
+            html_file = output_dir / "raw_html" / f"{record['pageId']}.html"
+            write_bytes(html_file, previous_html.body)
+            carried["rawHtmlFile"] = html_file.relative_to(output_dir).as_posix()
+            del carried["rawHtmlWarc"]
+    carried["carriedForwardAt"] = utc_now()
+    return carried
+
+
+def page_asset_urls(data: dict[str, Any]) -> set[str]:
     urls: set[str] = set()
 
     def add(value: Any, initiator_hint: str | None = None) -> None:
@@ -372,27 +1819,550 @@ def collect_asset_urls(page_json_files: list[pathlib.Path]) -> list[str]:
             if include:
                 urls.add(normalized)
 
-    for page_file in page_json_files:
-        data = json.loads(read_text(page_file))
-        for image in data.get("images", []):
-            add(image.get("src"), "image")
-            add(image.get("srcset", []), "image")
-        for video in data.get("videos", []):
-            add(video.get("src"), "video")
-        for script in data.get("scripts", []):
-            add(script.get("src"), "script")
-        for stylesheet in data.get("stylesheets", []):
-            add(stylesheet.get("href"), "css")
-        add(data.get("icons", []), "image")
-        for resource in data.get("resourceEntries", []):
-            name = resource.get("name")
-            initiator = resource.get("initiatorType")
-            if isinstance(name, str) and resource_entry_download_candidate(name, initiator):
-                add(name, initiator)
-        add(data.get("openGraph", {}).get("image"), "image")
-        add(data.get("twitter", {}).get("image"), "image")
-
-    return sorted(urls)
+    for image in data.get("images", []):
+        add(image.get("src"), "image")
+        add(image.get("srcset", []), "image")
+    for video in data.get("videos", []):
+        add(video.get("src"), "video")
+    for script in data.get("scripts", []):
+        add(script.get("src"), "script")
+    for stylesheet in data.get("stylesheets", []):
+        add(stylesheet.get("href"), "css")
+    add(data.get("icons", []), "image")
+    for resource in data.get("resourceEntries", []):
+        name = resource.get("name")
+        initiator = resource.get("initiatorType")
+        if isinstance(name, str) and resource_entry_download_candidate(name, initiator):
+            add(name, initiator)
+    add(data.get("openGraph", {}).get("image"), "image")
+    add(data.get("twitter", {}).get("image"), "image")
+
+    return urls
+
+
+def collect_asset_urls(store: PageStore) -> list[str]:
+    return store.asset_urls()
+
+
+class PageStore:
+    # Page captures in one SQLite file (manifests/page_store.sqlite): the full page JSON plus
+    # indexed columns for the fields downstream stages filter on, and a page -> asset URL table,
+    # so lookups by URL or asset ("which pages use this image?") do not re-parse every page.
+    # page_json/<page_id>.json is written from here as an export.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            page_id TEXT PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            final_url TEXT,
+            title TEXT,
+            canonical TEXT,
+            image_count INTEGER,
+            link_count INTEGER,
+            resource_count INTEGER,
+            captured_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS page_assets (
+            page_id TEXT NOT NULL REFERENCES pages(page_id) ON DELETE CASCADE,
+            url TEXT NOT NULL,
+            PRIMARY KEY (page_id, url)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS page_assets_url ON page_assets(url);
+        CREATE INDEX IF NOT EXISTS pages_canonical ON pages(canonical);
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the crawl workers; writes are serialised by the lock.
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open_existing(cls, path: pathlib.Path) -> PageStore | None:
+        return cls(path) if path.exists() else None
+
+    def put(self, url: str, page_data: dict[str, Any]) -> None:
+        page_id = page_data.get("_capture", {}).get("pageId") or page_id_from_url(url)
+        counts = page_data.get("counts") or {}
+        row = (
+            page_id,
+            url,
+            page_data.get("url"),
+            page_data.get("title"),
+            page_data.get("canonical"),
+            counts.get("images"),
+            counts.get("links"),
+            counts.get("resources"),
+            page_data.get("_capture", {}).get("capturedAt"),
+            json.dumps(page_data, ensure_ascii=False, separators=(",", ":")),
+        )
+        assets = [(page_id, asset) for asset in sorted(page_asset_urls(page_data))]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute("DELETE FROM pages WHERE page_id = ? OR url = ?", (page_id, url))
+                self._db.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                self._db.executemany("INSERT OR IGNORE INTO page_assets VALUES (?, ?)", assets)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, params: tuple[Any, ...] = ()) -> list[tuple[Any, ...]]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def get(self, url: str) -> dict[str, Any] | None:
+        rows = self._query("SELECT data FROM pages WHERE url = ? OR page_id = ?", (url, url))
+        return json.loads(rows[0][0]) if rows else None
+
+    def has(self, url: str) -> bool:
+        return bool(self._query("SELECT 1 FROM pages WHERE url = ?", (url,)))
+
+    def urls(self) -> list[str]:
+        return [row[0] for row in self._query("SELECT url FROM pages ORDER BY url")]
+
+    def pages(self) -> Iterator[dict[str, Any]]:
+        for url in self.urls():
+            page = self.get(url)
+            if page is not None:
+                yield page
+
+    def asset_urls(self) -> list[str]:
+        return [row[0] for row in self._query("SELECT DISTINCT url FROM page_assets ORDER BY url")]
+
+    def pages_referencing(self, asset_url: str) -> list[str]:
+        return [
+            row[0]
+            for row in self._query(
+                "SELECT pages.url FROM page_assets JOIN pages USING (page_id) WHERE page_assets.url = ? ORDER BY pages.url",
+                (asset_url,),
+            )
+        ]
+
+    def prune(self, keep_urls: set[str]) -> int:
+        stale = [url for url in self.urls() if url not in keep_urls]
+        with self._lock:
+            self._db.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url in stale])
+        return len(stale)
+
+    def export_json(self, output_root: pathlib.Path, records: list[dict[str, Any]]) -> int:
+        written = 0
+        for record in records:
+            page = self.get(record["url"]) if record.get("jsonFile") else None
+            if page is not None:
+                write_json(output_root / record["jsonFile"], page)
+                written += 1
+        return written
+
+    def stats(self) -> dict[str, Any]:
+        pages, assets, links = self._query(
+            "SELECT (SELECT COUNT(*) FROM pages), (SELECT COUNT(DISTINCT url) FROM page_assets), "
+            "(SELECT COUNT(*) FROM page_assets)"
+        )[0]
+        return {"path": self.path.as_posix(), "pages": pages, "assetUrls": assets, "pageAssetLinks": links}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class RecordJournal:
+    # Append-only JSON-lines log of finished records (manifests/journal/<manifest>.jsonl). Every record is
+    # flushed as it lands, so a crash or Ctrl-C keeps the progress made so far; the sorted manifests are
+    # built from here at the end, and --resume reads it back to skip work that already finished.
+    def __init__(self, path: pathlib.Path, resume: bool = False) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._handle = path.open("a" if resume else "w", encoding="utf-8")
+        if resume and self._handle.tell() and not path.read_bytes().endswith(b"\n"):
+            # Terminate a line the interruption cut short; load() skips it.
+            self._handle.write("\n")
+
+    def append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._handle.write(line + "\n")
+            self._handle.flush()
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        # The last record per URL wins: a retried or re-crawled page supersedes what an earlier run wrote.
+        with self._lock:
+            self._handle.flush()
+        records: dict[str, dict[str, Any]] = {}
+        with self.path.open(encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and record.get("url"):
+                    records[record["url"]] = record
+        return records
+
+    def records(self) -> list[dict[str, Any]]:
+        return sorted(self.load().values(), key=lambda item: item["url"])
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    # Retry-After is either delay-seconds or an HTTP-date.
+    value = (value or "").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    if isinstance(exc, HttpStatusError):
+        return exc.status in RETRY_STATUSES
+    return isinstance(exc, RETRY_EXCEPTIONS)
+
+
+class HostLimiter:
+    # Per-host gate on the download engine's event loop: at most `concurrency` transfers at once,
+    # starts spaced by 1/rate seconds, and no starts at all while a Retry-After pause is running.
+    def __init__(self, concurrency: int, rate: float) -> None:
+        self.slots = asyncio.Semaphore(max(concurrency, 1))
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.next_start = 0.0
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        loop = asyncio.get_running_loop()
+        self.paused_until = max(self.paused_until, loop.time() + seconds)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> Any:
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            # Re-checked after every sleep: another download's Retry-After may have pushed the start back.
+            while (wait := max(self.next_start, self.paused_until) - loop.time()) > 0:
+                await asyncio.sleep(wait)
+            self.next_start = loop.time() + self.interval
+            yield
+
+
+class AssetDownloadEngine:
+    # asyncio scheduler for asset downloads. Every queued, rate-limited or backing-off download is a
+    # coroutine on one event-loop thread; only a transfer in progress holds one of the `workers`
+    # threads, which run the blocking download_one_asset on the pooled keep-alive client. Transient
+    # failures are retried with full-jitter exponential backoff, honoring Retry-After, and each
+    # attempt after the first resumes whatever .part the previous one left behind.
+    def __init__(
+        self,
+        workers: int,
+        max_per_host: int = 8,
+        host_rate: float = 0.0,
+        retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_after_max: float = 120.0,
+    ) -> None:
+        self.max_per_host = max_per_host
+        self.host_rate = host_rate
+        self.retries = max(retries, 0)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.retried = 0
+        self._hosts: dict[str, HostLimiter] = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="asset")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="asset-loop", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> AssetDownloadEngine:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def submit(self, url: str, download: Callable[[], dict[str, Any]]) -> concurrent.futures.Future[dict[str, Any]]:
+        return asyncio.run_coroutine_threadsafe(self._fetch(url, download), self._loop)
+
+    def _host(self, url: str) -> HostLimiter:
+        host = (urllib.parse.urlparse(url).hostname or "").lower()
+        if host not in self._hosts:
+            self._hosts[host] = HostLimiter(self.max_per_host, self.host_rate)
+        return self._hosts[host]
+
+    async def _fetch(self, url: str, download: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        limiter = self._host(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            async with limiter.slot():
+                record = await self._loop.run_in_executor(self._executor, download)
+            record["attempts"] = attempt
+            if record.get("status") == "success" or not record.pop("retryable", False) or attempt > self.retries:
+                return record
+            self.retried += 1
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+            retry_after = retry_after_seconds(record.get("retryAfter"))
+            if retry_after is not None:
+                # The server asked the whole host to back off, not just this URL.
+                retry_after = min(retry_after, self.retry_after_max)
+                limiter.pause(retry_after)
+                delay = max(delay, retry_after)
+            started = time.perf_counter()
+            await asyncio.sleep(delay)
+            tracer().record("asset.backoff", started, time.perf_counter(), url=url, attempt=attempt)
+
+    async def _cancel_pending(self) -> None:
+        # Only downloads abandoned by an interrupted run are still pending here.
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._cancel_pending(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def image_variant(url: str) -> tuple[str, int | None] | None:
+    # (base image URL, width) for a ?format=<N>w / ?format=original rendition; width None is the original.
+    parsed = urllib.parse.urlparse(url)
+    if IMAGE_VARIANT_PARAM not in parsed.query:
+        return None
+    params = urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+    values = [value for key, value in params if key == IMAGE_VARIANT_PARAM]
+    if len(values) != 1 or not (match := re.fullmatch(r"(\d+)w|original", values[0])):
+        return None
+    rest = urllib.parse.urlencode([(key, value) for key, value in params if key != IMAGE_VARIANT_PARAM])
+    return parsed._replace(query=rest).geturl(), int(match.group(1)) if match.group(1) else None
+
+
+def parse_variant_widths(spec: str) -> tuple[int, ...]:
+    try:
+        widths = tuple(sorted({int(item.strip().lower().removesuffix("w")) for item in spec.split(",") if item.strip()}))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad width list {spec!r}: use e.g. 500,1000") from None
+    if not widths or widths[0] <= 0:
+        raise argparse.ArgumentTypeError("at least one positive width is needed")
+    return widths
+
+
+class ImageVariants:
+    # Groups the renditions of each image by base URL and decides which of them to download:
+    # "all", "largest" (the widest seen, the original when it is referenced), or "widths" (the largest
+    # plus, per target width, the narrowest rendition at least that wide). Pages arrive one at a time,
+    # so a group's selection only grows; a Squarespace srcset lists every rendition at once anyway.
+    def __init__(self, policy: str = "all", widths: tuple[int, ...] = ()) -> None:
+        self.policy = policy
+        self.widths = widths
+        self.groups: dict[str, dict[str, int | None]] = {}
+        self.selected: set[str] = set()
+
+    @staticmethod
+    def _rank(width: int | None) -> float:
+        return math.inf if width is None else width
+
+    def _choose(self, variants: dict[str, int | None]) -> set[str]:
+        if self.policy == "all":
+            return set(variants)
+        ranked = sorted(variants, key=lambda url: (self._rank(variants[url]), url))
+        chosen = {ranked[-1]}
+        for target in self.widths if self.policy == "widths" else ():
+            chosen.add(next((url for url in ranked if self._rank(variants[url]) >= target), ranked[-1]))
+        return chosen
+
+    def admit(self, urls: list[str]) -> list[str]:
+        # The subset of newly seen URLs to download; not thread-safe, AssetStream calls it under its lock.
+        admitted: list[str] = []
+        touched: set[str] = set()
+        for url in urls:
+            variant = image_variant(url)
+            if variant is None:
+                admitted.append(url)
+                continue
+            self.groups.setdefault(variant[0], {})[url] = variant[1]
+            touched.add(variant[0])
+        for base in touched:
+            chosen = self._choose(self.groups[base]) - self.selected
+            self.selected.update(chosen)
+            admitted.extend(chosen)
+        return sorted(admitted)
+
+    def resolve(self, url: str) -> str:
+        # The downloaded rendition standing in for `url`: the narrowest selected one at least as wide, else
+        # the widest selected one.
+        variant = image_variant(url)
+        if url in self.selected or variant is None or variant[0] not in self.groups:
+            return url
+        group = self.groups[variant[0]]
+        chosen = sorted((url for url in group if url in self.selected), key=lambda item: (self._rank(group[item]), item))
+        if not chosen:
+            return url
+        return next((item for item in chosen if self._rank(group[item]) >= self._rank(variant[1])), chosen[-1])
+
+    def skipped_urls(self) -> set[str]:
+        return {url for group in self.groups.values() for url in group} - self.selected
+
+    def skipped(self) -> int:
+        return len(self.skipped_urls())
+
+    def manifest(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "base": base,
+                "variants": [
+                    {
+                        "url": url,
+                        "width": group[url],
+                        "selected": url in self.selected,
+                        "resolvesTo": self.resolve(url),
+                    }
+                    for url in sorted(group, key=lambda item: (self._rank(group[item]), item))
+                ],
+            }
+            for base, group in sorted(self.groups.items())
+        ]
+
+
+class AssetStream:
+    # Feeds asset URLs into the download engine as page captures land, each URL once per run.
+    def __init__(
+        self,
+        engine: AssetDownloadEngine,
+        download_root: pathlib.Path,
+        output_root: pathlib.Path,
+        reusable: dict[str, dict[str, Any]],
+        previous_dir: pathlib.Path,
+        max_bytes: int | None = None,
+        store: AssetStore | None = None,
+        warc: WarcWriter | None = None,
+        previous_archive: WarcArchive | None = None,
+        journal: RecordJournal | None = None,
+        resumed: dict[str, dict[str, Any]] | None = None,
+        resumed_archive: WarcArchive | None = None,
+        variants: ImageVariants | None = None,
+    ) -> None:
+        self.engine = engine
+        self.variants = variants or ImageVariants()
+        self.journal = journal
+        # Assets an interrupted run already finished (--resume): their files are in place already.
+        self.resumed = resumed or {}
+        self.resumed_archive = resumed_archive
+        self.resumed_count = 0
+        self.max_bytes = max_bytes
+        self.store = store
+        self.warc = warc
+        self.previous_archive = previous_archive
+        self.download_root = download_root
+        self.output_root = output_root
+        self.reusable = reusable
+        self.previous_dir = previous_dir
+        self.urls: set[str] = set()
+        self.carried: list[dict[str, Any]] = []
+        self._records: list[dict[str, Any]] = []
+        self._pending = 0
+        self._lock = threading.Condition()
+
+    def add_page(self, page_data: dict[str, Any]) -> int:
+        found = page_asset_urls(page_data)
+        with self._lock:
+            seen = sorted(found - self.urls)
+            self.urls.update(seen)
+            new_urls = self.variants.admit(seen)
+        for url in new_urls:
+            if self._resume(url):
+                continue
+            previous_asset = self.reusable.get(url)
+            if self.warc is None and previous_asset and previous_asset.get("file") and (self.previous_dir / previous_asset["file"]).exists():
+                carry_forward_file(previous_asset["file"], self.previous_dir, self.output_root)
+                with self._lock:
+                    self.carried.append(previous_asset)
+                self._finish(previous_asset)
+                continue
+            if self.warc is not None and previous_asset and previous_asset.get("warc") and self.previous_archive is not None:
+                location = self.warc.copy(self.previous_archive, url)
+                if location is not None:
+                    carried = {**previous_asset, "warc": location._asdict()}
+                    with self._lock:
+                        self.carried.append(carried)
+                    self._finish(carried)
+                    continue
+            with self._lock:
+                self._pending += 1
+            future = self.engine.submit(url, functools.partial(self._download, url))
+            future.add_done_callback(functools.partial(self._downloaded, url))
+        return len(new_urls)
+
+    def _resume(self, url: str) -> bool:
+        record = self.resumed.get(url)
+        if record is None:
+            return False
+        if self.warc is None and record.get("file") and (self.output_root / record["file"]).exists():
+            # Already in the journal, with its file where it belongs.
+            with self._lock:
+                self.resumed_count += 1
+            return True
+        if self.warc is not None and record.get("warc") and self.resumed_archive is not None:
+            location = self.warc.copy(self.resumed_archive, url)
+            if location is not None:
+                with self._lock:
+                    self.resumed_count += 1
+                self._finish({**record, "warc": location._asdict()})
+                return True
+        return False
+
+    def _finish(self, record: dict[str, Any]) -> None:
+        if self.journal is not None:
+            self.journal.append(record)
+        else:
+            with self._lock:
+                self._records.append(record)
+
+    def _downloaded(self, url: str, future: concurrent.futures.Future[dict[str, Any]]) -> None:
+        # A download cancelled by an interrupted run stays out of the journal, so --resume fetches it.
+        if not future.cancelled():
+            try:
+                record = future.result()
+            except Exception as exc:  # noqa: BLE001
+                record = {"url": url, "status": "error", "error": str(exc), "completedAt": utc_now()}
+            self._finish(record)
+        with self._lock:
+            self._pending -= 1
+            self._lock.notify_all()
+
+    def _download(self, url: str) -> dict[str, Any]:
+        with trace_span("asset.download", url=url):
+            return download_one_asset(
+                url,
+                self.download_root,
+                self.output_root,
+                max_bytes=self.max_bytes,
+                store=self.store,
+                warc=self.warc,
+            )
+
+    def results(self) -> list[dict[str, Any]]:
+        with self._lock:
+            while self._pending:
+                self._lock.wait()
+            records = list(self._records)
+        if self.journal is not None:
+            return self.journal.records()
+        return sorted(records, key=lambda item: item["url"])
 
 
 def asset_target_path(root: pathlib.Path, url: str, content_type: str | None) -> pathlib.Path:
@@ -422,72 +2392,797 @@ def asset_target_path(root: pathlib.Path, url: str, content_type: str | None) ->
     return root / host / pathlib.Path(*parts)
 
 
-def download_one_asset(url: str, download_root: pathlib.Path, output_root: pathlib.Path) -> dict[str, Any]:
+class WarcLocation(NamedTuple):
+    filename: str
+    offset: int
+    length: int
+
+
+class WarcRecord(NamedTuple):
+    headers: dict[str, str]
+    http_status: int | None
+    http_headers: list[tuple[str, str]]
+    body: bytes
+
+
+def surt_key(url: str) -> str:
+    parsed = urllib.parse.urlsplit(url)
+    host = (parsed.hostname or "").lower().removeprefix("www.")
+    if parsed.port and parsed.port not in {80, 443}:
+        host = f"{host}:{parsed.port}"
+    key = ",".join(reversed(host.split("."))) + ")" + (parsed.path or "/")
+    return (key + (f"?{parsed.query}" if parsed.query else "")).lower()
+
+
+def warc_date(value: datetime | None = None) -> str:
+    return (value or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def http_header_block(start_line: str, headers: list[tuple[str, str]]) -> bytes:
+    lines = [start_line, *(f"{name}: {value}" for name, value in headers), "", ""]
+    return "\r\n".join(lines).encode("latin-1", errors="replace")
+
+
+def warc_request_head(resp: DecodedResponse) -> bytes:
+    parsed = urllib.parse.urlsplit(resp.url)
+    path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+    return http_header_block(f"{resp.method} {path} HTTP/1.1", [("Host", parsed.netloc), *resp.request_headers.items()])
+
+
+def warc_response_head(status: int, reason: str, headers: list[tuple[str, str]], length: int) -> bytes:
+    # The stored payload is the whole, decoded body: a resumed 206 is recorded as the 200 it completes,
+    # and transfer/content encodings are dropped so the headers describe the bytes that follow.
+    dropped = {"content-encoding", "transfer-encoding", "content-length", "content-range"}
+    kept = [(name, value) for name, value in headers if name.lower() not in dropped]
+    if status == 206:
+        status, reason = 200, "OK"
+    return http_header_block(f"HTTP/1.1 {status} {reason}", [*kept, ("Content-Length", str(length))])
+
+
+class WarcWriter:
+    # Appends WARC/1.1 records to rotating <prefix>-NNNNN.warc.gz files, one gzip member per record so
+    # any record can be decompressed on its own from its offset, and keeps a CDXJ index of them.
+    def __init__(self, root: pathlib.Path, prefix: str, max_bytes: int = 1024**3) -> None:
+        self.root = root
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.files: list[str] = []
+        self.records = 0
+        self._entries: list[str] = []
+        self._handle: Any = None
+        self._lock = threading.Lock()
+        root.mkdir(parents=True, exist_ok=True)
+        # Index lines are also appended here as records land, so an interrupted run's records stay
+        # findable (WarcArchive reads it) until close() writes index.cdxj.
+        self._journal = (root / WARC_INDEX_JOURNAL).open("a", encoding="utf-8")
+
+    def _rotate(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        serial = len(self.files)
+        # Never reopen a file an earlier run in this directory left behind; its records may still be copied.
+        while (self.root / (filename := f"{self.prefix}-{serial:05d}.warc.gz")).exists():
+            serial += 1
+        self.files.append(filename)
+        self._handle = (self.root / filename).open("wb")
+        info = "software: lovelysunday_capture.py\r\nformat: WARC File Format 1.1\r\n".encode()
+        self._append("warcinfo", None, "application/warc-fields", [], [info], len(info), filename)
+
+    def _append(
+        self,
+        warc_type: str,
+        url: str | None,
+        content_type: str,
+        extra: list[tuple[str, str]],
+        chunks: Iterable[bytes],
+        block_length: int,
+        filename: str | None = None,
+    ) -> WarcLocation:
+        record_id = dict(extra).get("WARC-Record-ID") or f"<urn:uuid:{uuid.uuid4()}>"
+        headers = [
+            ("WARC-Type", warc_type),
+            ("WARC-Record-ID", record_id),
+            ("WARC-Date", warc_date()),
+            *([("WARC-Target-URI", url)] if url else []),
+            *([("WARC-Filename", filename)] if filename else []),
+            *[(name, value) for name, value in extra if name != "WARC-Record-ID"],
+            ("Content-Type", content_type),
+            ("Content-Length", str(block_length)),
+        ]
+        offset = self._handle.tell()
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._handle.write(compressor.compress(http_header_block("WARC/1.1", headers)))
+        for chunk in chunks:
+            self._handle.write(compressor.compress(chunk))
+        self._handle.write(compressor.compress(b"\r\n\r\n") + compressor.flush())
+        self.records += 1
+        return WarcLocation(self.files[-1], offset, self._handle.tell() - offset)
+
+    def _index(self, line: str) -> None:
+        # The record's bytes reach the file before its index line reaches the journal.
+        self._handle.flush()
+        self._entries.append(line)
+        self._journal.write(line + "\n")
+        self._journal.flush()
+
+    def _write(
+        self,
+        records: list[tuple[str, str, list[tuple[str, str]], Iterable[bytes], int]],
+        url: str,
+        index: dict[str, Any],
+    ) -> WarcLocation:
+        # Records written together (request + response) stay adjacent in one file; the index points at the last.
+        with self._lock:
+            if self._handle is None or self._handle.tell() >= self.max_bytes:
+                self._rotate()
+            locations = [self._append(warc_type, url, *rest) for warc_type, *rest in records]
+            location = locations[-1]
+            entry = {**index, "url": url, "offset": location.offset, "length": location.length, "filename": location.filename}
+            self._index(f"{surt_key(url)} {re.sub(r'[^0-9]', '', warc_date())} {json.dumps(entry)}")
+            return location
+
+    def write_resource(self, url: str, body: bytes, content_type: str) -> WarcLocation:
+        sha256 = hashlib.sha256(body).hexdigest()
+        digest = [("WARC-Payload-Digest", "sha256:" + base64.b32encode(bytes.fromhex(sha256)).decode())]
+        record = ("resource", content_type, digest, [body], len(body))
+        return self._write([record], url, {"mime": content_type.split(";")[0], "status": None, "sha256": sha256})
+
+    def write_exchange(
+        self,
+        url: str,
+        request_head: bytes,
+        response_head: bytes,
+        payload: pathlib.Path,
+        sha256: str,
+        status: int,
+        content_type: str,
+    ) -> WarcLocation:
+        size = payload.stat().st_size
+        response_id = f"<urn:uuid:{uuid.uuid4()}>"
+
+        def body() -> Iterator[bytes]:
+            yield response_head
+            with payload.open("rb") as handle:
+                while chunk := handle.read(HTTP_CHUNK_SIZE):
+                    yield chunk
+
+        digest = ("WARC-Payload-Digest", "sha256:" + base64.b32encode(bytes.fromhex(sha256)).decode())
+        records = [
+            (
+                "request",
+                "application/http;msgtype=request",
+                [("WARC-Concurrent-To", response_id)],
+                [request_head],
+                len(request_head),
+            ),
+            (
+                "response",
+                "application/http;msgtype=response",
+                [("WARC-Record-ID", response_id), digest],
+                body(),
+                len(response_head) + size,
+            ),
+        ]
+        status = 200 if status in {206, 304} else status
+        return self._write(records, url, {"mime": content_type.split(";")[0], "status": status, "sha256": sha256})
+
+    def copy(self, archive: WarcArchive, url: str) -> WarcLocation | None:
+        # Carries an indexed record over from an earlier capture's archive byte for byte.
+        entry = archive.index.get(url)
+        if entry is None:
+            return None
+        with (archive.root / entry["filename"]).open("rb") as handle:
+            handle.seek(entry["offset"])
+            member = handle.read(entry["length"])
+        with self._lock:
+            if self._handle is None or self._handle.tell() >= self.max_bytes:
+                self._rotate()
+            location = WarcLocation(self.files[-1], self._handle.tell(), len(member))
+            self._handle.write(member)
+            self.records += 1
+            index = {key: value for key, value in entry.items() if key not in {"timestamp", "offset", "length", "filename"}}
+            index.update(offset=location.offset, length=location.length, filename=location.filename)
+            self._index(f"{surt_key(url)} {entry['timestamp']} {json.dumps(index)}")
+            return location
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            write_text(self.root / "index.cdxj", "".join(f"{line}\n" for line in sorted(self._entries)))
+            self._journal.close()
+            (self.root / WARC_INDEX_JOURNAL).unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            size = sum((self.root / name).stat().st_size for name in self.files if (self.root / name).exists())
+            return {"files": len(self.files), "records": self.records, "bytes": size}
+
+
+class WarcArchive:
+    # Random access into a capture's WARC files through its CDXJ index; nothing is unpacked to disk.
+    def __init__(self, root: pathlib.Path) -> None:
+        self.root = root
+        self.index: dict[str, dict[str, Any]] = {}
+        # An interrupted run leaves its records in the journal only.
+        for index_file in [root / "index.cdxj", root / WARC_INDEX_JOURNAL]:
+            if not index_file.exists():
+                continue
+            for line in read_text(index_file).splitlines():
+                try:
+                    _, timestamp, payload = line.split(" ", 2)
+                    entry = {**json.loads(payload), "timestamp": timestamp}
+                except ValueError:
+                    continue  # a journal line cut short by the interruption
+                current = self.index.get(entry["url"])
+                if current is None or current["timestamp"] <= timestamp:
+                    self.index[entry["url"]] = entry
+
+    def urls(self) -> list[str]:
+        return sorted(self.index)
+
+    def read(self, location: WarcLocation | dict[str, Any]) -> WarcRecord:
+        if isinstance(location, dict):
+            location = WarcLocation(location["filename"], location["offset"], location["length"])
+        with (self.root / location.filename).open("rb") as handle:
+            handle.seek(location.offset)
+            data = zlib.decompress(handle.read(location.length), 16 + zlib.MAX_WBITS)
+        head, _, block = data.partition(b"\r\n\r\n")
+        lines = head.decode("utf-8", errors="replace").split("\r\n")[1:]
+        headers = dict(line.split(": ", 1) for line in lines if ": " in line)
+        block = block[: int(headers.get("Content-Length", len(block)))]
+        if not headers.get("Content-Type", "").startswith("application/http"):
+            return WarcRecord(headers, None, [], block)
+        http_head, _, body = block.partition(b"\r\n\r\n")
+        http_lines = http_head.decode("latin-1").split("\r\n")
+        status = int(http_lines[0].split(" ", 2)[1]) if http_lines[0].startswith("HTTP/") else None
+        http_headers = [tuple(line.split(": ", 1)) for line in http_lines[1:] if ": " in line]
+        return WarcRecord(headers, status, http_headers, body)  # type: ignore[arg-type]
+
+    def get(self, url: str) -> WarcRecord | None:
+        entry = self.index.get(url)
+        return self.read(entry) if entry else None
+
+
+class AssetTooLargeError(RuntimeError):
+    pass
+
+
+def clone_file(source: pathlib.Path, target: pathlib.Path) -> str:
+    # Reflink (copy-on-write) where the filesystem supports it, else hardlink, else a plain copy.
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.unlink(missing_ok=True)
+    if fcntl is not None:
+        try:
+            with source.open("rb") as src, target.open("wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return "reflink"
+        except OSError:
+            target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+        return "hardlink"
+    except OSError:
+        shutil.copyfile(source, target)
+        return "copy"
+
+
+class AssetStore:
+    # Content-addressed blobs shared across runs (objects/<sha256[:2]>/<sha256>) plus a URL index
+    # holding the validators used to revalidate with If-None-Match / If-Modified-Since.
+    def __init__(self, root: pathlib.Path) -> None:
+        self.root = root
+        (root / "objects").mkdir(parents=True, exist_ok=True)
+        self.index_file = root / "index.json"
+        self.urls: dict[str, dict[str, Any]] = {}
+        if self.index_file.exists():
+            try:
+                self.urls = json.loads(read_text(self.index_file)).get("urls", {})
+            except (OSError, ValueError):
+                self.urls = {}
+        self.counts: collections.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def object_path(self, sha256: str) -> pathlib.Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def lookup(self, url: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self.urls.get(url)
+        if entry and self.object_path(entry["sha256"]).exists():
+            return entry
+        return None
+
+    def put_file(self, path: pathlib.Path, sha256: str) -> bool:
+        target = self.object_path(sha256)
+        if target.exists():
+            path.unlink(missing_ok=True)
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(path), str(target))
+        return True
+
+    def remember(self, url: str, entry: dict[str, Any], outcome: str) -> None:
+        with self._lock:
+            self.urls[url] = entry
+            self.counts[outcome] += 1
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {"updatedAt": utc_now(), "urls": dict(sorted(self.urls.items()))}
+        temp = self.index_file.with_suffix(".json.tmp")
+        write_json(temp, payload)
+        os.replace(temp, self.index_file)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"root": self.root.as_posix(), "urls": len(self.urls), **dict(sorted(self.counts.items()))}
+
+
+def partial_download_paths(download_root: pathlib.Path, url: str) -> tuple[pathlib.Path, pathlib.Path]:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return download_root / ".partial" / f"{key}.part", download_root / ".partial" / f"{key}.json"
+
+
+def content_range_start(value: str | None) -> int | None:
+    match = re.match(r"bytes\s+(\d+)-", value or "")
+    return int(match.group(1)) if match else None
+
+
+def download_one_asset(
+    url: str,
+    download_root: pathlib.Path,
+    output_root: pathlib.Path,
+    client: HttpClient | None = None,
+    max_bytes: int | None = None,
+    store: AssetStore | None = None,
+    warc: WarcWriter | None = None,
+) -> dict[str, Any]:
+    # Streams the body to a .part file while hashing it, then renames it into place, so memory
+    # stays flat for large media. A .part left by an interrupted transfer is resumed with Range.
+    # With a store, known URLs are revalidated and unchanged bodies are linked from the store.
+    # With a WARC writer, the finished body goes into the archive with its HTTP headers instead.
     started_at = utc_now()
-    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    part, meta_file = partial_download_paths(download_root, url)
+    cached = store.lookup(url) if store is not None else None
     try:
-        with urllib.request.urlopen(req, timeout=45) as resp:  # noqa: S310
-            body = resp.read()
-            status = getattr(resp, "status", 200)
+        offset = 0
+        meta: dict[str, Any] = {}
+        if part.exists() and meta_file.exists():
+            try:
+                meta = json.loads(read_text(meta_file))
+            except (OSError, ValueError):
+                meta = {}
+            if meta.get("url") == url:
+                offset = part.stat().st_size
+        headers = {}
+        if offset:
+            # Resume against the identity representation; If-Range returns a changed asset whole.
+            headers = {"Range": f"bytes={offset}-", "Accept-Encoding": "identity"}
+            if meta.get("etag") or meta.get("lastModified"):
+                headers["If-Range"] = meta.get("etag") or meta.get("lastModified")
+        elif cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("lastModified"):
+                headers["If-Modified-Since"] = cached["lastModified"]
+
+        with (client or http_client()).open(url, headers=headers, timeout=45) as resp:
+            status = resp.status
             content_type = resp.headers.get("Content-Type", "")
+            request_head = warc_request_head(resp)
+            if status == 304 and cached and store is not None:
+                resp.read()
+                store.remember(url, {**cached, "revalidatedAt": utc_now()}, "revalidated")
+                record = {
+                    "url": url,
+                    "status": "success",
+                    "httpStatus": 304,
+                    "contentType": cached.get("contentType", ""),
+                    "bytes": cached.get("bytes"),
+                    "sha256": cached["sha256"],
+                    "store": "revalidated",
+                    "startedAt": started_at,
+                }
+                stored = store.object_path(cached["sha256"])
+                if warc is not None:
+                    # Archived as the full response the 304 confirmed, rebuilt from the stored validators.
+                    cached_headers = [
+                        (name, cached[key])
+                        for name, key in [("Content-Type", "contentType"), ("ETag", "etag"), ("Last-Modified", "lastModified")]
+                        if cached.get(key)
+                    ]
+                    response_head = warc_response_head(200, "OK", cached_headers, stored.stat().st_size)
+                    location = warc.write_exchange(
+                        url, request_head, response_head, stored, cached["sha256"], 304, cached.get("contentType", "")
+                    )
+                    record["warc"] = location._asdict()
+                else:
+                    target = asset_target_path(download_root, url, cached.get("contentType"))
+                    record["link"] = clone_file(stored, target)
+                    record["file"] = target.relative_to(output_root).as_posix()
+                record["completedAt"] = utc_now()
+                return record
+            resumed_from = offset if status == 206 and content_range_start(resp.headers.get("Content-Range")) == offset else 0
+            length = resp.headers.get("Content-Length") or ""
+            if max_bytes and length.isdigit() and resumed_from + int(length) > max_bytes:
+                raise AssetTooLargeError(f"asset exceeds --max-asset-bytes ({resumed_from + int(length)} > {max_bytes})")
+            part.parent.mkdir(parents=True, exist_ok=True)
+            write_json(
+                meta_file,
+                {"url": url, "etag": resp.headers.get("ETag"), "lastModified": resp.headers.get("Last-Modified")},
+            )
+            digest = hashlib.sha256()
+            size = 0
+            with part.open("r+b" if resumed_from else "wb") as handle:
+                while resumed_from and size < resumed_from and (chunk := handle.read(min(HTTP_CHUNK_SIZE, resumed_from - size))):
+                    digest.update(chunk)
+                    size += len(chunk)
+                while chunk := resp.read(HTTP_CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise AssetTooLargeError(f"asset exceeds --max-asset-bytes ({size}+ > {max_bytes})")
+                    digest.update(chunk)
+                    handle.write(chunk)
+            # http.client's read(n) returns short instead of raising when the peer hangs up early.
+            if length.isdigit() and not resp.headers.get("Content-Encoding") and size != resumed_from + int(length):
+                raise http.client.IncompleteRead(b"", resumed_from + int(length) - size)
+            response_head = warc_response_head(status, resp.reason, list(resp.headers.items()), size)
+
         target = asset_target_path(download_root, url, content_type)
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_bytes(body)
-        digest = hashlib.sha256(body).hexdigest()
-        return {
+        sha256 = digest.hexdigest()
+        link = None
+        payload = part
+        if store is not None:
+            outcome = "stored" if store.put_file(part, sha256) else "deduplicated"
+            payload = store.object_path(sha256)
+            if warc is None:
+                link = clone_file(payload, target)
+            store.remember(
+                url,
+                {
+                    "sha256": sha256,
+                    "bytes": size,
+                    "contentType": content_type,
+                    "etag": resp.headers.get("ETag"),
+                    "lastModified": resp.headers.get("Last-Modified"),
+                    "fetchedAt": utc_now(),
+                },
+                outcome,
+            )
+        elif warc is None:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, target)
+        location = None
+        if warc is not None:
+            location = warc.write_exchange(url, request_head, response_head, payload, sha256, status, content_type)
+            part.unlink(missing_ok=True)
+        meta_file.unlink(missing_ok=True)
+        record = {
             "url": url,
             "status": "success",
             "httpStatus": status,
             "contentType": content_type,
-            "bytes": len(body),
-            "sha256": digest,
-            "file": target.relative_to(output_root).as_posix(),
+            "bytes": size,
+            "sha256": sha256,
+            **({"warc": location._asdict()} if location else {"file": target.relative_to(output_root).as_posix()}),
             "startedAt": started_at,
             "completedAt": utc_now(),
         }
-    except Exception as exc:  # noqa: BLE001
+        if resumed_from:
+            record["resumedFrom"] = resumed_from
+        if store is not None:
+            record["store"] = outcome
+            if link is not None:
+                record["link"] = link
+        return record
+    except AssetTooLargeError as exc:
+        part.unlink(missing_ok=True)
+        meta_file.unlink(missing_ok=True)
         return {
             "url": url,
             "status": "error",
             "error": str(exc),
+            "skipped": "max_asset_bytes",
             "startedAt": started_at,
             "completedAt": utc_now(),
         }
+    except Exception as exc:  # noqa: BLE001
+        # Any .part written so far stays behind for a Range resume on the next attempt.
+        record = {
+            "url": url,
+            "status": "error",
+            "error": str(exc),
+            "retryable": is_retryable_error(exc),
+            "startedAt": started_at,
+            "completedAt": utc_now(),
+        }
+        if isinstance(exc, HttpStatusError):
+            record["httpStatus"] = exc.status
+            if exc.headers.get("Retry-After"):
+                record["retryAfter"] = exc.headers.get("Retry-After")
+        return record
+
+
+class LiveFieldParser(HTMLParser):
+    # Reads the page_verify.js fields straight from server HTML: first non-SVG <title>, the canonical link
+    # (resolved against the page URL, not <base>, like the scripts' toAbs), h1 text, img and a[href] counts,
+    # and the main-text hash. Content the browser never renders as elements (noscript with scripting on,
+    # template) is not counted.
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title: str | None = None
+        self.canonical: str | None = None
+        self.h1: list[str] = []
+        self.image_count = 0
+        self.link_count = 0
+        self._title_parts: list[str] | None = None
+        self._h1_parts: list[str] | None = None
+        self._hidden = 0
+        self._svg = 0
+        self._main_tag: str | None = None
+        self._main_depth = 0
+        self._main_done = False
+        self._main_parts: list[str] = []
+        self._body_parts: list[str] = []
+        self._raw_text = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attr = {key: value or "" for key, value in attrs}
+        if tag in {"noscript", "template"}:
+            self._hidden += 1
+        elif tag in {"script", "style"}:
+            self._raw_text += 1
+        if self._hidden:
+            return
+        if tag == "svg":
+            self._svg += 1
+        elif tag == "title" and self.title is None and not self._svg:
+            self._title_parts = []
+        elif tag == "link" and self.canonical is None and attr.get("rel", "").lower() == "canonical":
+            self.canonical = attr.get("href", "").strip()
+        elif tag == "img":
+            self.image_count += 1
+        elif tag == "a" and "href" in attr:
+            self.link_count += 1
+        elif tag == "h1" and self._h1_parts is None:
+            self._h1_parts = []
+
+        if self._main_tag == tag:
+            self._main_depth += 1
+        elif self._main_tag is None and not self._main_done:
+            if tag in {"main", "article"} or attr.get("role", "").strip().lower() == "main":
+                self._main_tag = tag
+                self._main_depth = 1
+        if tag in TEXT_BLOCK_TAGS:
+            self._text(" ")
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.handle_starttag(tag, attrs)
+        # "/>" only closes an element in SVG content; on HTML elements the browser ignores it.
+        if self._svg:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in {"noscript", "template"}:
+            self._hidden = max(self._hidden - 1, 0)
+            return
+        if tag in {"script", "style"}:
+            self._raw_text = max(self._raw_text - 1, 0)
+            return
+        if self._hidden:
+            return
+        if tag == "svg":
+            self._svg = max(self._svg - 1, 0)
+        elif tag == "title" and self._title_parts is not None:
+            self.title = clean_text("".join(self._title_parts))
+            self._title_parts = None
+        elif tag == "h1" and self._h1_parts is not None:
+            text = clean_text("".join(self._h1_parts))
+            if text:
+                self.h1.append(text)
+            self._h1_parts = None
+        if tag in TEXT_BLOCK_TAGS:
+            self._text(" ")
+        if self._main_tag == tag:
+            self._main_depth -= 1
+            if self._main_depth <= 0:
+                self._main_tag = None
+                self._main_done = True
+
+    def handle_data(self, data: str) -> None:
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self._hidden or self._raw_text:
+            return
+        if self._h1_parts is not None:
+            self._h1_parts.append(data)
+        self._text(data)
+
+    def _text(self, data: str) -> None:
+        if self._title_parts is not None:
+            return
+        self._body_parts.append(data)
+        if self._main_tag is not None:
+            self._main_parts.append(data)
+
+    def result(self, url: str) -> dict[str, Any]:
+        main_text = clean_text("".join(self._main_parts if self._main_done or self._main_tag else self._body_parts))
+        canonical = urllib.parse.urljoin(url, self.canonical) if self.canonical else None
+        return {
+            "checkedAt": utc_now(),
+            "url": url,
+            "title": self.title or "",
+            "canonical": canonical,
+            "h1": self.h1,
+            "imageCount": self.image_count,
+            "linkCount": self.link_count,
+            "mainTextHash": js_string_hash(main_text),
+        }
+
+
+def clean_text(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def js_string_hash(text: str) -> int:
+    # Same 31-multiplier hash page_verify.js computes, over UTF-16 code units like charCodeAt().
+    value = 0
+    encoded = text.encode("utf-16-be", "surrogatepass")
+    for index in range(0, len(encoded), 2):
+        value = (value * 31 + (encoded[index] << 8 | encoded[index + 1])) & 0xFFFFFFFF
+    return value
+
+
+def response_charset(headers: Any) -> str:
+    match = re.search(r"charset=[\"']?([\w.:-]+)", headers.get("Content-Type") or "", re.I)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def extract_live_fields(url: str, timeout: int = 45) -> dict[str, Any]:
+    # Feed the body to the parser as it arrives rather than buffering the whole document first.
+    with http_client().open(url, headers={"Accept": "text/html,application/xhtml+xml"}, timeout=timeout) as resp:
+        parser = LiveFieldParser()
+        decoder = codecs.getincrementaldecoder(response_charset(resp.headers))(errors="replace")
+        while chunk := resp.read(HTTP_CHUNK_SIZE):
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        return parser.result(resp.url)
+
+
+def http_verify_worker(
+    worker_id: int,
+    queue: UrlQueue,
+    fallback_queue: UrlQueue,
+    store: PageStore,
+    progress_lock: threading.Lock,
+    fallbacks: dict[str, list[str]],
+    on_record: Callable[[dict[str, Any]], None],
+) -> int:
+    # Pages whose server HTML disagrees with the capture (or cannot be fetched) go to fallback_queue,
+    # where a browser verify_worker re-checks them against the rendered DOM.
+    threading.current_thread().name = f"verify-http-{worker_id}"
+    finished = 0
+    while (url := queue.get()) is not None:
+        page_started = time.perf_counter()
+        item: dict[str, Any] = {"url": url, "worker": worker_id, "status": "error", "verifyMode": "http"}
+        try:
+            item["live"] = extract_live_fields(url)
+            item["status"] = "success"
+        except Exception as exc:  # noqa: BLE001
+            item["error"] = str(exc)
+        page_ended = time.perf_counter()
+        item["durationMs"] = round((page_ended - page_started) * 1000)
+        tracer().record("verify.http_page", page_started, page_ended, url=url, status=item["status"])
+
+        fields = ["fetch"] if item["status"] != "success" else []
+        captured = store.get(url) if not fields else None
+        if captured is not None:
+            fields = capture_mismatch_fields(captured, item["live"])
+        if fields:
+            fallbacks[url] = fields
+            fallback_queue.put(url)
+        else:
+            on_record(item)
+            finished += 1
+        done = queue.mark_done()
+        with progress_lock:
+            status = f"fallback={','.join(fields)}" if fields else "status=success"
+            print(f"[verify] http worker={worker_id} page={done}/{queue.total} {status} url={url}")
+
+    return finished
 
 
 def verify_worker(
     worker_id: int,
-    urls: list[str],
+    queue: UrlQueue,
     verify_js: str,
     env: dict[str, str],
     progress_lock: threading.Lock,
-) -> list[dict[str, Any]]:
+    on_record: Callable[[dict[str, Any]], None],
+    ready: tuple[list[str], int] = (["wait", str(FIXED_WAIT_MS)], 45),
+    block_requests: bool = False,
+    retries: int = 0,
+) -> int:
     session = f"verify-{worker_id}"
-    records: list[dict[str, Any]] = []
-
-    for index, url in enumerate(urls, start=1):
-        item: dict[str, Any] = {"url": url, "worker": worker_id, "status": "error"}
+    threading.current_thread().name = f"verify-{worker_id}"
+    finished = 0
+    if block_requests:
+        start_request_blocking(session, env, progress_lock)
+
+    while (url := queue.get()) is not None:
+        page_started = time.perf_counter()
+        item: dict[str, Any] = {
+            "url": url,
+            "worker": worker_id,
+            "status": "error",
+            "verifyMode": "browser",
+            "attempts": queue.start_attempt(url),
+        }
         try:
-            set_viewport(session, *DESKTOP_VIEWPORT, env=env)
-            agent_browser(session, ["open", url], env=env, timeout=150)
-            agent_browser(session, ["wait", "1200"], env=env, timeout=45)
-            raw = agent_browser(session, ["eval", verify_js], env=env, timeout=120)
-            item["live"] = json.loads(raw)
+            outputs = agent_browser_batch(
+                session,
+                [
+                    (viewport_args(*DESKTOP_VIEWPORT), 45),
+                    (["open", browser_url(url)], 150),
+                    ready,
+                    (["eval", verify_js], 120),
+                ],
+                env=env,
+            )
+            item["readiness"] = parse_readiness(ready[0], outputs[2])
+            item["readyWaitMs"] = item["readiness"].get("waitedMs")
+            item["live"] = from_browser(json.loads(outputs[3]))
             item["status"] = "success"
         except Exception as exc:  # noqa: BLE001
             item["error"] = str(exc)
+            requeued = handle_page_failure(queue, item, exc, session, env, retries)
+            if item["failureClass"] == "dead_session" and block_requests:
+                start_request_blocking(session, env, progress_lock)
+            if requeued:
+                tracer().record("verify.page", page_started, time.perf_counter(), url=url, status="retry")
+                with progress_lock:
+                    print(f"[verify] worker={worker_id} retry={item['attempts']} failure={item['failureClass']} url={url}")
+                continue
 
-        records.append(item)
+        page_ended = time.perf_counter()
+        item["durationMs"] = round((page_ended - page_started) * 1000)
+        tracer().record("verify.page", page_started, page_ended, url=url, status=item["status"])
+        on_record(item)
+        finished += 1
+        done = queue.mark_done()
         with progress_lock:
-            print(f"[verify] worker={worker_id} page={index}/{len(urls)} status={item['status']} url={url}")
+            print(f"[verify] worker={worker_id} page={done}/{queue.total} status={item['status']} url={url}")
+
+    return finished
 
-    return records
+
+def capture_mismatch_fields(captured: dict[str, Any], live: dict[str, Any]) -> list[str]:
+    issues = []
+    if (captured.get("title") or "").strip() != (live.get("title") or "").strip():
+        issues.append("title")
+    if normalize_url(captured.get("canonical") or "") != normalize_url(live.get("canonical") or ""):
+        issues.append("canonical")
+    captured_h1 = [h.strip() for h in captured.get("headings", {}).get("h1", []) if h and h.strip()]
+    live_h1 = [h.strip() for h in live.get("h1", []) if h and h.strip()]
+    if captured_h1 != live_h1:
+        issues.append("h1")
+    if captured.get("counts", {}).get("images") != live.get("imageCount"):
+        issues.append("imageCount")
+    return issues
 
 
 def compare_live_to_capture(
     crawl_records: list[dict[str, Any]],
     verify_records: list[dict[str, Any]],
-    output_root: pathlib.Path,
+    store: PageStore,
 ) -> dict[str, Any]:
     by_url: dict[str, dict[str, Any]] = {}
     for record in crawl_records:
@@ -505,29 +3200,17 @@ def compare_live_to_capture(
             mismatches.append({"url": url, "status": "verify_error", "error": verify_item.get("error")})
             continue
 
-        crawl_record = by_url.get(url)
-        if not crawl_record:
+        captured = store.get(url) if url in by_url else None
+        if captured is None:
             errors += 1
             mismatches.append({"url": url, "status": "missing_capture_record"})
             continue
 
-        page_file = pathlib.Path(crawl_record["jsonFile"])
-        if not page_file.is_absolute():
-            page_file = output_root / page_file
-        captured = json.loads(read_text(page_file))
         live = verify_item["live"]
 
-        issues = []
-        if (captured.get("title") or "").strip() != (live.get("title") or "").strip():
-            issues.append("title")
-        if normalize_url(captured.get("canonical") or "") != normalize_url(live.get("canonical") or ""):
-            issues.append("canonical")
+        issues = capture_mismatch_fields(captured, live)
         captured_h1 = [h.strip() for h in captured.get("headings", {}).get("h1", []) if h and h.strip()]
         live_h1 = [h.strip() for h in live.get("h1", []) if h and h.strip()]
-        if captured_h1 != live_h1:
-            issues.append("h1")
-        if captured.get("counts", {}).get("images") != live.get("imageCount"):
-            issues.append("imageCount")
 
         if issues:
             mismatches.append(
@@ -568,7 +3251,190 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--site", default="https://www.lovelysunday.co/", help="Base site URL")
     parser.add_argument("--workers", type=int, default=4, help="Parallel agent workers")
     parser.add_argument("--asset-workers", type=int, default=8, help="Parallel asset download workers")
+    parser.add_argument(
+        "--http-per-host",
+        type=int,
+        default=8,
+        help="Max concurrent keep-alive connections per host for sitemap, probe and asset fetches",
+    )
+    parser.add_argument(
+        "--page-retries",
+        type=int,
+        default=0,
+        help="Requeue pages whose crawl or browser verify failed (timeout, navigation, eval, dead session) "
+        "up to this many extra times; 4xx pages are recorded without retrying",
+    )
+    parser.add_argument(
+        "--asset-retries",
+        type=int,
+        default=4,
+        help="Extra attempts for asset downloads that time out, drop the connection, or answer 408/429/5xx",
+    )
+    parser.add_argument(
+        "--asset-backoff-ms",
+        type=int,
+        default=500,
+        help="Base of the jittered exponential backoff between asset attempts (Retry-After wins when longer)",
+    )
+    parser.add_argument(
+        "--asset-host-rate",
+        type=float,
+        default=0.0,
+        help="Max asset request starts per second per host (0 = unlimited; concurrency is capped by --http-per-host)",
+    )
+    parser.add_argument(
+        "--max-asset-bytes",
+        type=int,
+        default=0,
+        help="Skip assets larger than this many bytes (0 = no limit)",
+    )
+    parser.add_argument(
+        "--image-variants",
+        choices=IMAGE_VARIANT_POLICIES,
+        default="all",
+        help="Which ?format=<N>w renditions of each image to download: all, the largest only, or the largest "
+        "plus the narrowest rendition covering each --image-variant-widths target",
+    )
+    parser.add_argument(
+        "--image-variant-widths",
+        type=parse_variant_widths,
+        default=parse_variant_widths("500,1000"),
+        help="Target widths for --image-variants widths (comma separated)",
+    )
+    parser.add_argument(
+        "--asset-store",
+        default="",
+        help="Content-addressed asset store shared across runs; output files are reflinked/hardlinked from it",
+    )
     parser.add_argument("--output", default="", help="Output directory (default: capture/lovelysunday-<timestamp>)")
+    parser.add_argument(
+        "--previous",
+        default="",
+        help="Previous capture output used for page weights (default: --output, when it already holds a capture)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-render pages that changed since --previous; carry the rest of its artifacts forward",
+    )
+    parser.add_argument(
+        "--crawl-order",
+        choices=CRAWL_ORDERS,
+        default="weight",
+        help="Crawl queue order: slowest pages of --previous first, highest sitemap <priority> first, "
+        "or most recent sitemap <lastmod> first",
+    )
+    parser.add_argument(
+        "--discover-links",
+        action="store_true",
+        help="Feed internal links found on captured pages back into the crawl (breadth-first), "
+        "so pages missing from the sitemap and nav are captured in the same run",
+    )
+    parser.add_argument(
+        "--max-link-depth",
+        type=int,
+        default=3,
+        help="With --discover-links, follow links at most this many hops from a sitemap/nav page",
+    )
+    parser.add_argument(
+        "--max-discovered-pages",
+        type=int,
+        default=500,
+        help="With --discover-links, stop admitting new pages after this many (0 = no limit)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Finish an interrupted run in --output: skip pages, assets and verifications its journals "
+        "(manifests/journal/*.jsonl) record as done",
+    )
+    parser.add_argument(
+        "--readiness",
+        choices=READINESS_MODES,
+        default="fixed",
+        help="How to decide a page is ready after open: fixed 1200 ms sleep, document load, "
+        "load + quiet network, or load + quiet network + in-viewport images complete",
+    )
+    parser.add_argument(
+        "--readiness-timeout-ms",
+        type=int,
+        default=10000,
+        help="Upper bound on the adaptive readiness wait",
+    )
+    parser.add_argument(
+        "--extract-profile",
+        choices=sorted(EXTRACT_PROFILES),
+        default="full",
+        help="Sections page_extract.js returns: inventory (links, nav, meta), assets (every asset reference), "
+        "content (text, meta, links, images), or full; title, canonical, h1 and counts are always kept",
+    )
+    parser.add_argument(
+        "--extract-dedupe",
+        action="store_true",
+        help="Drop repeated entries (links, images, resources, ...) from page_extract.js list sections in the page",
+    )
+    parser.add_argument(
+        "--extract-compact-urls",
+        action="store_true",
+        help="Send repeated URL prefixes from page_extract.js once, as a prefix table expanded on arrival",
+    )
+    parser.add_argument(
+        "--viewports",
+        type=parse_viewports,
+        default=DEFAULT_VIEWPORTS,
+        help="Comma-separated screenshot viewports: presets (" + ", ".join(VIEWPORT_PRESETS) + "), widths, or "
+        "NAME=WIDTHxHEIGHT; the first is the one the page is extracted in (default: desktop,mobile)",
+    )
+    parser.add_argument(
+        "--viewport-mode",
+        choices=VIEWPORT_MODES,
+        default="resize",
+        help="resize: each crawl session resizes through the viewports on every page; sessions: every extra "
+        "viewport gets its own fixed-size session per crawl worker, screenshotting the same URL in parallel",
+    )
+    parser.add_argument(
+        "--block-runtime-requests",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Abort telemetry/runtime-host and first-party /api/ requests inside crawl and verify sessions",
+    )
+    parser.add_argument(
+        "--archive",
+        choices=["files", "warc"],
+        default="files",
+        help="files: raw HTML and assets as loose files; warc: stream them into gzipped WARC files under warc/ "
+        "with HTTP headers and a CDXJ index (read back with capture_warc.py)",
+    )
+    parser.add_argument(
+        "--warc-max-bytes",
+        type=int,
+        default=1024**3,
+        help="Start a new WARC file once the current one reaches this size",
+    )
+    parser.add_argument(
+        "--page-json",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=f"Export page_json/<page_id>.json from {PAGE_STORE_FILE} at the end of the run",
+    )
+    parser.add_argument(
+        "--verify-mode",
+        choices=VERIFY_MODES,
+        default="browser",
+        help="browser: reload every page in a second browser pass; http: parse the server HTML over the pooled "
+        "client and only fall back to the browser for pages whose fields disagree with the capture",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Write a Chrome trace-event file (manifests/trace.json) with every span of the run",
+    )
+    parser.add_argument(
+        "--replay",
+        default="",
+        help="Origin of a capture_replay.py server (e.g. http://127.0.0.1:8765): answer every page, sitemap, "
+        "probe and asset request from that finished capture instead of the live site",
+    )
     return parser.parse_args()
 
 
@@ -578,6 +3444,7 @@ def build_asset_filter_rules() -> dict[str, Any]:
         "runtimeHostBlocklist": sorted(RUNTIME_HOST_BLOCKLIST),
         "staticHostAllowlist": sorted(STATIC_HOST_ALLOWLIST),
         "allowedAssetInitiatorTypes": sorted(ASSET_INITIATOR_ALLOWLIST),
+        "browserBlockPatterns": browser_block_patterns(),
         "rules": [
             {
                 "id": "reject_runtime_hosts",
@@ -617,38 +3484,80 @@ def build_asset_filter_rules() -> dict[str, Any]:
 def main() -> int:
     args = parse_args()
     start = time.time()
+    configure_tracer(args.trace)
+    stage_started = time.perf_counter()
 
     scripts_dir = pathlib.Path(__file__).resolve().parent
     capture_root = scripts_dir.parent
     repo_root = capture_root.parent
     output_dir = pathlib.Path(args.output) if args.output else (capture_root / f"lovelysunday-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    previous_dir = pathlib.Path(args.previous) if args.previous else output_dir
+    previous = load_previous_capture(previous_dir)
+    page_store = PageStore(output_dir / PAGE_STORE_FILE)
+    if (previous_dir / PAGE_STORE_FILE).resolve() == page_store.path.resolve():
+        previous_store: PageStore | None = page_store
+    else:
+        previous_store = PageStore.open_existing(previous_dir / PAGE_STORE_FILE)
     for rel in [
         "manifests",
         "logs",
         "raw_html",
         "page_json",
-        "screenshots/desktop",
-        "screenshots/mobile",
+        *(f"screenshots/{viewport.name}" for viewport in args.viewports),
         "assets/downloads",
     ]:
         (output_dir / rel).mkdir(parents=True, exist_ok=True)
 
     env = dict(os.environ)
     env["HOME"] = "/tmp"
+    client = configure_http_client(args.http_per_host, proxy=args.replay or None)
+    asset_store = AssetStore(pathlib.Path(args.asset_store)) if args.asset_store else None
+    warc = None
+    if args.archive == "warc":
+        warc = WarcWriter(output_dir / "warc", f"capture-{datetime.now().strftime('%Y%m%d-%H%M%S')}", args.warc_max_bytes)
+    previous_archive = WarcArchive(previous_dir / "warc") if (previous_dir / "warc" / "index.cdxj").exists() else None
+    journals = {
+        name: RecordJournal(output_dir / JOURNAL_DIR / f"{name}.jsonl", resume=args.resume)
+        for name in ["crawl_results", "assets_manifest", "verification_live_snapshots"]
+    }
+    # --resume: what an interrupted run in --output already finished.
+    resumed = {
+        name: {url: record for url, record in journal.load().items() if record.get("status") == "success"}
+        for name, journal in journals.items()
+    }
+    resumed_archive = WarcArchive(output_dir / "warc") if args.resume and warc is not None else None
+    if args.resume:
+        print("[resume] journal: " + " ".join(f"{name}={len(records)}" for name, records in resumed.items()))
 
     nav_js = read_text(scripts_dir / "nav_extract.js")
-    page_js = read_text(scripts_dir / "page_extract.js")
+    page_js = extract_command(
+        read_text(scripts_dir / "page_extract.js"),
+        args.extract_profile,
+        links=args.discover_links,
+        dedupe=args.extract_dedupe,
+        compact_urls=args.extract_compact_urls,
+    )
     verify_js = read_text(scripts_dir / "page_verify.js")
+    ready = readiness_command(args.readiness, read_text(scripts_dir / "page_ready.js"), args.readiness_timeout_ms)
 
     site_url = normalize_url(args.site) or "https://www.lovelysunday.co/"
     sitemap_url = urllib.parse.urljoin(site_url, "/sitemap.xml")
-    print(f"[start] site={site_url} workers={args.workers} output={output_dir}")
+    configure_site_hosts(site_url)
+    configure_replay(args.replay or None, site_url)
+    if args.replay:
+        print(f"[replay] fetching {site_url} and its assets from {args.replay}")
+    print(
+        f"[start] site={site_url} workers={args.workers} output={output_dir} "
+        f"viewports={','.join(viewport.name for viewport in args.viewports)} ({args.viewport_mode})"
+    )
+    stage_started = end_stage("setup", stage_started)
 
-    sitemap_bytes = fetch_url(sitemap_url)
-    write_text(output_dir / "manifests" / "sitemap.xml", sitemap_bytes.decode("utf-8", errors="replace"))
-    sitemap_urls = parse_sitemap_urls(sitemap_bytes)
+    sitemap_entries, sitemap_documents = collect_sitemap_entries(sitemap_url, output_dir / "manifests", args.http_per_host)
+    write_json(output_dir / "manifests" / "sitemaps.json", {"generatedAt": utc_now(), "sitemaps": sitemap_documents})
+    sitemap_lastmods = {url: entry.lastmod for url, entry in sitemap_entries.items()}
+    sitemap_urls = sorted(sitemap_entries)
     write_text(output_dir / "manifests" / "sitemap_urls.txt", "\n".join(sitemap_urls) + "\n")
-    print(f"[inventory] sitemap URLs: {len(sitemap_urls)}")
+    print(f"[inventory] sitemap URLs: {len(sitemap_urls)} from {len(sitemap_documents)} sitemap(s)")
 
     nav_urls = collect_nav_urls(site_url, nav_js, env=env)
     write_text(output_dir / "manifests" / "nav_urls.txt", "\n".join(nav_urls) + "\n")
@@ -658,48 +3567,270 @@ def main() -> int:
     write_text(output_dir / "manifests" / "all_urls.txt", "\n".join(all_urls) + "\n")
     print(f"[inventory] total canonical URLs: {len(all_urls)}")
 
-    chunks = [all_urls[i :: max(args.workers, 1)] for i in range(max(args.workers, 1))]
+    page_weights = load_page_weights(previous_dir / "manifests" / "crawl_results.json")
+    print(f"[inventory] page weights from previous run: {len([url for url in all_urls if url in page_weights])}")
+    stage_started = end_stage("inventory", stage_started)
+
+    page_plan = plan_incremental(
+        all_urls,
+        sitemap_lastmods,
+        previous["pages"],
+        previous_dir,
+        args.incremental,
+        args.asset_workers,
+        previous_store,
+        args.viewports,
+        args.extract_profile,
+    )
+    refresh_urls = [url for url in all_urls if page_plan[url]["refresh"]]
+    reason_counts = collections.Counter(entry["reason"] for entry in page_plan.values())
+    print(f"[incremental] refresh={len(refresh_urls)} carried={len(all_urls) - len(refresh_urls)} reasons={dict(reason_counts)}")
+
+    block_bytes = None
+    if args.block_runtime_requests:
+        known_sizes_file = previous_dir / "manifests" / "blocked_request_bytes.json"
+        known_sizes = json.loads(read_text(known_sizes_file)).get("hosts", {}) if known_sizes_file.exists() else {}
+        previous_page_data = (load_page_data(record, previous_dir, previous_store) for record in previous["pages"].values())
+        block_bytes = blocked_bytes_by_host((page for page in previous_page_data if page is not None), known_sizes)
+        write_json(output_dir / "manifests" / "blocked_request_bytes.json", {"generatedAt": utc_now(), "hosts": block_bytes})
+        print(f"[block] routing {len(browser_block_patterns())} runtime patterns to abort in browser sessions")
+
+    stage_started = end_stage("plan", stage_started)
+
+    # Link discovery can grow the crawl past the inventory, so its worker pools are not capped by it.
+    worker_count = max(1, min(max(args.workers, 1), len(refresh_urls)) if not args.discover_links else args.workers)
+    verify_slots = args.http_per_host if args.verify_mode == "http" else args.workers
+    verify_worker_count = max(1, min(max(verify_slots, 1), len(all_urls)) if not args.discover_links else verify_slots)
     progress_lock = threading.Lock()
+    download_root = output_dir / "assets" / "downloads"
 
-    crawl_records: list[dict[str, Any]] = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
-        futures = []
-        for worker_id, chunk in enumerate(chunks, start=1):
-            if not chunk:
+    resumed_pages = resume_pages(refresh_urls, resumed["crawl_results"], output_dir, page_store, warc, resumed_archive)
+    crawl_queue = UrlQueue(
+        [url for url in refresh_urls if url not in resumed_pages],
+        crawl_order_weights(args.crawl_order, page_weights, sitemap_entries),
+        name="crawl",
+        close_when_idle=args.discover_links,
+    )
+    frontier = LinkFrontier(all_urls, args.discover_links, args.max_link_depth, args.max_discovered_pages)
+    # Verification is fed by the crawl as captures land and closed once the crawl drains.
+    verify_queue = UrlQueue([], page_weights, closed=False, name="verify")
+    # http verify mode: pages handed back to the browser, with the fields that disagreed.
+    http_fallbacks: dict[str, list[str]] = {}
+    fallback_queue = UrlQueue([], page_weights, closed=False, name="verify-fallback")
+
+    with (
+        AssetDownloadEngine(
+            args.asset_workers,
+            max_per_host=args.http_per_host,
+            host_rate=args.asset_host_rate,
+            retries=args.asset_retries,
+            backoff_base=args.asset_backoff_ms / 1000,
+        ) as asset_engine,
+        concurrent.futures.ThreadPoolExecutor(max_workers=worker_count + verify_worker_count) as browser_executor,
+    ):
+        # Crawl, verify and assets overlap, so each of their stage spans runs from the pipeline start.
+        asset_stream = AssetStream(
+            asset_engine,
+            download_root,
+            output_dir,
+            previous["assets"] if args.incremental else {},
+            previous_dir,
+            max_bytes=args.max_asset_bytes or None,
+            store=asset_store,
+            warc=warc,
+            previous_archive=previous_archive,
+            journal=journals["assets_manifest"],
+            resumed=resumed["assets_manifest"],
+            resumed_archive=resumed_archive,
+            variants=ImageVariants(args.image_variants, args.image_variant_widths),
+        )
+
+        def add_resumed_page(url: str, record: dict[str, Any]) -> list[str]:
+            page_data = page_store.get(url)
+            assert page_data is not None
+            if warc is not None:
+                journals["crawl_results"].append(record)
+            asset_stream.add_page(page_data)
+            if url not in resumed["verification_live_snapshots"]:
+                verify_queue.put(url)
+            return frontier.add_page(url, page_data)
+
+        def on_discovered(urls: list[str]) -> None:
+            # Discovered pages an interrupted run already finished are resumed like inventory pages.
+            pending = list(urls)
+            while pending:
+                url = pending.pop()
+                finished = resume_pages([url], resumed["crawl_results"], output_dir, page_store, warc, resumed_archive)
+                if url not in finished:
+                    crawl_queue.put(url)
+                    continue
+                resumed_pages[url] = finished[url]
+                pending.extend(add_resumed_page(url, finished[url]))
+
+        def on_capture(record: dict[str, Any], page_data: dict[str, Any] | None) -> None:
+            journals["crawl_results"].append(record)
+            if page_data is not None:
+                asset_stream.add_page(page_data)
+                on_discovered(frontier.add_page(record["url"], page_data))
+            verify_queue.put(record["url"])
+
+        def on_fallback(item: dict[str, Any]) -> None:
+            item["verifyMode"] = "browser-fallback"
+            item["httpMismatch"] = http_fallbacks.get(item["url"], [])
+            journals["verification_live_snapshots"].append(item)
+
+        for url, record in list(resumed_pages.items()):
+            on_discovered(add_resumed_page(url, record))
+
+        for url in all_urls:
+            if page_plan[url]["refresh"]:
                 continue
-            futures.append(
-                executor.submit(
-                    crawl_worker,
+            record = carry_forward_page(previous["pages"][url], previous_dir, output_dir, warc, previous_archive)
+            page_data = load_page_data(record, previous_dir, previous_store)
+            if page_data is None:
+                raise RuntimeError(f"carried page has no capture data: {url}")
+            page_store.put(url, page_data)
+            journals["crawl_results"].append(record)
+            asset_stream.add_page(page_data)
+            on_discovered(frontier.add_page(url, page_data))
+            if url in previous["verify"]:
+                journals["verification_live_snapshots"].append(previous["verify"][url])
+            else:
+                verify_queue.put(url)
+
+        crawl_futures = [
+            browser_executor.submit(
+                crawl_worker,
+                worker_id,
+                crawl_queue,
+                page_js,
+                output_dir,
+                env,
+                progress_lock,
+                on_capture,
+                ready=ready,
+                block_bytes=block_bytes,
+                store=page_store,
+                warc=warc,
+                retries=args.page_retries,
+                viewports=args.viewports,
+                viewport_mode=args.viewport_mode,
+                extract_profile=args.extract_profile,
+            )
+            for worker_id in range(1, worker_count + 1)
+        ]
+        if args.verify_mode == "http":
+            verify_futures = [
+                browser_executor.submit(
+                    http_verify_worker,
+                    worker_id,
+                    verify_queue,
+                    fallback_queue,
+                    page_store,
+                    progress_lock,
+                    http_fallbacks,
+                    journals["verification_live_snapshots"].append,
+                )
+                for worker_id in range(1, verify_worker_count + 1)
+            ]
+        else:
+            verify_futures = [
+                browser_executor.submit(
+                    verify_worker,
                     worker_id,
-                    chunk,
-                    page_js,
-                    output_dir,
+                    verify_queue,
+                    verify_js,
                     env,
                     progress_lock,
+                    journals["verification_live_snapshots"].append,
+                    ready=ready,
+                    block_requests=args.block_runtime_requests,
+                    retries=args.page_retries,
                 )
+                for worker_id in range(1, verify_worker_count + 1)
+            ]
+        try:
+            for future in concurrent.futures.as_completed(crawl_futures):
+                future.result()
+        finally:
+            # A failed worker must not leave the others waiting on links it would have queued.
+            crawl_queue.close()
+            verify_queue.close()
+        end_stage("crawl", stage_started)
+        for future in concurrent.futures.as_completed(verify_futures):
+            future.result()
+        verify_ended = end_stage("verify", stage_started)
+
+        # Browser sessions for the fallback pass are only started when some page actually needs one.
+        fallback_queue.close()
+        fallback_futures = [
+            browser_executor.submit(
+                verify_worker,
+                worker_id,
+                fallback_queue,
+                verify_js,
+                env,
+                progress_lock,
+                on_fallback,
+                ready=ready,
+                block_requests=args.block_runtime_requests,
+                retries=args.page_retries,
             )
-        for future in concurrent.futures.as_completed(futures):
-            crawl_records.extend(future.result())
-
-    crawl_records.sort(key=lambda item: item["url"])
-    write_json(output_dir / "manifests" / "crawl_results.json", {"generatedAt": utc_now(), "pages": crawl_records})
+            for worker_id in range(1, min(max(args.workers, 1), fallback_queue.total) + 1)
+        ]
+        for future in concurrent.futures.as_completed(fallback_futures):
+            future.result()
+        if fallback_futures:
+            end_stage("verify_fallback", verify_ended)
+        asset_records = [item for item in asset_stream.results() if item["url"] in asset_stream.urls]
+        stage_started = end_stage("assets", stage_started)
+    if asset_store is not None:
+        asset_store.save()
+    if warc is not None:
+        warc.close()
+        # Everything still needed from an earlier archive in this directory was copied into the new files.
+        for stale in sorted(warc.root.glob("*.warc.gz")):
+            if stale.name not in warc.files:
+                stale.unlink()
+
+    # A resumed journal can still hold pages an updated sitemap no longer lists.
+    inventory = set(all_urls) | set(frontier.discovered)
+    crawl_records = [item for item in journals["crawl_results"].records() if item["url"] in inventory]
+    verify_records = [item for item in journals["verification_live_snapshots"].records() if item["url"] in inventory]
+    for journal in journals.values():
+        journal.close()
+    for record in crawl_records:
+        entry = page_plan.get(record["url"])
+        if entry:
+            record["incremental"] = "refreshed" if entry["refresh"] else "carried_forward"
+            record["incrementalReason"] = entry["reason"]
+            record.update({key: value for key, value in entry["validators"].items() if value})
+        if record["url"] in sitemap_entries and sitemap_entries[record["url"]].priority is not None:
+            record["sitemapPriority"] = sitemap_entries[record["url"]].priority
     successful = [item for item in crawl_records if item.get("status") == "success"]
     failed = [item for item in crawl_records if item.get("status") != "success"]
-    print(f"[crawl] success={len(successful)} failed={len(failed)}")
-
-    page_json_files = [output_dir / pathlib.Path(item["jsonFile"]) for item in successful if item.get("jsonFile")]
-    asset_urls = collect_asset_urls(page_json_files)
+    page_store.prune({item["url"] for item in successful})
+    if args.page_json:
+        exported = page_store.export_json(output_dir, successful)
+        print(f"[pages] exported {exported} page_json files from {PAGE_STORE_FILE}")
+    else:
+        for record in crawl_records:
+            record.pop("jsonFile", None)
+    write_json(output_dir / "manifests" / "crawl_results.json", {"generatedAt": utc_now(), "pages": crawl_records})
+    write_json(output_dir / "manifests" / "link_graph.json", frontier.manifest())
+    if frontier.discovered:
+        write_text(output_dir / "manifests" / "discovered_urls.txt", "\n".join(sorted(frontier.discovered)) + "\n")
+    print(f"[crawl] success={len(successful)} failed={len(failed)} discovered={len(frontier.discovered)}")
+
+    variants = asset_stream.variants
+    # The URLs queued for download; renditions --image-variants skipped are only in variantGroups.
+    asset_urls = sorted(asset_stream.urls - variants.skipped_urls())
     write_text(output_dir / "manifests" / "asset_urls.txt", "\n".join(asset_urls) + "\n")
     write_json(output_dir / "manifests" / "asset_filter_rules.json", build_asset_filter_rules())
-    print(f"[assets] unique URLs queued for download: {len(asset_urls)}")
-
-    download_root = output_dir / "assets" / "downloads"
-    asset_records: list[dict[str, Any]] = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max(args.asset_workers, 1)) as executor:
-        futures = [executor.submit(download_one_asset, url, download_root, output_dir) for url in asset_urls]
-        for future in concurrent.futures.as_completed(futures):
-            asset_records.append(future.result())
-    asset_records.sort(key=lambda item: item["url"])
+    print(
+        f"[assets] unique URLs: {len(asset_stream.urls)} queued={len(asset_urls)} carried={len(asset_stream.carried)} "
+        f"image variants skipped={variants.skipped()} ({variants.policy})"
+    )
     write_json(
         output_dir / "manifests" / "assets_manifest.json",
         {
@@ -710,23 +3841,23 @@ def main() -> int:
                 "failed": len([item for item in asset_records if item.get("status") != "success"]),
             },
             "assets": asset_records,
+            # Every rendition seen per image, and the downloaded one each resolves to (--image-variants).
+            "variantGroups": variants.manifest(),
         },
     )
 
-    verify_records: list[dict[str, Any]] = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
-        futures = []
-        for worker_id, chunk in enumerate(chunks, start=1):
-            if not chunk:
-                continue
-            futures.append(executor.submit(verify_worker, worker_id, chunk, verify_js, env, progress_lock))
-        for future in concurrent.futures.as_completed(futures):
-            verify_records.extend(future.result())
-    verify_records.sort(key=lambda item: item["url"])
     write_json(output_dir / "manifests" / "verification_live_snapshots.json", {"pages": verify_records})
+    close_browser_sessions()
 
-    verification_report = compare_live_to_capture(crawl_records, verify_records, output_dir)
+    verification_report = compare_live_to_capture(crawl_records, verify_records, page_store)
     write_json(output_dir / "manifests" / "verification_report.json", verification_report)
+    page_store_stats = page_store.stats()
+    page_store.close()
+    if previous_store is not None and previous_store is not page_store:
+        previous_store.close()
+    end_stage("manifests", stage_started)
+    if args.trace:
+        tracer().write_chrome_trace(output_dir / "manifests" / "trace.json")
 
     try:
         output_dir_display = output_dir.relative_to(repo_root).as_posix()
@@ -737,21 +3868,67 @@ def main() -> int:
         "generatedAt": utc_now(),
         "durationSeconds": round(time.time() - start, 2),
         "site": site_url,
+        "replay": args.replay or None,
         "inventory": {
             "sitemapUrls": len(sitemap_urls),
+            "sitemaps": len(sitemap_documents),
+            "sitemapErrors": len([item for item in sitemap_documents if item.get("error")]),
             "navUrls": len(nav_urls),
             "canonicalUrls": len(all_urls),
+            "discoveredUrls": len(frontier.discovered),
+            "linkEdges": sum(len(targets) for targets in frontier.edges.values()),
         },
         "crawl": {
             "success": len(successful),
             "failed": len(failed),
+            "blockedRequests": sum((item.get("blocked") or {}).get("requests", 0) for item in successful),
+            "estimatedBytesSaved": sum((item.get("blocked") or {}).get("estimatedBytesSaved", 0) for item in successful),
+            "retried": len([item for item in crawl_records if item.get("attempts", 1) > 1]),
+            "failureClasses": dict(collections.Counter(item.get("failureClass", "error") for item in failed)),
+        },
+        "incremental": {
+            "enabled": args.incremental,
+            "refreshed": len(refresh_urls),
+            "carriedForward": len(all_urls) - len(refresh_urls),
+            "resumed": len(resumed_pages),
+            "reasons": dict(sorted(reason_counts.items())),
         },
         "assets": {
             "queued": len(asset_urls),
             "downloaded": len([item for item in asset_records if item.get("status") == "success"]),
             "failed": len([item for item in asset_records if item.get("status") != "success"]),
+            "skippedTooLarge": len([item for item in asset_records if item.get("skipped") == "max_asset_bytes"]),
+            "resumed": asset_stream.resumed_count,
+            "retried": len([item for item in asset_records if item.get("attempts", 1) > 1]),
+            "retryAttempts": asset_engine.retried,
+            "store": asset_store.stats() if asset_store is not None else None,
+            "variants": {
+                "policy": variants.policy,
+                "widths": list(variants.widths) if variants.policy == "widths" else None,
+                "groups": len(variants.groups),
+                "skipped": variants.skipped(),
+            },
+        },
+        "extract": {
+            "profile": args.extract_profile,
+            "dedupe": args.extract_dedupe,
+            "compactUrls": args.extract_compact_urls,
+        },
+        "viewports": {
+            "mode": args.viewport_mode,
+            "matrix": [viewport._asdict() for viewport in args.viewports],
+        },
+        "pageStore": page_store_stats,
+        "archive": {"format": args.archive, **(warc.stats() if warc is not None else {})},
+        "verification": {
+            **verification_report["summary"],
+            "mode": args.verify_mode,
+            "browserFallbacks": len(http_fallbacks),
+            "retried": len([item for item in verify_records if item.get("attempts", 1) > 1]),
         },
-        "verification": verification_report["summary"],
+        "http": client.stats(),
+        "timings": tracer().stats(),
+        "traceFile": "manifests/trace.json" if args.trace else None,
         "outputDir": output_dir_display,
     }
     write_json(output_dir / "manifests" / "summary.json", summary)
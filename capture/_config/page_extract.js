@@ -1,4 +1,10 @@
-(() => {
+((options) => {
+  // Not runnable on its own: EXTRACT_OPTIONS at the bottom is a placeholder that extract_command() in
+  // lovelysunday_capture.py replaces with the options object before the script is evaluated.
+  // options.fields: which optional sections to return (the extraction profile); counts always cover
+  // the whole page. options.dedupe drops repeated entries from list sections; options.compactUrls
+  // replaces repeated URL prefixes with "\u0001<index>\u0001" references into _urlPrefixes.
+  const wanted = new Set(options.fields || []);
   const clean = (value) => (value || "").replace(/\s+/g, " ").trim();
 
   const toAbs = (value) => {
@@ -17,6 +23,12 @@
     return el ? clean(el.getAttribute("content") || "") || null : null;
   };
 
+  const memo = new Map();
+  const lazy = (name, build) => () => {
+    if (!memo.has(name)) memo.set(name, build());
+    return memo.get(name);
+  };
+
   const headings = {};
   for (const level of [1, 2, 3, 4, 5, 6]) {
     headings[`h${level}`] = Array.from(document.querySelectorAll(`h${level}`))
@@ -24,14 +36,14 @@
       .filter(Boolean);
   }
 
-  const links = Array.from(document.querySelectorAll("a[href]")).map((el) => ({
+  const links = lazy("links", () => Array.from(document.querySelectorAll("a[href]")).map((el) => ({
     href: toAbs(el.getAttribute("href")),
     text: clean(el.textContent),
     rel: clean(el.getAttribute("rel")),
     target: clean(el.getAttribute("target")),
-  }));
+  })));
 
-  const images = Array.from(document.querySelectorAll("img")).map((el) => ({
+  const images = lazy("images", () => Array.from(document.querySelectorAll("img")).map((el) => ({
     src: toAbs(el.getAttribute("src")),
     alt: clean(el.getAttribute("alt")),
     width: el.naturalWidth || null,
@@ -42,93 +54,90 @@
         .map((entry) => entry.trim().split(" ")[0])
         .map((src) => toAbs(src))
     ),
-  }));
+  })));
 
-  const videos = Array.from(
+  const videos = lazy("videos", () => Array.from(
     document.querySelectorAll("video, video source, audio, audio source")
   ).map((el) => ({
     tag: el.tagName.toLowerCase(),
     src: toAbs(el.getAttribute("src")),
     type: clean(el.getAttribute("type")),
-  }));
+  })));
 
-  const scripts = Array.from(document.querySelectorAll("script[src]")).map((el) => ({
+  const scripts = lazy("scripts", () => Array.from(document.querySelectorAll("script[src]")).map((el) => ({
     src: toAbs(el.getAttribute("src")),
     type: clean(el.getAttribute("type")),
     async: !!el.async,
     defer: !!el.defer,
-  }));
+  })));
 
-  const stylesheets = Array.from(
+  const stylesheets = lazy("stylesheets", () => Array.from(
     document.querySelectorAll("link[rel='stylesheet'], link[as='style']")
   ).map((el) => ({
     href: toAbs(el.getAttribute("href")),
     rel: clean(el.getAttribute("rel")),
     as: clean(el.getAttribute("as")),
-  }));
+  })));
 
-  const icons = uniq(
+  const icons = lazy("icons", () => uniq(
     Array.from(document.querySelectorAll("link[rel*='icon']"))
       .map((el) => toAbs(el.getAttribute("href")))
       .filter(Boolean)
-  );
+  ));
 
-  const jsonLd = Array.from(document.querySelectorAll("script[type='application/ld+json']"))
+  const jsonLd = lazy("jsonLd", () => Array.from(document.querySelectorAll("script[type='application/ld+json']"))
     .map((el) => clean(el.textContent))
-    .filter(Boolean);
+    .filter(Boolean));
 
-  const navLinks = uniq(
+  const navLinks = lazy("navLinks", () => uniq(
     Array.from(
       document.querySelectorAll("nav a[href], [role='navigation'] a[href], header a[href], footer a[href]")
     ).map((el) => toAbs(el.getAttribute("href")))
-  );
+  ));
 
   const textRoot =
     document.querySelector("main, article, [role='main']") || document.body || document.documentElement;
 
-  const paragraphs = Array.from(textRoot.querySelectorAll("p"))
+  const paragraphs = lazy("paragraphs", () => Array.from(textRoot.querySelectorAll("p"))
     .map((el) => clean(el.textContent))
-    .filter(Boolean);
+    .filter(Boolean));
 
-  const listItems = Array.from(textRoot.querySelectorAll("li"))
+  const listItems = lazy("listItems", () => Array.from(textRoot.querySelectorAll("li"))
     .map((el) => clean(el.textContent))
-    .filter(Boolean);
+    .filter(Boolean));
 
-  const resourceEntries = performance.getEntriesByType("resource").map((entry) => ({
+  const resourceEntries = lazy("resourceEntries", () => performance.getEntriesByType("resource").map((entry) => ({
     name: entry.name || null,
     initiatorType: entry.initiatorType || null,
     duration: Number.isFinite(entry.duration) ? Number(entry.duration.toFixed(2)) : null,
     transferSize: Number.isFinite(entry.transferSize) ? entry.transferSize : null,
     encodedBodySize: Number.isFinite(entry.encodedBodySize) ? entry.encodedBodySize : null,
     decodedBodySize: Number.isFinite(entry.decodedBodySize) ? entry.decodedBodySize : null,
-  }));
+  })));
 
-  return {
-    capturedAt: new Date().toISOString(),
-    url: location.href,
-    title: clean(document.title),
-    canonical: toAbs(document.querySelector("link[rel='canonical']")?.getAttribute("href")),
-    meta: {
+  // Optional sections in output order; only the requested ones are built.
+  const sections = {
+    meta: () => ({
       description: getMeta("meta[name='description']"),
       robots: getMeta("meta[name='robots']"),
       viewport: document.querySelector("meta[name='viewport']")?.getAttribute("content") || null,
-    },
-    openGraph: {
+    }),
+    openGraph: () => ({
       title: getMeta("meta[property='og:title']"),
       description: getMeta("meta[property='og:description']"),
       image: toAbs(getMeta("meta[property='og:image']")),
       type: getMeta("meta[property='og:type']"),
       url: toAbs(getMeta("meta[property='og:url']")),
-    },
-    twitter: {
+    }),
+    twitter: () => ({
       card: getMeta("meta[name='twitter:card']"),
       title: getMeta("meta[name='twitter:title']"),
       description: getMeta("meta[name='twitter:description']"),
       image: toAbs(getMeta("meta[name='twitter:image']")),
-    },
-    headings,
+    }),
+    headings: () => headings,
     navLinks,
-    mainText: clean(textRoot.innerText || ""),
+    mainText: () => clean(textRoot.innerText || ""),
     paragraphs,
     listItems,
     links,
@@ -139,15 +148,62 @@
     icons,
     jsonLd,
     resourceEntries,
-    counts: {
-      links: links.length,
-      images: images.length,
-      paragraphs: paragraphs.length,
-      listItems: listItems.length,
-      scripts: scripts.length,
-      stylesheets: stylesheets.length,
-      jsonLd: jsonLd.length,
-      resources: resourceEntries.length,
-    },
   };
-})();
+
+  const dedupe = (values) => {
+    const seen = new Set();
+    return values.filter((value) => {
+      const key = typeof value === "string" ? value : JSON.stringify(value);
+      if (seen.has(key)) return false;
+      seen.add(key);
+      return true;
+    });
+  };
+
+  const result = {
+    capturedAt: new Date().toISOString(),
+    url: location.href,
+    title: clean(document.title),
+    canonical: toAbs(document.querySelector("link[rel='canonical']")?.getAttribute("href")),
+  };
+  for (const [name, build] of Object.entries(sections)) {
+    if (!wanted.has(name)) continue;
+    const value = build();
+    result[name] = options.dedupe && Array.isArray(value) ? dedupe(value) : value;
+  }
+  if (!("headings" in result)) result.headings = { h1: headings.h1 };
+  // Counts describe the page, not the (possibly trimmed) payload: verification compares them.
+  result.counts = {
+    links: document.querySelectorAll("a[href]").length,
+    images: document.querySelectorAll("img").length,
+    paragraphs: paragraphs().length,
+    listItems: listItems().length,
+    scripts: document.querySelectorAll("script[src]").length,
+    stylesheets: document.querySelectorAll("link[rel='stylesheet'], link[as='style']").length,
+    jsonLd: jsonLd().length,
+    resources: performance.getEntriesByType("resource").length,
+  };
+
+  if (options.compactUrls) {
+    const prefixOf = (value) => value.slice(0, value.split(/[?#]/)[0].lastIndexOf("/") + 1);
+    const isUrl = (value) => typeof value === "string" && /^https?:\/\//.test(value);
+    const walk = (value, visit) => {
+      if (Array.isArray(value)) return value.map((item) => walk(item, visit));
+      if (value && typeof value === "object") {
+        return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, walk(item, visit)]));
+      }
+      return isUrl(value) ? visit(value) : value;
+    };
+    const uses = new Map();
+    walk(result, (value) => uses.set(prefixOf(value), (uses.get(prefixOf(value)) || 0) + 1));
+    const prefixes = Array.from(uses).filter(([prefix, count]) => count > 1 && prefix.length > 12).map(([prefix]) => prefix);
+    const index = new Map(prefixes.map((prefix, i) => [prefix, i]));
+    const compacted = walk(result, (value) => {
+      const i = index.get(prefixOf(value));
+      return i === undefined ? value : `\u0001${i}\u0001${value.slice(prefixes[i].length)}`;
+    });
+    compacted._urlPrefixes = prefixes;
+    return compacted;
+  }
+  return result;
+})(EXTRACT_OPTIONS);
@@ -0,0 +1,52 @@
+(async (options) => {
+  const mode = options.mode || "images";
+  const timeoutMs = options.timeoutMs ?? 10000;
+  const quietMs = options.quietMs ?? 250;
+  const started = performance.now();
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  const lastNetworkActivity = () => {
+    let last = 0;
+    for (const entry of performance.getEntriesByType("resource")) {
+      last = Math.max(last, entry.responseEnd || entry.startTime || 0);
+    }
+    return last;
+  };
+
+  const pendingViewportImages = () => {
+    const width = window.innerWidth || document.documentElement.clientWidth;
+    const height = window.innerHeight || document.documentElement.clientHeight;
+    let pending = 0;
+    for (const img of document.images) {
+      const rect = img.getBoundingClientRect();
+      const visible = rect.width > 0 && rect.height > 0 && rect.bottom > 0 && rect.right > 0 && rect.top < height && rect.left < width;
+      if (!visible || !(img.currentSrc || img.getAttribute("src"))) continue;
+      // A broken image is complete with naturalWidth 0; it will not load later, so it is settled.
+      if (!img.complete) pending += 1;
+    }
+    return pending;
+  };
+
+  const state = () => {
+    const loaded = document.readyState === "complete";
+    const quiet = performance.now() - lastNetworkActivity() >= quietMs;
+    const pendingImages = mode === "images" ? pendingViewportImages() : 0;
+    if (mode === "load") return { ready: loaded, pendingImages };
+    if (mode === "network-idle") return { ready: loaded && quiet, pendingImages };
+    return { ready: loaded && quiet && pendingImages === 0, pendingImages };
+  };
+
+  let current = state();
+  while (!current.ready && performance.now() - started < timeoutMs) {
+    await sleep(25);
+    current = state();
+  }
+
+  return {
+    mode,
+    readyState: document.readyState,
+    waitedMs: Math.round(performance.now() - started),
+    timedOut: !current.ready,
+    pendingImages: current.pendingImages,
+  };
+})(READY_OPTIONS);
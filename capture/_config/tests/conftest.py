@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import http.server
+import pathlib
+import sys
+import threading
+from typing import Callable, Iterator, NamedTuple
+
+import pytest
+
+# The capture scripts import each other as top-level modules from capture/_config.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import fake_agent_browser  # noqa: E402
+import lovelysunday_capture as capture  # noqa: E402
+
+
+class FakeBrowserSession:
+    # Deterministic in-process stand-in for agent-browser. Commands go to the same Browser that
+    # fake_agent_browser.py serves, on generated pages unless a test points `root` at a site on disk.
+    kind = "fake"
+    root: pathlib.Path | None = None
+
+    def __init__(self, session: str, env: dict[str, str]) -> None:
+        self.session = session
+        self.env = env
+        self.browser = fake_agent_browser.Browser(self.root, {"url": "about:blank", "session": session})
+        self.calls: list[list[str]] = []
+
+    def run(self, args: list[str], timeout: int = 180) -> str:
+        with capture.trace_span(capture.browser_op_name(args), session=self.session, driver="fake"):
+            self.calls.append(list(args))
+            command = fake_agent_browser.cli_command(args)
+            return fake_agent_browser.cli_output(command, self.browser.handle(command))
+
+    def run_batch(self, commands: list[tuple[list[str], int]]) -> list[str]:
+        return [self.run(args, timeout=timeout) for args, timeout in commands]
+
+    def close(self) -> None:
+        return None
+
+    @staticmethod
+    def end_session(session: str, env: dict[str, str]) -> None:
+        return None
+
+
+@pytest.fixture
+def fake_browser(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setitem(capture.BROWSER_DRIVERS, "fake", FakeBrowserSession)
+    capture.configure_browser_driver("fake")
+    yield
+    capture.configure_browser_driver("subprocess")
+
+
+class SeenRequest(NamedTuple):
+    method: str
+    path: str
+    headers: dict[str, str]
+    client_port: int
+
+
+class LocalHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: LocalServer
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        return None
+
+    def do_GET(self) -> None:  # noqa: N802
+        self.dispatch()
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self.dispatch()
+
+    def dispatch(self) -> None:
+        with self.server.lock:
+            self.server.requests.append(SeenRequest(self.command, self.path, dict(self.headers), self.client_address[1]))
+        route = self.server.routes.get(self.path) or self.server.routes.get(self.path.partition("?")[0])
+        if route is None:
+            self.reply(404, b"not found")
+        else:
+            route(self)
+
+    def reply(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None, close: bool = False) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+class LocalServer(http.server.ThreadingHTTPServer):
+    # A loopback server whose paths answer through `routes`; every request is kept in `requests`.
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), LocalHandler)
+        self.routes: dict[str, Callable[[LocalHandler], None]] = {}
+        self.requests: list[SeenRequest] = []
+        self.lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def serve(self, path: str, body: bytes, headers: dict[str, str] | None = None, status: int = 200) -> None:
+        self.routes[path] = lambda handler: handler.reply(status, body, headers)
+
+    def seen(self, path: str) -> list[SeenRequest]:
+        with self.lock:
+            return [request for request in self.requests if request.path == path]
+
+
+@pytest.fixture
+def local_server() -> Iterator[LocalServer]:
+    server = LocalServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client() -> Iterator[capture.HttpClient]:
+    # A private HttpClient, so pooled connections never leak between tests.
+    client = capture.HttpClient(timeout=5)
+    yield client
+    client.close()
+
+
+class LocalSite:
+    # A site for whole runs of main(): pages are served by LocalServer and read from disk by the fake
+    # browser, and the sitemap lists every page added.
+    def __init__(self, root: pathlib.Path, server: LocalServer) -> None:
+        self.root = root
+        self.server = server
+        self.base = server.url("")
+        self.paths: list[str] = []
+
+    def page(self, path: str, html: str) -> None:
+        target = self.root / path.lstrip("/") / "index.html"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(html, encoding="utf-8")
+        self.server.serve(path, html.encode("utf-8"), {"Content-Type": "text/html"})
+        self.paths.append(path)
+
+    def capture(self, monkeypatch: pytest.MonkeyPatch, output: pathlib.Path, *args: str) -> None:
+        urls = "".join(f"<url><loc>{self.base}{path}</loc></url>" for path in self.paths)
+        sitemap = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        self.server.serve("/sitemap.xml", sitemap.encode("utf-8"))
+        argv = ["lovelysunday_capture.py", "--site", f"{self.base}/", "--output", str(output), "--workers", "1", *args]
+        monkeypatch.setattr(sys, "argv", argv)
+        # main() configures these module globals for its run; put them back for the tests that follow.
+        for name in ["_http_client", "_site_hosts", "_replay", "_tracer"]:
+            monkeypatch.setattr(capture, name, getattr(capture, name))
+        try:
+            assert capture.main() == 0
+        finally:
+            capture.http_client().close()
+
+
+@pytest.fixture
+def local_site(tmp_path: pathlib.Path, local_server: LocalServer, monkeypatch: pytest.MonkeyPatch, fake_browser: None) -> LocalSite:
+    site = LocalSite(tmp_path / "site", local_server)
+    monkeypatch.setattr(FakeBrowserSession, "root", site.root)
+    return site
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import pathlib
+from typing import Any, Callable
+
+from conftest import LocalHandler, LocalServer
+
+import lovelysunday_capture as capture
+
+BODY = bytes(range(256)) * 1024
+HALF = len(BODY) // 2
+ETAG = '"v1"'
+
+
+def download(url: str, root: pathlib.Path, client: capture.HttpClient, **kwargs: Any) -> dict[str, Any]:
+    return capture.download_one_asset(url, root / "assets" / "downloads", root, client=client, **kwargs)
+
+
+def drop_halfway(handler: LocalHandler) -> None:
+    # Promises the whole body, sends half of it and hangs up.
+    handler.send_response(200)
+    handler.send_header("Content-Length", str(len(BODY)))
+    handler.send_header("ETag", ETAG)
+    handler.end_headers()
+    handler.wfile.write(BODY[:HALF])
+    handler.wfile.flush()
+    handler.close_connection = True
+
+
+def resume_with(status: int) -> Callable[[LocalHandler], None]:
+    def route(handler: LocalHandler) -> None:
+        if "Range" not in handler.headers:
+            drop_halfway(handler)
+        elif status == 206:
+            headers = {"Content-Range": f"bytes {HALF}-{len(BODY) - 1}/{len(BODY)}", "ETag": ETAG}
+            handler.reply(206, BODY[HALF:], headers)
+        else:
+            # The asset changed since the first attempt, so If-Range gets the whole new body.
+            handler.reply(200, BODY[::-1], {"ETag": '"v2"'})
+
+    return route
+
+
+def test_interrupted_download_resumes_with_range(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    local_server.routes["/video.mp4"] = resume_with(206)
+    url = local_server.url("/video.mp4")
+    part, meta = capture.partial_download_paths(tmp_path / "assets" / "downloads", url)
+
+    first = download(url, tmp_path, client)
+    assert first["status"] == "error"
+    assert first["retryable"] is True
+    assert part.read_bytes() == BODY[:HALF]
+
+    second = download(url, tmp_path, client)
+    assert second["status"] == "success"
+    assert second["httpStatus"] == 206
+    assert second["resumedFrom"] == HALF
+    assert second["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert (tmp_path / second["file"]).read_bytes() == BODY
+    assert not part.exists() and not meta.exists()
+    resume = local_server.seen("/video.mp4")[-1]
+    assert resume.headers["Range"] == f"bytes={HALF}-"
+    assert resume.headers["If-Range"] == ETAG
+    assert resume.headers["Accept-Encoding"] == "identity"
+
+
+def test_resume_answered_with_200_restarts_the_file(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    local_server.routes["/video.mp4"] = resume_with(200)
+    url = local_server.url("/video.mp4")
+    assert download(url, tmp_path, client)["status"] == "error"
+
+    record = download(url, tmp_path, client)
+    assert record["status"] == "success"
+    assert record["httpStatus"] == 200
+    assert "resumedFrom" not in record
+    assert (tmp_path / record["file"]).read_bytes() == BODY[::-1]
+    assert record["bytes"] == len(BODY)
+
+
+def test_declared_length_over_max_bytes_is_skipped(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    local_server.serve("/big.mp4", BODY)
+    url = local_server.url("/big.mp4")
+    record = download(url, tmp_path, client, max_bytes=HALF)
+    assert record["status"] == "error"
+    assert record["skipped"] == "max_asset_bytes"
+    part, meta = capture.partial_download_paths(tmp_path / "assets" / "downloads", url)
+    assert not part.exists() and not meta.exists()
+
+
+def test_undeclared_length_is_cut_off_at_max_bytes(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    def unsized(handler: LocalHandler) -> None:
+        # No Content-Length: the body runs until the server closes the connection.
+        handler.send_response(200)
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.wfile.write(BODY)
+        handler.close_connection = True
+
+    local_server.routes["/stream.mp4"] = unsized
+    url = local_server.url("/stream.mp4")
+    record = download(url, tmp_path, client, max_bytes=HALF)
+    assert record["skipped"] == "max_asset_bytes"
+    part, _ = capture.partial_download_paths(tmp_path / "assets" / "downloads", url)
+    assert not part.exists()
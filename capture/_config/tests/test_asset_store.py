@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import pathlib
+from typing import Any
+
+from conftest import LocalHandler, LocalServer
+
+import lovelysunday_capture as capture
+
+BODY = b"\x89PNG same bytes behind two URLs"
+ETAG = '"logo-1"'
+
+
+def download(url: str, root: pathlib.Path, store: capture.AssetStore, client: capture.HttpClient) -> dict[str, Any]:
+    return capture.download_one_asset(url, root / "assets" / "downloads", root, client=client, store=store)
+
+
+def test_same_bytes_from_two_urls_share_one_object(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    local_server.serve("/a/logo.png", BODY, {"Content-Type": "image/png"})
+    local_server.serve("/b/logo.png", BODY, {"Content-Type": "image/png"})
+    store = capture.AssetStore(tmp_path / "store")
+
+    first = download(local_server.url("/a/logo.png"), tmp_path, store, client)
+    second = download(local_server.url("/b/logo.png"), tmp_path, store, client)
+
+    assert (first["store"], second["store"]) == ("stored", "deduplicated")
+    assert first["sha256"] == second["sha256"] == hashlib.sha256(BODY).hexdigest()
+    objects = [path for path in (tmp_path / "store" / "objects").rglob("*") if path.is_file()]
+    assert objects == [store.object_path(first["sha256"])]
+    for record in (first, second):
+        assert (tmp_path / record["file"]).read_bytes() == BODY
+        if record["link"] == "hardlink":
+            assert (tmp_path / record["file"]).stat().st_ino == objects[0].stat().st_ino
+
+
+def test_revalidation_keeps_the_stored_object(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    def logo(handler: LocalHandler) -> None:
+        if handler.headers.get("If-None-Match") == ETAG:
+            handler.reply(304, headers={"ETag": ETAG})
+        else:
+            handler.reply(200, BODY, {"Content-Type": "image/png", "ETag": ETAG})
+
+    local_server.routes["/logo.png"] = logo
+    url = local_server.url("/logo.png")
+    store = capture.AssetStore(tmp_path / "store")
+    first = download(url, tmp_path / "run1", store, client)
+    store.save()
+    stored = store.object_path(first["sha256"])
+    stat_before = stored.stat()
+
+    # A later run opens the store from disk, as a fresh process would.
+    later = capture.AssetStore(tmp_path / "store")
+    record = download(url, tmp_path / "run2", later, client)
+
+    assert record["store"] == "revalidated"
+    assert record["httpStatus"] == 304
+    assert record["sha256"] == first["sha256"]
+    assert (tmp_path / "run2" / record["file"]).read_bytes() == BODY
+    assert stored.stat().st_mtime_ns == stat_before.st_mtime_ns
+    assert later.lookup(url)["revalidatedAt"]
+    assert local_server.seen("/logo.png")[-1].headers["If-None-Match"] == ETAG
+
+
+def test_clone_file_links_or_copies(tmp_path: pathlib.Path) -> None:
+    source = tmp_path / "source.bin"
+    source.write_bytes(BODY)
+    target = tmp_path / "nested" / "target.bin"
+    target.parent.mkdir()
+    target.write_bytes(b"stale")
+
+    assert capture.clone_file(source, target) in {"reflink", "hardlink", "copy"}
+    assert target.read_bytes() == BODY
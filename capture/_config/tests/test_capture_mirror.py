@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+
+import pytest
+
+import capture_mirror
+
+SITE = "https://www.lovelysunday.co"
+CDN = "https://images.squarespace-cdn.com/content"
+HREFS = {
+    f"{SITE}/": "/",
+    f"{SITE}/journal": "/journal/",
+    f"{SITE}/journal/brunch": "/journal/brunch/",
+    f"{CDN}/eggs.jpg": "/_assets/eggs.jpg",
+    f"{CDN}/eggs.jpg?format=500w&v=2": "/_assets/eggs-500.jpg",
+    f"{SITE}/assets/site.css": "/_assets/site.css",
+    f"{SITE}/assets/print.css": "/_assets/print.css",
+    f"{SITE}/assets/fonts/a.woff2": "/_assets/a.woff2",
+}
+
+
+@pytest.fixture
+def rewriter() -> capture_mirror.MirrorRewriter:
+    pages = {f"{SITE}/", f"{SITE}/journal", f"{SITE}/journal/brunch"}
+    return capture_mirror.MirrorRewriter(f"{SITE}/", HREFS, pages, ["www.lovelysunday.co", "images.squarespace-cdn.com"])
+
+
+def test_trie_pattern_matches_the_longest_key() -> None:
+    words = [b"/a", b"/ab", b"/abc", b"/b.css", b"/b"]
+    pattern = re.compile(capture_mirror.trie_pattern(words))
+    for word in words:
+        assert pattern.fullmatch(word)
+    assert pattern.match(b"/abcd")[0] == b"/abc"
+    assert pattern.match(b"/abx")[0] == b"/ab"
+    assert pattern.match(b"/b.cs")[0] == b"/b"
+    assert pattern.match(b"/c") is None
+
+
+def test_html_links_are_rewritten_longest_key_first(rewriter: capture_mirror.MirrorRewriter) -> None:
+    body, count, unresolved = rewriter.rewrite_html(
+        f'<a href="{SITE}/journal/brunch">Brunch</a> <a href="{SITE}/journal">Journal</a>'.encode()
+    )
+    assert body == b'<a href="/journal/brunch/">Brunch</a> <a href="/journal/">Journal</a>'
+    assert (count, unresolved) == (2, [])
+
+
+@pytest.mark.parametrize(
+    "html, expected",
+    [
+        # Root-relative links on the site's own host, with and without the page's trailing slash.
+        ('<a href="/journal">', '<a href="/journal/">'),
+        ('<a href="/journal/brunch/">', '<a href="/journal/brunch/">'),
+        ("<a href='/journal#top'>", "<a href='/journal/#top'>"),
+        # Scheme-relative and http forms of an https URL.
+        ('<a href="//www.lovelysunday.co/journal">', '<a href="/journal/">'),
+        ('<a href="http://www.lovelysunday.co/journal">', '<a href="/journal/">'),
+        # The query written with &amp; in an attribute, and with a bare & in srcset.
+        (f'<img src="{CDN}/eggs.jpg?format=500w&amp;v=2">', '<img src="/_assets/eggs-500.jpg">'),
+        (
+            f'<img srcset="{CDN}/eggs.jpg?format=500w&v=2 500w, {CDN}/eggs.jpg 1000w">',
+            '<img srcset="/_assets/eggs-500.jpg 500w, /_assets/eggs.jpg 1000w">',
+        ),
+        # Inline styles and JSON strings in scripts.
+        (f'<div style="background:url({CDN}/eggs.jpg)">', '<div style="background:url(/_assets/eggs.jpg)">'),
+        (f'<script>{{"image":"{CDN}/eggs.jpg"}}</script>', '<script>{"image":"/_assets/eggs.jpg"}</script>'),
+    ],
+)
+def test_html_url_forms(rewriter: capture_mirror.MirrorRewriter, html: str, expected: str) -> None:
+    body, count, unresolved = rewriter.rewrite_html(html.encode())
+    assert body.decode() == expected
+    assert count >= 1 and unresolved == []
+
+
+def test_unknown_urls_are_left_alone_and_reported(rewriter: capture_mirror.MirrorRewriter) -> None:
+    html = (
+        '<a href="/journal/brunch/eggs">Eggs</a>'
+        f'<img src="{CDN}/eggs.jpg?format=750w">'
+        '<a href="/journalism">Press</a>'
+        '<a href="https://www.instagram.com/lovelysunday">IG</a>'
+    )
+    body, count, unresolved = rewriter.rewrite_html(html.encode())
+    assert (body.decode(), count) == (html, 0)
+    assert unresolved == [f"{SITE}/journal/brunch/eggs", f"{CDN}/eggs.jpg?format=750w", f"{SITE}/journalism"]
+
+
+def test_css_references_resolve_against_the_stylesheet(rewriter: capture_mirror.MirrorRewriter) -> None:
+    css = (
+        '@import "print.css";\n'
+        "@font-face { src: url( fonts/a.woff2#iefix ) }\n"
+        f"body {{ background: url('{CDN}/eggs.jpg') }}\n"
+        'header { background: url("/assets/../assets/site.css") }\n'
+        '.missing { background: url("../img/missing.png") }\n'
+        ".inline { background: url(data:image/png;base64,AAAA) }\n"
+    )
+    body, count, unresolved = rewriter.rewrite_css(css.encode(), f"{SITE}/assets/site.css")
+    assert body.decode() == (
+        '@import "/_assets/print.css";\n'
+        "@font-face { src: url(/_assets/a.woff2#iefix) }\n"
+        "body { background: url('/_assets/eggs.jpg') }\n"
+        'header { background: url("/_assets/site.css") }\n'
+        '.missing { background: url("../img/missing.png") }\n'
+        ".inline { background: url(data:image/png;base64,AAAA) }\n"
+    )
+    assert count == 4
+    assert unresolved == [f"{SITE}/img/missing.png"]
+
+
+def test_css_from_another_host_resolves_against_that_host(rewriter: capture_mirror.MirrorRewriter) -> None:
+    css = b"a { background: url(eggs.jpg) } b { background: url(/assets/site.css) }"
+    body, count, unresolved = rewriter.rewrite_css(css, f"{CDN}/theme.css")
+    assert body == b"a { background: url(/_assets/eggs.jpg) } b { background: url(/assets/site.css) }"
+    assert count == 1
+    assert unresolved == ["https://images.squarespace-cdn.com/assets/site.css"]
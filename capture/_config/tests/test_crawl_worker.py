@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import threading
+from typing import Any
+
+import pytest
+from conftest import LocalServer
+
+import fake_agent_browser
+import lovelysunday_capture as capture
+
+PAGE_SCRIPT = "(() => ({ resourceEntries: [] }))()"
+
+
+@pytest.fixture(autouse=True)
+def fake_driver(monkeypatch: pytest.MonkeyPatch, fake_browser: None) -> None:
+    monkeypatch.setattr(capture, "PAGE_RETRY_BACKOFF_SECONDS", 0.0)
+
+
+def crawl(tmp_path: pathlib.Path, urls: list[str], retries: int = 0) -> list[dict[str, Any]]:
+    records: list[dict[str, Any]] = []
+    queue = capture.UrlQueue(urls)
+    finished = capture.crawl_worker(
+        1,
+        queue,
+        PAGE_SCRIPT,
+        tmp_path,
+        {},
+        threading.Lock(),
+        on_capture=lambda record, page_data: records.append(record),
+        ready=(["wait", "0"], 45),
+        retries=retries,
+    )
+    assert finished == len(records)
+    return records
+
+
+def fail_page_eval(monkeypatch: pytest.MonkeyPatch, times: int) -> list[str]:
+    # The page extraction eval fails the first `times` calls, as a page whose script throws would.
+    calls: list[str] = []
+    original = fake_agent_browser.Browser.evaluate
+
+    def evaluate(self: fake_agent_browser.Browser, script: str) -> Any:
+        if script == PAGE_SCRIPT:
+            calls.append(self.state["url"])
+            if len(calls) <= times:
+                raise ValueError("page script failed")
+        return original(self, script)
+
+    monkeypatch.setattr(fake_agent_browser.Browser, "evaluate", evaluate)
+    return calls
+
+
+def test_success_writes_page_artifacts(tmp_path: pathlib.Path) -> None:
+    [record] = crawl(tmp_path, ["https://www.lovelysunday.co/about"])
+    assert record["status"] == "success"
+    assert record["attempts"] == 1
+    assert (tmp_path / record["rawHtmlFile"]).read_text().startswith("<html>")
+    for viewport in capture.DEFAULT_VIEWPORTS:
+        assert (tmp_path / record[f"{viewport.name}Screenshot"]).read_bytes().startswith(b"\x89PNG")
+    page = json.loads((tmp_path / record["jsonFile"]).read_text())
+    assert page["_capture"]["requestedUrl"] == "https://www.lovelysunday.co/about"
+
+
+def test_failed_page_is_retried(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = fail_page_eval(monkeypatch, times=1)
+    [record] = crawl(tmp_path, ["https://www.lovelysunday.co/about"], retries=1)
+    assert record["status"] == "success"
+    assert record["attempts"] == 2
+    assert len(calls) == 2
+
+
+def test_failure_is_recorded_once_retries_run_out(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = fail_page_eval(monkeypatch, times=10)
+    [record] = crawl(tmp_path, ["https://www.lovelysunday.co/about"], retries=1)
+    assert record["status"] == "error"
+    assert record["failureClass"] == "eval"
+    assert record["attempts"] == 2
+    assert "page script failed" in record["error"]
+    assert len(calls) == 2
+
+
+def test_viewport_pool_is_shut_down_when_the_worker_raises(tmp_path: pathlib.Path) -> None:
+    def on_capture(record: dict[str, Any], page_data: dict[str, Any] | None) -> None:
+        raise RuntimeError("journal write failed")
+
+    with pytest.raises(RuntimeError, match="journal write failed"):
+        capture.crawl_worker(
+            7,
+            capture.UrlQueue(["https://www.lovelysunday.co/about"]),
+            PAGE_SCRIPT,
+            tmp_path,
+            {},
+            threading.Lock(),
+            on_capture=on_capture,
+            ready=(["wait", "0"], 45),
+            viewport_mode="sessions",
+        )
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("crawl-7-viewport")]
+
+
+@pytest.mark.parametrize(
+    "retries, served, requeued, failure, probes",
+    [
+        # No retry left: a GET could not change the outcome, so none is sent.
+        (0, 404, False, "navigation", 0),
+        (1, 404, False, "http_status", 1),
+        (1, 200, True, "navigation", 1),
+        (1, 429, True, "navigation", 1),
+    ],
+)
+def test_navigation_failure_probes_only_while_retries_remain(
+    local_server: LocalServer,
+    client: capture.HttpClient,
+    monkeypatch: pytest.MonkeyPatch,
+    retries: int,
+    served: int,
+    requeued: bool,
+    failure: str,
+    probes: int,
+) -> None:
+    monkeypatch.setattr(capture, "_http_client", client)
+    local_server.serve("/gone", b"", status=served)
+    url = local_server.url("/gone")
+    queue = capture.UrlQueue([url])
+    assert queue.get() == url
+    item = {"url": url, "attempts": queue.start_attempt(url)}
+    error = capture.BrowserCommandError("open failed", ["open", url])
+
+    assert capture.handle_page_failure(queue, item, error, "agent-1", {}, retries) is requeued
+    assert item["failureClass"] == failure
+    assert item.get("httpStatus") == (served if failure == "http_status" else None)
+    assert len(local_server.seen("/gone")) == probes
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import collections
+import email.utils
+import functools
+import pathlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import pytest
+from conftest import LocalHandler, LocalServer
+
+import lovelysunday_capture as capture
+
+
+class Downloads:
+    # Stand-in for download_one_asset: records when each call ran and how many overlapped per host.
+    def __init__(self, duration: float = 0.0) -> None:
+        self.duration = duration
+        self.calls: list[tuple[str, float, float]] = []
+        self.running: collections.Counter[str] = collections.Counter()
+        self.peak: collections.Counter[str] = collections.Counter()
+        self.peak_total = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url: str, outcomes: list[dict[str, Any]]) -> dict[str, Any]:
+        host = url.split("/")[2]
+        with self.lock:
+            self.running[host] += 1
+            self.peak[host] = max(self.peak[host], self.running[host])
+            self.peak_total = max(self.peak_total, sum(self.running.values()))
+        started = time.perf_counter()
+        time.sleep(self.duration)
+        with self.lock:
+            self.running[host] -= 1
+            self.calls.append((url, started, time.perf_counter()))
+            outcome = outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+        return {"url": url, **outcome}
+
+    def bind(self, url: str, *outcomes: dict[str, Any]) -> Callable[[], dict[str, Any]]:
+        return functools.partial(self, url, list(outcomes or [{"status": "success"}]))
+
+    def count(self, url: str) -> int:
+        return sum(1 for called, _, _ in self.calls if called == url)
+
+
+SUCCESS = {"status": "success"}
+TRANSIENT = {"status": "error", "retryable": True, "httpStatus": 503}
+PERMANENT = {"status": "error", "retryable": False, "httpStatus": 404}
+
+
+def engine(**kwargs: Any) -> capture.AssetDownloadEngine:
+    return capture.AssetDownloadEngine(**{"workers": 8, "backoff_base": 0.0, **kwargs})
+
+
+def test_concurrency_is_capped_per_host() -> None:
+    downloads = Downloads(duration=0.05)
+    with engine(max_per_host=2) as downloader:
+        futures = [downloader.submit(url, downloads.bind(url)) for url in [f"https://a.test/{i}.jpg" for i in range(6)]]
+        futures += [downloader.submit(url, downloads.bind(url)) for url in [f"https://b.test/{i}.jpg" for i in range(2)]]
+        assert all(future.result(timeout=10)["status"] == "success" for future in futures)
+    assert downloads.peak["a.test"] == 2
+    assert downloads.peak["b.test"] == 2
+    # The cap is per host: b.test transfers ran alongside a.test ones.
+    assert downloads.peak_total > 2
+
+
+@pytest.mark.parametrize(
+    "outcomes, retries, attempts",
+    [
+        ([SUCCESS], 3, 1),
+        ([TRANSIENT, TRANSIENT, SUCCESS], 3, 3),
+        ([TRANSIENT], 3, 4),
+        ([TRANSIENT], 0, 1),
+        ([PERMANENT], 3, 1),
+    ],
+)
+def test_retry_count(outcomes: list[dict[str, Any]], retries: int, attempts: int) -> None:
+    downloads = Downloads()
+    url = "https://a.test/logo.png"
+    with engine(retries=retries) as downloader:
+        record = downloader.submit(url, downloads.bind(url, *outcomes)).result(timeout=10)
+        assert downloader.retried == attempts - 1
+    assert record["attempts"] == attempts == downloads.count(url)
+    assert record["status"] == ("success" if outcomes[-1] is SUCCESS else "error")
+    assert "retryable" not in record
+
+
+def test_retry_after_pauses_the_whole_host() -> None:
+    downloads = Downloads()
+    throttled = {**TRANSIENT, "httpStatus": 429, "retryAfter": "30"}
+    first, same_host, other_host = "https://a.test/1.jpg", "https://a.test/2.jpg", "https://b.test/1.jpg"
+    with engine(retry_after_max=0.4) as downloader:
+        future = downloader.submit(first, downloads.bind(first, throttled, SUCCESS))
+        while not downloads.calls:
+            time.sleep(0.005)
+        time.sleep(0.05)
+        later = [downloader.submit(url, downloads.bind(url)) for url in (same_host, other_host)]
+        record = future.result(timeout=10)
+        assert all(item.result(timeout=10)["status"] == "success" for item in later)
+    assert record["attempts"] == 2
+    starts = {url: started for url, started, _ in downloads.calls}
+    throttled_at = downloads.calls[0][2]
+    # Retry-After is capped by retry_after_max; it holds back the retry and other URLs on the host.
+    assert starts[first] - throttled_at >= 0.35
+    assert starts[same_host] - throttled_at >= 0.35
+    assert starts[other_host] - throttled_at < 0.3
+
+
+def test_host_rate_spaces_starts() -> None:
+    downloads = Downloads()
+    urls = [f"https://a.test/{i}.jpg" for i in range(3)]
+    with engine(host_rate=10) as downloader:
+        for future in [downloader.submit(url, downloads.bind(url)) for url in urls]:
+            future.result(timeout=10)
+    starts = sorted(started for _, started, _ in downloads.calls)
+    assert all(later - earlier >= 0.09 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_retry_after_values() -> None:
+    assert capture.retry_after_seconds("120") == 120.0
+    assert capture.retry_after_seconds(" 0 ") == 0.0
+    soon = email.utils.format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 <= capture.retry_after_seconds(soon) <= 60
+    assert capture.retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert capture.retry_after_seconds("soon") is None
+    assert capture.retry_after_seconds(None) is None
+
+
+def test_http_retry_after_reaches_the_engine(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    answers = iter([(503, {"Retry-After": "5"}), (200, {"Content-Type": "image/png"})])
+
+    def flaky(handler: LocalHandler) -> None:
+        status, headers = next(answers)
+        handler.reply(status, b"png" if status == 200 else b"busy", headers)
+
+    local_server.routes["/logo.png"] = flaky
+    url = local_server.url("/logo.png")
+    download = functools.partial(capture.download_one_asset, url, tmp_path / "downloads", tmp_path, client=client)
+    started = time.perf_counter()
+    with engine(retry_after_max=0.2) as downloader:
+        record = downloader.submit(url, download).result(timeout=10)
+    assert (record["status"], record["attempts"], record["httpStatus"]) == ("success", 2, 200)
+    assert time.perf_counter() - started >= 0.2
+    assert len(local_server.seen("/logo.png")) == 2
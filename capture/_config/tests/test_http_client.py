@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import gzip
+import zlib
+from typing import Callable
+
+import pytest
+from conftest import LocalServer
+
+import lovelysunday_capture as capture
+
+BODY = b"<html><body>" + b"lovely sunday " * 500 + b"</body></html>"
+
+
+def test_requests_to_one_host_reuse_the_connection(local_server: LocalServer) -> None:
+    local_server.serve("/a", b"a")
+    local_server.serve("/b", b"b")
+    client = capture.HttpClient()
+    try:
+        assert client.request(local_server.url("/a")).body == b"a"
+        assert client.request(local_server.url("/b")).body == b"b"
+        assert client.stats() == {"connectionsOpened": 1, "requests": 2, "connectionsReused": 1}
+    finally:
+        client.close()
+    [first], [second] = local_server.seen("/a"), local_server.seen("/b")
+    assert first.client_port == second.client_port
+
+
+@pytest.mark.parametrize(
+    "encoding, compress",
+    [
+        ("gzip", gzip.compress),
+        ("deflate", zlib.compress),
+    ],
+)
+def test_compressed_bodies_are_decoded(local_server: LocalServer, encoding: str, compress: Callable[[bytes], bytes]) -> None:
+    local_server.serve("/page", compress(BODY), {"Content-Encoding": encoding})
+    client = capture.HttpClient()
+    try:
+        response = client.request(local_server.url("/page"))
+    finally:
+        client.close()
+    assert response.body == BODY
+    [seen] = local_server.seen("/page")
+    assert encoding in seen.headers["Accept-Encoding"]
+
+
+def test_brotli_bodies_are_decoded(local_server: LocalServer) -> None:
+    brotli = pytest.importorskip("brotli")
+    local_server.serve("/page", brotli.compress(BODY), {"Content-Encoding": "br"})
+    client = capture.HttpClient()
+    try:
+        assert client.request(local_server.url("/page")).body == BODY
+    finally:
+        client.close()
+    [seen] = local_server.seen("/page")
+    assert "br" in seen.headers["Accept-Encoding"]
+
+
+def test_decoded_response_reads_in_chunks(local_server: LocalServer) -> None:
+    local_server.serve("/page", gzip.compress(BODY), {"Content-Encoding": "gzip"})
+    client = capture.HttpClient()
+    try:
+        with client.open(local_server.url("/page")) as response:
+            chunks = iter(lambda: response.read(1000), b"")
+            assert b"".join(chunks) == BODY
+    finally:
+        client.close()
+
+
+def test_error_response_that_closes_is_not_reused(local_server: LocalServer) -> None:
+    local_server.routes["/gone"] = lambda handler: handler.reply(503, b"down", close=True)
+    local_server.serve("/ok", b"ok")
+    client = capture.HttpClient()
+    try:
+        with pytest.raises(capture.HttpStatusError) as error:
+            client.request(local_server.url("/gone"))
+        assert error.value.status == 503
+        # The server said it would close, so nothing went back to the idle pool.
+        assert not any(client._idle.values())
+        assert client.request(local_server.url("/ok")).body == b"ok"
+        assert client.stats()["connectionsOpened"] == 2
+    finally:
+        client.close()
+    assert local_server.seen("/gone")[0].client_port != local_server.seen("/ok")[0].client_port
+
+
+def test_keep_alive_error_response_leaves_the_connection_reusable(local_server: LocalServer) -> None:
+    local_server.serve("/missing", b"no such page", status=404)
+    local_server.serve("/ok", b"ok")
+    client = capture.HttpClient()
+    try:
+        with pytest.raises(capture.HttpStatusError):
+            client.request(local_server.url("/missing"))
+        assert client.request(local_server.url("/ok")).body == b"ok"
+        assert client.stats()["connectionsOpened"] == 1
+    finally:
+        client.close()
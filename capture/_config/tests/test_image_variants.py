@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import pathlib
+
+import pytest
+from conftest import LocalServer, LocalSite
+
+import lovelysunday_capture as capture
+
+EGGS = "https://images.squarespace-cdn.com/content/v1/5f1a/eggs.jpg"
+WIDTHS = [100, 300, 500, 750, 1000, 1500]
+RENDITIONS = [f"{EGGS}?format={width}w" for width in WIDTHS] + [f"{EGGS}?format=original"]
+
+
+def by_width(width: int | None) -> str:
+    return f"{EGGS}?format={width}w" if width else f"{EGGS}?format=original"
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        (f"{EGGS}?format=500w", (EGGS, 500)),
+        (f"{EGGS}?format=original", (EGGS, None)),
+        # Other query parameters stay part of the base URL.
+        (f"{EGGS}?content-type=image%2Fjpeg&format=750w", (f"{EGGS}?content-type=image%2Fjpeg", 750)),
+        (f"{EGGS}?format=500", None),
+        (f"{EGGS}?format=500w&format=750w", None),
+        (EGGS, None),
+    ],
+)
+def test_format_renditions_are_grouped_by_base_url(url: str, expected: tuple[str, int | None] | None) -> None:
+    assert capture.image_variant(url) == expected
+
+
+@pytest.mark.parametrize(
+    "policy, widths, selected, resolves",
+    [
+        ("all", (), [*WIDTHS, None], {width: width for width in [*WIDTHS, None]}),
+        ("largest", (), [None], {width: None for width in [*WIDTHS, None]}),
+        (
+            "widths",
+            (500, 1000),
+            [500, 1000, None],
+            {100: 500, 300: 500, 500: 500, 750: 1000, 1000: 1000, 1500: None, None: None},
+        ),
+    ],
+)
+def test_selection_and_resolves_to_per_mode(
+    policy: str, widths: tuple[int, ...], selected: list[int | None], resolves: dict[int | None, int | None]
+) -> None:
+    variants = capture.ImageVariants(policy, widths)
+    css = "https://www.lovelysunday.co/site.css"
+    assert variants.admit([css, *RENDITIONS]) == sorted([css, *(by_width(width) for width in selected)])
+    assert variants.skipped() == len(RENDITIONS) - len(selected)
+    assert variants.skipped_urls() == set(RENDITIONS) - {by_width(width) for width in selected}
+    [group] = variants.manifest()
+    assert group["base"] == EGGS
+    assert [variant["width"] for variant in group["variants"]] == [*WIDTHS, None]
+    for variant in group["variants"]:
+        assert variant["selected"] == (variant["width"] in selected)
+        assert variant["resolvesTo"] == by_width(resolves[variant["width"]])
+
+
+def test_selection_only_grows_as_pages_arrive() -> None:
+    variants = capture.ImageVariants("largest")
+    assert variants.admit([by_width(500), by_width(1000)]) == [by_width(1000)]
+    # A later page references a wider rendition: it is added, and the earlier choice stays downloaded.
+    assert variants.admit([by_width(1500)]) == [by_width(1500)]
+    assert variants.admit([by_width(750)]) == []
+    assert variants.selected == {by_width(1000), by_width(1500)}
+    assert variants.resolve(by_width(500)) == by_width(1000)
+    assert variants.resolve(by_width(1200)) == by_width(1500)
+    assert variants.resolve(EGGS) == EGGS
+
+
+def test_asset_urls_lists_only_downloaded_renditions(
+    tmp_path: pathlib.Path, local_site: LocalSite, local_server: LocalServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    srcset = ", ".join(f"/img/eggs.jpg?format={width}w {width}w" for width in (500, 1000, 1500))
+    local_site.page(
+        "/",
+        f'<html><head><title>Home</title></head><body><main><img src="/img/eggs.jpg?format=500w" srcset="{srcset}"></main></body></html>',
+    )
+    local_server.serve("/img/eggs.jpg", b"jpeg", {"Content-Type": "image/jpeg"})
+    output = tmp_path / "capture"
+    local_site.capture(monkeypatch, output, "--image-variants", "largest")
+
+    base = f"{local_site.base}/img/eggs.jpg"
+    assert (output / "manifests" / "asset_urls.txt").read_text(encoding="utf-8").split() == [f"{base}?format=1500w"]
+    assert [request.path for request in local_server.requests if request.path.startswith("/img/")] == ["/img/eggs.jpg?format=1500w"]
+    manifest = json.loads((output / "manifests" / "assets_manifest.json").read_text(encoding="utf-8"))
+    [group] = manifest["variantGroups"]
+    assert {variant["url"]: variant["resolvesTo"] for variant in group["variants"]} == {
+        f"{base}?format={width}w": f"{base}?format=1500w" for width in (500, 1000, 1500)
+    }
+    summary = json.loads((output / "manifests" / "summary.json").read_text(encoding="utf-8"))
+    assert summary["assets"]["queued"] == 1
+    assert summary["assets"]["variants"]["skipped"] == 2
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pathlib
+
+import pytest
+
+import lovelysunday_capture as capture
+
+
+def test_full_run_does_not_probe_pages(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def probe_page(*args: object, **kwargs: object) -> dict[str, object]:
+        raise AssertionError("a full run must not fetch pages before rendering them")
+
+    monkeypatch.setattr(capture, "probe_page", probe_page)
+    url = "https://www.lovelysunday.co/about"
+    plan = capture.plan_incremental([url], {url: "2020-05-10"}, {}, tmp_path, incremental=False, probe_workers=2)
+    assert plan == {url: {"refresh": True, "reason": "full", "validators": {"sitemapLastmod": "2020-05-10"}}}
+
+
+def test_incremental_run_probes_new_pages(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    probed: list[str] = []
+
+    def probe_page(url: str, previous: object) -> dict[str, object]:
+        probed.append(url)
+        return {"httpStatus": 200, "httpEtag": '"abc"', "contentHash": "h"}
+
+    monkeypatch.setattr(capture, "probe_page", probe_page)
+    url = "https://www.lovelysunday.co/about"
+    plan = capture.plan_incremental([url], {}, {}, tmp_path, incremental=True, probe_workers=2)
+    assert probed == [url]
+    assert plan[url]["refresh"] is True
+    assert plan[url]["reason"] == "new"
+    assert plan[url]["validators"]["httpEtag"] == '"abc"'
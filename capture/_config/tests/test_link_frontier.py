@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import lovelysunday_capture as capture
+
+SITE = "https://www.lovelysunday.co"
+
+
+def page(*hrefs: str) -> dict[str, list[dict[str, str]]]:
+    return {"links": [{"href": href} for href in hrefs]}
+
+
+def test_discovery_is_breadth_first_up_to_max_depth() -> None:
+    frontier = capture.LinkFrontier([f"{SITE}/"], enabled=True, max_depth=2, max_pages=0)
+    assert frontier.add_page(f"{SITE}/", page(f"{SITE}/journal", f"{SITE}/about")) == [f"{SITE}/journal", f"{SITE}/about"]
+    assert frontier.add_page(f"{SITE}/journal", page(f"{SITE}/journal/brunch")) == [f"{SITE}/journal/brunch"]
+    # Depth 3 is past max_depth: the edge is kept for the link graph, the page is not crawled.
+    assert frontier.add_page(f"{SITE}/journal/brunch", page(f"{SITE}/journal/brunch/eggs")) == []
+    assert frontier.depth == {
+        f"{SITE}/": 0,
+        f"{SITE}/journal": 1,
+        f"{SITE}/about": 1,
+        f"{SITE}/journal/brunch": 2,
+    }
+    assert frontier.edges[f"{SITE}/journal/brunch"] == [f"{SITE}/journal/brunch/eggs"]
+
+
+def test_links_are_normalized_and_admitted_once() -> None:
+    frontier = capture.LinkFrontier([f"{SITE}/", f"{SITE}/about"], enabled=True, max_depth=3, max_pages=0)
+    admitted = frontier.add_page(
+        f"{SITE}/",
+        page(
+            f"{SITE}/",  # itself
+            f"{SITE}/about",  # already in the inventory
+            "http://www.lovelysunday.co/journal/",  # http and a trailing slash
+            f"{SITE}/journal#comments",
+            f"{SITE}/journal",
+            "https://www.instagram.com/lovelysunday",
+            f"{SITE}/assets/logo.png",
+            f"{SITE}/api/commerce/cart",
+            "",
+        ),
+    )
+    assert admitted == [f"{SITE}/journal"]
+    assert frontier.add_page(f"{SITE}/about", page(f"{SITE}/journal", f"{SITE}/contact")) == [f"{SITE}/contact"]
+    assert frontier.discovered == [f"{SITE}/journal", f"{SITE}/contact"]
+    assert frontier.edges[f"{SITE}/about"] == [f"{SITE}/journal", f"{SITE}/contact"]
+
+
+def test_max_pages_caps_discovery() -> None:
+    frontier = capture.LinkFrontier([f"{SITE}/"], enabled=True, max_depth=5, max_pages=2)
+    links = [f"{SITE}/p{index}" for index in range(5)]
+    assert frontier.add_page(f"{SITE}/", page(*links)) == links[:2]
+    assert frontier.add_page(links[0], page(f"{SITE}/more")) == []
+
+
+def test_disabled_discovery_still_records_the_link_graph() -> None:
+    frontier = capture.LinkFrontier([f"{SITE}/"], enabled=False, max_depth=3, max_pages=0)
+    assert frontier.add_page(f"{SITE}/", page(f"{SITE}/journal")) == []
+    manifest = frontier.manifest()
+    assert manifest["nodes"] == [{"url": f"{SITE}/", "depth": 0, "discovered": False}]
+    assert manifest["edges"] == [{"from": f"{SITE}/", "to": f"{SITE}/journal"}]
+
+
+def test_idle_queue_waits_for_pages_in_progress() -> None:
+    queue = capture.UrlQueue([f"{SITE}/"], close_when_idle=True)
+    assert queue.get() == f"{SITE}/"
+    got: list[str | None] = []
+    waiter = threading.Thread(target=lambda: got.append(queue.get()))
+    waiter.start()
+    # The page being captured may still discover links, so a second worker must not be released yet.
+    waiter.join(timeout=0.1)
+    assert waiter.is_alive()
+    queue.put(f"{SITE}/journal")
+    waiter.join(timeout=5)
+    assert got == [f"{SITE}/journal"]
+    queue.mark_done()
+    queue.mark_done()
+    assert queue.get() is None
+
+
+def test_idle_queue_stays_open_for_a_retry() -> None:
+    queue = capture.UrlQueue([f"{SITE}/"], close_when_idle=True)
+    assert queue.get() == f"{SITE}/"
+    queue.retry(f"{SITE}/", 0.05)
+    assert queue.get() == f"{SITE}/"
+    queue.mark_done()
+    assert queue.get() is None
+
+
+def test_discovery_crawl_shuts_down_once_idle() -> None:
+    # Workers are the only producers: each captured page feeds its new links back into the queue.
+    site = {
+        f"{SITE}/": page(f"{SITE}/a", f"{SITE}/b"),
+        f"{SITE}/a": page(f"{SITE}/", f"{SITE}/c"),
+        f"{SITE}/b": page(f"{SITE}/c", f"{SITE}/d"),
+        f"{SITE}/c": page(f"{SITE}/e"),
+        f"{SITE}/d": page(),
+        f"{SITE}/e": page(f"{SITE}/f"),
+    }
+    frontier = capture.LinkFrontier([f"{SITE}/"], enabled=True, max_depth=3, max_pages=0)
+    queue = capture.UrlQueue([f"{SITE}/"], name="crawl", close_when_idle=True)
+    crawled: list[str] = []
+    busy: set[str] = set()
+    lock = threading.Lock()
+
+    def worker() -> None:
+        while (url := queue.get()) is not None:
+            time.sleep(0.01)
+            with lock:
+                crawled.append(url)
+                busy.add(threading.current_thread().name)
+            for target in frontier.add_page(url, site[url]):
+                queue.put(target)
+            queue.mark_done()
+
+    workers = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in workers)
+    assert sorted(crawled) == sorted(site)
+    # /f is at depth 4, past max_depth.
+    assert f"{SITE}/f" not in frontier.depth
+    assert queue.completed == queue.total == 6
+    # Workers idle while the seed page was captured stayed to take the pages it discovered.
+    assert len(busy) > 1
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from conftest import LocalServer
+
+import lovelysunday_capture as capture
+
+URL = "https://www.lovelysunday.co/journal/brunch"
+
+# What page_verify.js returns for this page in a browser (scripting on): <base> does not move the
+# canonical (toAbs resolves against location.href), noscript and template content are not elements,
+# and the main text is the innerText of the first main/article/[role=main].
+PAGE = """<!doctype html>
+<html><head>
+<title>  Lovely
+  Sunday | Brunch </title>
+<base href="/static/">
+<link rel="stylesheet" href="site.css">
+<link rel="canonical" href="brunch?ref=feed">
+<link rel="canonical" href="/ignored-second-canonical">
+</head>
+<body>
+<svg viewBox="0 0 1 1"><title>icon</title><rect/></svg>
+<header><h1>  Lovely   Sunday </h1><a href="/">Home</a><a name="top">no href</a></header>
+<noscript><img src="/pixel.gif"><a href="/nojs">nojs</a></noscript>
+<main>
+  <h1></h1>
+  <p>Sunday <b>brunch</b> recipes</p>
+  <img src="eggs.jpg" alt="">
+  <script>var hidden = "<p>not text</p>";</script>
+  <p>Second&nbsp;paragraph</p>
+  <article><p>Nested</p></article>
+</main>
+<article><p>Later article</p></article>
+<footer><a href="/about">About</a><img src="/footer.png"></footer>
+<template><img src="row.png"><h1>Template</h1></template>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    # Computed in JS with the page_verify.js loop: (hash * 31 + s.charCodeAt(i)) >>> 0.
+    [
+        ("", 0),
+        ("a", 97),
+        ("Lovely Sunday", 4272658577),
+        ("café ☕ crème brûlée", 106478806),
+        ("🌻 sunflowers and 日本語", 762078363),
+        (" ".join(["Lovely Sunday"] * 200), 2856997736),
+    ],
+)
+def test_js_string_hash_matches_page_verify(text: str, expected: int) -> None:
+    assert capture.js_string_hash(text) == expected
+
+
+def parse(html: str, chunk: int | None = None) -> dict[str, Any]:
+    parser = capture.LiveFieldParser()
+    for start in range(0, len(html), chunk or len(html)):
+        parser.feed(html[start : start + (chunk or len(html))])
+    parser.close()
+    return parser.result(URL)
+
+
+def test_fields_match_what_page_verify_reads() -> None:
+    live = parse(PAGE)
+    assert live["url"] == URL
+    assert live["title"] == "Lovely Sunday | Brunch"
+    assert live["canonical"] == "https://www.lovelysunday.co/journal/brunch?ref=feed"
+    assert live["h1"] == ["Lovely Sunday"]
+    assert live["imageCount"] == 2
+    assert live["linkCount"] == 2
+    assert live["mainTextHash"] == capture.js_string_hash("Sunday brunch recipes Second paragraph Nested")
+
+
+def test_fields_do_not_depend_on_how_the_body_is_chunked() -> None:
+    assert {key: value for key, value in parse(PAGE, chunk=7).items() if key != "checkedAt"} == {
+        key: value for key, value in parse(PAGE).items() if key != "checkedAt"
+    }
+
+
+def test_page_without_main_hashes_the_body_text() -> None:
+    live = parse("<html><head><title>T</title></head><body><div>One</div><p>Two</p></body></html>")
+    assert live["mainTextHash"] == capture.js_string_hash("One Two")
+    assert live["canonical"] is None
+
+
+def test_extract_live_fields_reads_the_response(
+    local_server: LocalServer, client: capture.HttpClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    body = PAGE.replace("Lovely", "Lovelý").encode("iso-8859-1")
+    local_server.serve("/journal/brunch", body, {"Content-Type": "text/html; charset=ISO-8859-1"})
+    monkeypatch.setattr(capture, "_http_client", client)
+    live = capture.extract_live_fields(local_server.url("/journal/brunch"))
+    assert live["title"] == "Lovelý Sunday | Brunch"
+    assert live["canonical"] == local_server.url("/journal/brunch?ref=feed")
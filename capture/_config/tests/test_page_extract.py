@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import shutil
+import subprocess
+from typing import Any
+
+import pytest
+
+import lovelysunday_capture as capture
+
+CONFIG_DIR = pathlib.Path(__file__).resolve().parents[1]
+PAGE_URL = "https://www.lovelysunday.co/journal/brunch"
+CDN = "https://images.squarespace-cdn.com/content/v1/5f1a"
+
+# page_extract.js runs against a document stub: each selector it queries maps to a list of elements,
+# and "main <selector>" to the elements under the page's main text root.
+ELEMENTS: dict[str, list[dict[str, Any]]] = {
+    "a[href]": [
+        {"attrs": {"href": "/journal"}, "text": "Journal"},
+        {"attrs": {"href": "/journal/brunch?page=2"}, "text": " Next "},
+        {"attrs": {"href": "/journal"}, "text": "Journal"},
+        {"attrs": {"href": "https://www.instagram.com/lovelysunday", "rel": "noopener", "target": "_blank"}, "text": "IG"},
+    ],
+    "img": [
+        {
+            "attrs": {
+                "src": f"{CDN}/eggs.jpg?format=500w",
+                "alt": "Eggs",
+                "srcset": f"{CDN}/eggs.jpg?format=500w 500w, {CDN}/eggs.jpg?format=1000w 1000w",
+            }
+        },
+        {"attrs": {"src": f"{CDN}/toast.jpg", "alt": ""}},
+    ],
+    "video, video source, audio, audio source": [{"tag": "video", "attrs": {"src": "/media/pour.mp4", "type": "video/mp4"}}],
+    "script[src]": [{"attrs": {"src": "/assets/site.js"}, "async": True}],
+    "link[rel='stylesheet'], link[as='style']": [{"attrs": {"href": "/assets/site.css", "rel": "stylesheet"}}],
+    "link[rel*='icon']": [{"attrs": {"href": "/favicon.ico"}}],
+    "script[type='application/ld+json']": [{"text": '{"@type": "Article"}'}],
+    "nav a[href], [role='navigation'] a[href], header a[href], footer a[href]": [
+        {"attrs": {"href": "/journal"}},
+        {"attrs": {"href": "/about"}},
+    ],
+    "link[rel='canonical']": [{"attrs": {"href": "/journal/brunch"}}],
+    "meta[name='description']": [{"attrs": {"content": "Sunday  brunch"}}],
+    "meta[property='og:image']": [{"attrs": {"content": f"{CDN}/eggs.jpg"}}],
+    "h1": [{"text": "Brunch"}],
+    "h2": [{"text": "Eggs"}, {"text": "Toast"}],
+    "main p": [{"text": "Sunday brunch."}, {"text": "Sunday brunch."}, {"text": "Coffee."}],
+    "main li": [{"text": "Eggs"}],
+}
+
+HARNESS = """
+const table = TABLE;
+const element = (spec) => ({
+  tagName: (spec.tag || "div").toUpperCase(),
+  textContent: spec.text || "",
+  async: !!spec.async,
+  defer: !!spec.defer,
+  naturalWidth: 0,
+  naturalHeight: 0,
+  getAttribute: (name) => (spec.attrs && name in spec.attrs ? spec.attrs[name] : null),
+});
+const query = (prefix) => (selector) => (table[prefix + selector] || []).map(element);
+const main = { ...element({ tag: "main" }), innerText: "Sunday brunch.\\n\\nCoffee.", querySelectorAll: query("main ") };
+globalThis.location = { href: "PAGE_URL" };
+globalThis.document = {
+  title: " Brunch | Lovely Sunday ",
+  querySelectorAll: query(""),
+  querySelector: (selector) => (selector === "main, article, [role='main']" ? main : query("")(selector)[0] || null),
+};
+globalThis.performance = {
+  getEntriesByType: () => [{ name: "CDN/eggs.jpg?format=500w", initiatorType: "img", duration: 12.345 }],
+};
+const result = SCRIPT
+process.stdout.write(JSON.stringify(result));
+"""
+
+
+def run_extract(tmp_path: pathlib.Path, profile: str, **options: bool) -> dict[str, Any]:
+    if shutil.which("node") is None:
+        pytest.skip("node is needed to run page_extract.js")
+    script = capture.extract_command((CONFIG_DIR / "page_extract.js").read_text(encoding="utf-8"), profile, **options)
+    harness = HARNESS.replace("TABLE", json.dumps(ELEMENTS)).replace("PAGE_URL", PAGE_URL).replace("CDN", CDN)
+    path = tmp_path / "extract.js"
+    path.write_text(harness.replace("SCRIPT", script), encoding="utf-8")
+    output = subprocess.run(["node", str(path)], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def test_script_needs_its_options_filled_in() -> None:
+    page_js = (CONFIG_DIR / "page_extract.js").read_text(encoding="utf-8")
+    assert page_js.rstrip().endswith("})(EXTRACT_OPTIONS);")
+    assert "EXTRACT_OPTIONS" not in capture.extract_command(page_js, "full")
+
+
+@pytest.mark.parametrize("profile", sorted(capture.EXTRACT_PROFILES))
+def test_each_profile_keeps_only_its_sections(tmp_path: pathlib.Path, profile: str) -> None:
+    page = run_extract(tmp_path, profile)
+    core = {"capturedAt", "url", "title", "canonical", "headings", "counts"}
+    assert set(page) == core | set(capture.EXTRACT_PROFILES[profile])
+    assert page["canonical"] == PAGE_URL
+    # Counts describe the whole page whatever the profile drops.
+    assert page["counts"] == {
+        "links": 4,
+        "images": 2,
+        "paragraphs": 3,
+        "listItems": 1,
+        "scripts": 1,
+        "stylesheets": 1,
+        "jsonLd": 1,
+        "resources": 1,
+    }
+    if "headings" in capture.EXTRACT_PROFILES[profile]:
+        assert page["headings"]["h2"] == ["Eggs", "Toast"]
+    else:
+        assert page["headings"] == {"h1": ["Brunch"]}
+
+
+def test_link_discovery_adds_links_to_any_profile(tmp_path: pathlib.Path) -> None:
+    page = run_extract(tmp_path, "assets", links=True)
+    assert [link["href"] for link in page["links"]][:2] == ["https://www.lovelysunday.co/journal", f"{PAGE_URL}?page=2"]
+
+
+def test_dedupe_drops_repeated_list_entries(tmp_path: pathlib.Path) -> None:
+    plain = run_extract(tmp_path, "content")
+    deduped = run_extract(tmp_path, "content", dedupe=True)
+    assert len(plain["links"]) == 4 and len(deduped["links"]) == 3
+    assert deduped["paragraphs"] == ["Sunday brunch.", "Coffee."]
+    assert deduped["counts"] == plain["counts"]
+
+
+@pytest.mark.parametrize("profile", ["full", "assets"])
+def test_compact_urls_expand_to_the_same_page(tmp_path: pathlib.Path, profile: str) -> None:
+    plain = run_extract(tmp_path, profile)
+    compact = run_extract(tmp_path, profile, compact_urls=True)
+    index = compact["_urlPrefixes"].index("https://www.lovelysunday.co/journal/")
+    assert compact["url"] == f"{capture.URL_PREFIX_MARK}{index}{capture.URL_PREFIX_MARK}brunch"
+    assert len(json.dumps(compact)) < len(json.dumps(plain))
+    expanded = capture.expand_page_urls(compact)
+    for page in (plain, expanded):
+        page.pop("capturedAt")
+    assert expanded == plain
+
+
+def test_expand_leaves_pages_without_prefixes_alone() -> None:
+    page = {"url": PAGE_URL, "links": [{"href": f"{PAGE_URL}?page=2"}]}
+    assert capture.expand_page_urls(dict(page)) == page
+    assert capture.expand_page_urls({**page, "_urlPrefixes": []}) == page
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import threading
+from typing import Any
+
+import pytest
+
+import lovelysunday_capture as capture
+
+URL = "https://www.lovelysunday.co/journal/brunch"
+PAGE: dict[str, Any] = {
+    "url": URL,
+    "title": "Brunch — Lovely Sunday",
+    "canonical": URL,
+    "headings": {"h1": ["Brunch"]},
+    "images": [
+        {
+            "src": "https://images.squarespace-cdn.com/content/eggs.jpg",
+            "srcset": ["https://images.squarespace-cdn.com/content/eggs.jpg?format=750w"],
+        },
+    ],
+    "stylesheets": [{"href": "https://www.lovelysunday.co/site.css"}],
+    "links": [{"href": "https://www.lovelysunday.co/about", "text": "About"}],
+    "counts": {"images": 1, "links": 1, "resources": 0},
+    "_capture": {"pageId": "journal-brunch", "capturedAt": "2026-10-17T00:00:00Z"},
+}
+
+
+def test_round_trip_through_a_reopened_store(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / capture.PAGE_STORE_FILE
+    assert capture.PageStore.open_existing(path) is None
+
+    store = capture.PageStore(path)
+    store.put(URL, PAGE)
+    store.close()
+
+    reopened = capture.PageStore.open_existing(path)
+    assert reopened is not None
+    try:
+        assert reopened.get(URL) == PAGE
+        assert reopened.get("journal-brunch") == PAGE
+        assert reopened.has(URL)
+        assert reopened.urls() == [URL]
+        assert reopened.asset_urls() == [
+            "https://images.squarespace-cdn.com/content/eggs.jpg",
+            "https://images.squarespace-cdn.com/content/eggs.jpg?format=750w",
+            "https://www.lovelysunday.co/site.css",
+        ]
+        assert reopened.pages_referencing("https://www.lovelysunday.co/site.css") == [URL]
+        assert reopened.stats()["pages"] == 1
+    finally:
+        reopened.close()
+
+
+def test_put_replaces_the_page_and_its_assets(tmp_path: pathlib.Path) -> None:
+    store = capture.PageStore(tmp_path / "pages.sqlite")
+    try:
+        store.put(URL, PAGE)
+        store.put(URL, {**PAGE, "title": "Brunch, again", "images": [], "stylesheets": []})
+        assert store.get(URL)["title"] == "Brunch, again"
+        assert store.asset_urls() == []
+        assert store.prune(set()) == 1
+        assert store.get(URL) is None
+    finally:
+        store.close()
+
+
+def test_export_matches_the_stored_page(tmp_path: pathlib.Path) -> None:
+    store = capture.PageStore(tmp_path / capture.PAGE_STORE_FILE)
+    try:
+        store.put(URL, PAGE)
+        records = [{"url": URL, "jsonFile": "page_json/journal-brunch.json"}, {"url": URL + "/missing"}]
+        assert store.export_json(tmp_path, records) == 1
+        exported = tmp_path / "page_json" / "journal-brunch.json"
+        assert json.loads(exported.read_text(encoding="utf-8")) == store.get(URL)
+    finally:
+        store.close()
+
+
+@pytest.mark.usefixtures("fake_browser")
+def test_export_matches_what_a_run_without_the_store_writes(tmp_path: pathlib.Path) -> None:
+    # The same crawl, once writing page_json directly and once through the store plus export.
+    url = "https://www.lovelysunday.co/about"
+    outputs = {}
+    for name in ("direct", "stored"):
+        root = tmp_path / name
+        store = capture.PageStore(root / capture.PAGE_STORE_FILE) if name == "stored" else None
+        records: list[dict[str, Any]] = []
+        capture.crawl_worker(
+            1,
+            capture.UrlQueue([url]),
+            "(() => ({ resourceEntries: [] }))()",
+            root,
+            {},
+            threading.Lock(),
+            on_capture=lambda record, page: records.append(record),
+            ready=(["wait", "0"], 45),
+            store=store,
+        )
+        if store is not None:
+            assert not (root / records[0]["jsonFile"]).exists()
+            store.export_json(root, records)
+            store.close()
+        outputs[name] = json.loads((root / records[0]["jsonFile"]).read_text(encoding="utf-8"))
+    for page in outputs.values():
+        page["_capture"].pop("capturedAt")
+        page.pop("capturedAt")
+    assert outputs["stored"] == outputs["direct"]
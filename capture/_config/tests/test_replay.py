@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pathlib
+
+import capture_replay
+
+SITE = "https://www.lovelysunday.co/"
+BODY = (
+    b'<a href="https://www.lovelysunday.co/about">a</a><img src="//cdn.example.com/x.png">'
+    b"<p>http://other.example/</p><script>// a comment\n</script>"
+)
+
+
+def rewritten(root: pathlib.Path) -> bytes:
+    server = capture_replay.ReplayServer(("127.0.0.1", 0), capture_replay.ReplayIndex(root, SITE), SITE)
+    try:
+        return server.rewrite(BODY)
+    finally:
+        server.server_close()
+
+
+def test_rewrite_points_captured_hosts_at_the_replay_origin(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "manifests").mkdir()
+    (tmp_path / "manifests" / "sitemap.xml").write_text("<urlset/>")
+    body = rewritten(tmp_path)
+    assert b'href="http://127.0.0.1:' in body
+    assert b"https://www.lovelysunday.co" not in body
+    assert b"//cdn.example.com/x.png" in body
+    assert b"http://other.example/" in body
+
+
+def test_rewrite_leaves_bodies_alone_when_the_capture_has_no_hosts(tmp_path: pathlib.Path) -> None:
+    assert rewritten(tmp_path) == BODY
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import pathlib
+
+import pytest
+from conftest import FakeBrowserSession, LocalServer, LocalSite
+
+import lovelysunday_capture as capture
+
+PAGES = {"/": "home", "/a": "a", "/b": "b"}
+
+
+class RecordingSession(FakeBrowserSession):
+    opened: list[tuple[str, str]] = []
+
+    def run(self, args: list[str], timeout: int = 180) -> str:
+        if args[:1] == ["open"]:
+            self.opened.append((self.session.split("-")[0], args[1]))
+        return super().run(args, timeout)
+
+
+@pytest.fixture
+def site(local_site: LocalSite, local_server: LocalServer, monkeypatch: pytest.MonkeyPatch) -> LocalSite:
+    for path, name in PAGES.items():
+        local_site.page(
+            path,
+            f'<html><head><title>{name}</title><link rel="canonical" href="{local_site.base}{path}">'
+            f'<link rel="stylesheet" href="/site.css"></head>'
+            f'<body><main><h1>{name}</h1><img src="/img/{name}.png"></main></body></html>',
+        )
+        local_server.serve(f"/img/{name}.png", name.encode("ascii"), {"Content-Type": "image/png"})
+    local_server.serve("/site.css", b"main { margin: 0; }", {"Content-Type": "text/css"})
+    monkeypatch.setattr(RecordingSession, "opened", [])
+    monkeypatch.setitem(capture.BROWSER_DRIVERS, "fake", RecordingSession)
+    return local_site
+
+
+def interrupt(journal: pathlib.Path, keep: set[str]) -> None:
+    # What a run killed mid-way leaves behind: some finished records, then a line cut short.
+    records = [json.loads(line) for line in journal.read_text(encoding="utf-8").splitlines()]
+    kept = [record for record in records if record["url"] in keep]
+    torn = next(record for record in records if record["url"] not in keep)
+    lines = [json.dumps(record) + "\n" for record in kept]
+    journal.write_text("".join(lines) + json.dumps(torn)[:40], encoding="utf-8")
+
+
+def test_resume_skips_what_the_journal_finished(
+    tmp_path: pathlib.Path, site: LocalSite, local_server: LocalServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    output = tmp_path / "capture"
+    site.capture(monkeypatch, output)
+    base = site.base
+    journal = output / capture.JOURNAL_DIR
+    interrupt(journal / "crawl_results.jsonl", keep={f"{base}/", f"{base}/a"})
+    interrupt(journal / "assets_manifest.jsonl", keep={f"{base}/img/home.png", f"{base}/site.css"})
+    interrupt(journal / "verification_live_snapshots.jsonl", keep={f"{base}/"})
+    RecordingSession.opened.clear()
+    local_server.requests.clear()
+
+    site.capture(monkeypatch, output, "--resume")
+
+    opened: dict[str, list[str]] = {}
+    for kind, url in RecordingSession.opened:
+        opened.setdefault(kind, []).append(url.removeprefix(base))
+    assert sorted(opened["agent"]) == ["/b"]
+    assert sorted(opened["verify"]) == ["/a", "/b"]
+    fetched = sorted(request.path for request in local_server.requests if request.path.startswith(("/img/", "/site.css")))
+    assert fetched == ["/img/a.png", "/img/b.png"]
+
+    # The resumed run's manifests cover everything, as an uninterrupted run's would.
+    summary = json.loads((output / "manifests" / "summary.json").read_text(encoding="utf-8"))
+    assert summary["crawl"]["success"] == 3
+    assert summary["incremental"]["resumed"] == 2
+    crawl = json.loads((output / "manifests" / "crawl_results.json").read_text(encoding="utf-8"))
+    assert sorted(record["url"].removeprefix(base) for record in crawl["pages"]) == sorted(PAGES)
+    assets = json.loads((output / "manifests" / "assets_manifest.json").read_text(encoding="utf-8"))
+    assert {record["status"] for record in assets["assets"]} == {"success"}
+    assert len(assets["assets"]) == 4
+
+
+def test_journal_tolerates_a_torn_last_line(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "crawl_results.jsonl"
+    path.write_text('{"url": "https://www.lovelysunday.co/", "status": "success"}\n{"url": "https://www.lovely', encoding="utf-8")
+    journal = capture.RecordJournal(path, resume=True)
+    try:
+        assert list(journal.load()) == ["https://www.lovelysunday.co/"]
+        journal.append({"url": "https://www.lovelysunday.co/about", "status": "success"})
+        # The cut line was terminated first, so the new record is whole on its own line.
+        assert list(journal.load()) == ["https://www.lovelysunday.co/", "https://www.lovelysunday.co/about"]
+        journal.append({"url": "https://www.lovelysunday.co/", "status": "error"})
+        assert journal.load()["https://www.lovelysunday.co/"]["status"] == "error"
+    finally:
+        journal.close()
+    assert path.read_text(encoding="utf-8").splitlines()[1] == '{"url": "https://www.lovely'
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+
+import pytest
+
+import capture_screenshots
+import fake_agent_browser
+
+URL = "https://www.lovelysunday.co/about"
+
+
+def write_capture(root: pathlib.Path) -> None:
+    for viewport in ("desktop", "mobile"):
+        path = root / "screenshots" / viewport / "about.png"
+        path.parent.mkdir(parents=True)
+        path.write_bytes(fake_agent_browser.tiny_png(4, 3))
+    record = {
+        "url": URL,
+        "status": "success",
+        "jsonFile": "page_json/about.json",
+        "desktopScreenshot": "screenshots/desktop/about.png",
+        "mobileScreenshot": "screenshots/mobile/about.png",
+    }
+    page = {"url": URL, "_capture": {key: value for key, value in record.items() if key.endswith("Screenshot")}}
+    (root / "page_json").mkdir()
+    (root / "page_json" / "about.json").write_text(json.dumps(page))
+    (root / "manifests").mkdir()
+    (root / "manifests" / "crawl_results.json").write_text(json.dumps({"pages": [record]}))
+
+
+def references(root: pathlib.Path) -> tuple[dict[str, str], dict[str, str]]:
+    [record] = json.loads((root / "manifests" / "crawl_results.json").read_text())["pages"]
+    page = json.loads((root / "page_json" / "about.json").read_text())
+    fields = ("desktopScreenshot", "mobileScreenshot")
+    return {field: record[field] for field in fields}, {field: page["_capture"][field] for field in fields}
+
+
+def test_update_screenshot_references_rewrites_records_and_page_json(tmp_path: pathlib.Path) -> None:
+    write_capture(tmp_path)
+    capture_screenshots.update_screenshot_references(
+        tmp_path, {"screenshots/desktop/about.png": "screenshots/desktop/about.webp"}
+    )
+    record, page = references(tmp_path)
+    assert record == page == {
+        "desktopScreenshot": "screenshots/desktop/about.webp",
+        "mobileScreenshot": "screenshots/mobile/about.png",
+    }
+
+
+def test_webp_optimize_replaces_screenshots_and_references(tmp_path: pathlib.Path) -> None:
+    pil = pytest.importorskip("PIL.features")
+    if not pil.check("webp"):
+        pytest.skip("Pillow built without WebP")
+    write_capture(tmp_path)
+    args = argparse.Namespace(
+        capture=str(tmp_path), format="webp", webp_quality=100, thumb_width=2, thumb_max_height=2, workers=1
+    )
+    summary = capture_screenshots.optimize(args)
+    assert summary["screenshots"] == 2
+    assert summary["unique"] == 1
+    record, page = references(tmp_path)
+    assert record == page == {
+        "desktopScreenshot": "screenshots/desktop/about.webp",
+        "mobileScreenshot": "screenshots/mobile/about.webp",
+    }
+    assert not list(tmp_path.glob("screenshots/*/about.png"))
+
+
+def test_region_deltas_scores_changed_blocks() -> None:
+    np = pytest.importorskip("numpy")
+    a = np.zeros((4, 4, 3), dtype=np.uint8)
+    b = a.copy()
+    b[:2, :2] = 100
+    blocks, mean_delta = capture_screenshots.region_deltas(a, b, 2)
+    assert blocks.tolist() == [[100.0, 0.0], [0.0, 0.0]]
+    assert mean_delta == 25.0
+
+
+def test_region_deltas_counts_missing_pixels_as_changed() -> None:
+    np = pytest.importorskip("numpy")
+    a = np.zeros((4, 4, 3), dtype=np.uint8)
+    b = np.zeros((4, 6, 3), dtype=np.uint8)
+    blocks, mean_delta = capture_screenshots.region_deltas(a, b, 4)
+    # The second block is the 4x2 strip only b has.
+    assert blocks.tolist() == [[0.0, 255.0]]
+    assert mean_delta == pytest.approx(255 * 8 / 24)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import io
+import pathlib
+import urllib.parse
+
+from conftest import LocalServer
+
+import capture_bench
+import lovelysunday_capture as capture
+
+CHECKED_IN_SITEMAP = pathlib.Path(__file__).resolve().parents[2] / "manifests" / "sitemap.xml"
+
+
+def test_checked_in_sitemap_lists_only_site_pages() -> None:
+    with CHECKED_IN_SITEMAP.open("rb") as stream:
+        entries = list(capture.iter_sitemap(stream))
+    assert len(entries) == 47
+    for kind, entry in entries:
+        assert kind == "url"
+        assert urllib.parse.urlparse(entry.url).netloc == "www.lovelysunday.co", entry.url
+
+
+def test_image_extension_does_not_replace_page_fields() -> None:
+    document = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+  <url>
+    <loc>https://www.lovelysunday.co/about</loc>
+    <lastmod>2020-05-10</lastmod>
+    <image:image><image:loc>https://images.squarespace-cdn.com/a.jpg</image:loc></image:image>
+    <priority>0.75</priority>
+  </url>
+</urlset>"""
+    assert list(capture.iter_sitemap(io.BytesIO(document))) == [
+        ("url", capture.SitemapEntry("https://www.lovelysunday.co/about", "2020-05-10", 0.75))
+    ]
+
+
+def test_sitemap_index_over_gzipped_children(tmp_path: pathlib.Path, local_server: LocalServer) -> None:
+    # The site capture_bench.py generates with --sitemap-shards: an index over .xml.gz urlsets served as-is.
+    site = tmp_path / "site"
+    site.mkdir()
+    base = local_server.url("")
+    shape = argparse.Namespace(pages=7, assets=0, media=0, asset_bytes=0, media_bytes=0, sitemap_shards=3)
+    capture_bench.generate_site(site, base, shape)
+    for path in sorted(site.glob("sitemap*")):
+        content_type = "application/gzip" if path.suffix == ".gz" else "text/xml"
+        local_server.serve(f"/{path.name}", path.read_bytes(), {"Content-Type": content_type})
+    local_server.serve("/sitemap-missing.xml.gz", b"", status=404)
+    index = (site / "sitemap.xml").read_text(encoding="utf-8")
+    index = index.replace("</sitemapindex>", f"<sitemap><loc>{base}/sitemap-missing.xml.gz</loc></sitemap></sitemapindex>")
+    local_server.serve("/sitemap.xml", index.encode("utf-8"), {"Content-Type": "text/xml"})
+
+    entries, documents = capture.collect_sitemap_entries(local_server.url("/sitemap.xml"), tmp_path / "manifests", workers=2)
+
+    pages = [f"{base}/"] + [f"{base}/pages/page-{index:05d}" for index in range(1, 7)]
+    assert sorted(entries) == sorted(pages)
+    assert entries[f"{base}/"] == capture.SitemapEntry(f"{base}/", "2026-01-01", 1.0)
+    assert entries[f"{base}/pages/page-00001"].priority == 0.5
+    assert [(document["depth"], document["kind"], document["entries"]) for document in documents] == [
+        (0, "index", 4),
+        (1, "urlset", 3),
+        (1, "urlset", 2),
+        (1, "urlset", 2),
+        (1, None, 0),
+    ]
+    # A failing child is reported, not raised.
+    assert "404" in documents[-1]["error"]
+    # Children are saved decompressed, under their name without .gz.
+    for shard in range(3):
+        saved = tmp_path / "manifests" / "sitemaps" / f"sitemap-{shard}.xml"
+        assert saved.read_bytes() == gzip.decompress((site / f"sitemap-{shard}.xml.gz").read_bytes())
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import threading
+
+import pytest
+
+import lovelysunday_capture as capture
+
+
+def record_ms(tracer: capture.Tracer, name: str, durations_ms: list[float]) -> None:
+    for duration in durations_ms:
+        tracer.record(name, 10.0, 10.0 + duration / 1000)
+
+
+@pytest.mark.parametrize(
+    "durations, expected",
+    [
+        # Nearest rank: the smallest sample with at least pct% of the samples at or below it.
+        (list(range(1, 101)), (50, 95, 99, 100)),
+        (list(range(10, 0, -1)), (5, 10, 10, 10)),
+        ([1, 2, 3, 4, 5, 6, 7], (4, 7, 7, 7)),
+        ([3, 1000], (3, 1000, 1000, 1000)),
+        ([42], (42, 42, 42, 42)),
+    ],
+)
+def test_percentiles_on_known_samples(durations: list[float], expected: tuple[float, float, float, float]) -> None:
+    tracer = capture.Tracer()
+    record_ms(tracer, "browser.open", durations)
+    stats = tracer.stats()["browser.open"]
+    assert (stats["p50Ms"], stats["p95Ms"], stats["p99Ms"], stats["maxMs"]) == pytest.approx(expected)
+    assert stats["count"] == len(durations)
+    assert stats["totalMs"] == pytest.approx(sum(durations))
+
+
+def test_stats_are_kept_per_operation() -> None:
+    tracer = capture.Tracer()
+    record_ms(tracer, "http.get", [5, 15])
+    record_ms(tracer, "browser.open", [100])
+    stats = tracer.stats()
+    assert list(stats) == ["browser.open", "http.get"]
+    assert stats["http.get"]["totalMs"] == 20
+    assert stats["browser.open"]["maxMs"] == 100
+
+
+def test_chrome_trace_output(tmp_path: pathlib.Path) -> None:
+    tracer = capture.Tracer(keep_events=True)
+    tracer.record("browser.open", tracer.origin + 0.5, tracer.origin + 0.75, url="https://www.lovelysunday.co/", worker=None)
+
+    def worker() -> None:
+        with tracer.span("page.capture"):
+            pass
+
+    thread = threading.Thread(target=worker, name="crawl-worker-1")
+    thread.start()
+    thread.join()
+    path = tmp_path / "trace" / "trace.json"
+    tracer.write_chrome_trace(path)
+
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    assert trace["displayTimeUnit"] == "ms"
+    metadata = [event for event in trace["traceEvents"] if event["ph"] == "M"]
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert trace["traceEvents"] == metadata + spans
+    assert {event["args"]["name"] for event in metadata} == {threading.current_thread().name, "crawl-worker-1"}
+    assert all(event["name"] == "thread_name" and event["pid"] == os.getpid() for event in metadata)
+
+    open_event, page_event = spans
+    # Complete ("X") events in microseconds from the tracer's origin; None arguments are dropped.
+    assert open_event == {
+        "name": "browser.open",
+        "cat": "browser",
+        "ph": "X",
+        "ts": 500000.0,
+        "dur": 250000.0,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": {"url": "https://www.lovelysunday.co/"},
+    }
+    assert page_event["cat"] == "page"
+    assert page_event["tid"] == thread.ident
+    assert page_event["ts"] >= 0 and page_event["dur"] >= 0
+
+
+def test_events_are_not_kept_without_a_trace_file(tmp_path: pathlib.Path) -> None:
+    tracer = capture.Tracer()
+    with tracer.span("page.capture"):
+        pass
+    tracer.write_chrome_trace(tmp_path / "trace.json")
+    assert json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"] == []
+    assert tracer.stats()["page.capture"]["count"] == 1
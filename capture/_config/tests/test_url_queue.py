@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import time
+
+import pytest
+
+import lovelysunday_capture as capture
+
+SITE = "https://www.lovelysunday.co"
+
+
+def drain(queue: capture.UrlQueue) -> list[str]:
+    urls = []
+    while (url := queue.get()) is not None:
+        urls.append(url)
+        queue.mark_done()
+    return urls
+
+
+def test_page_weights_come_from_the_previous_crawl(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "crawl_results.json"
+    pages = [
+        {"url": f"{SITE}/journal", "durationMs": 900, "counts": {"resources": 20, "images": 9}},
+        {"url": f"{SITE}/about", "durationMs": 300, "counts": {"resources": 4, "images": 5}},
+        # From before durations were kept: estimated at the ms per resource + image seen above.
+        {"url": f"{SITE}/shop", "counts": {"resources": 10, "images": 9}},
+        {"url": f"{SITE}/"},
+        {"status": "error"},
+    ]
+    path.write_text(json.dumps({"pages": pages}), encoding="utf-8")
+    ms_per_unit = (900 + 300) / (30 + 10)
+    assert capture.load_page_weights(path) == pytest.approx(
+        {
+            f"{SITE}/journal": 900.0,
+            f"{SITE}/about": 300.0,
+            f"{SITE}/shop": 20 * ms_per_unit,
+            f"{SITE}/": ms_per_unit,
+        }
+    )
+
+
+def test_page_weights_without_a_usable_previous_crawl(tmp_path: pathlib.Path) -> None:
+    assert capture.load_page_weights(tmp_path / "missing.json") == {}
+    (tmp_path / "broken.json").write_text('{"pages": [', encoding="utf-8")
+    assert capture.load_page_weights(tmp_path / "broken.json") == {}
+
+
+def test_heaviest_pages_are_handed_out_first() -> None:
+    weights = {f"{SITE}/journal": 900.0, f"{SITE}/about": 300.0, f"{SITE}/shop": 600.0}
+    urls = [f"{SITE}/about", f"{SITE}/new", f"{SITE}/journal", f"{SITE}/shop", f"{SITE}/also-new"]
+    queue = capture.UrlQueue(urls, weights)
+    # Pages with no previous weight get the average of the known ones (600) and tie on URL order.
+    assert drain(queue) == [
+        f"{SITE}/journal",
+        f"{SITE}/also-new",
+        f"{SITE}/new",
+        f"{SITE}/shop",
+        f"{SITE}/about",
+    ]
+    assert queue.completed == queue.total == 5
+
+
+def test_put_urls_take_their_place_by_weight() -> None:
+    queue = capture.UrlQueue([f"{SITE}/about"], {f"{SITE}/about": 300.0, f"{SITE}/journal": 900.0}, closed=False)
+    queue.put(f"{SITE}/journal")
+    queue.close()
+    assert drain(queue) == [f"{SITE}/journal", f"{SITE}/about"]
+
+
+def test_retried_url_waits_out_its_backoff() -> None:
+    queue = capture.UrlQueue([f"{SITE}/journal", f"{SITE}/about"], {f"{SITE}/journal": 900.0, f"{SITE}/about": 300.0})
+    assert queue.get() == f"{SITE}/journal"
+    queue.retry(f"{SITE}/journal", 0.2)
+    # The failed page does not jump the queue while it backs off...
+    assert queue.get() == f"{SITE}/about"
+    queue.mark_done()
+    # ...and the queue does not close while it is pending.
+    started = time.monotonic()
+    assert queue.get() == f"{SITE}/journal"
+    assert time.monotonic() - started >= 0.15
+    queue.mark_done()
+    assert queue.get() is None
+    assert queue.completed == queue.total == 2
+
+
+def test_page_failures_back_off_exponentially(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(capture, "PAGE_RETRY_BACKOFF_SECONDS", 2.0)
+    url = f"{SITE}/journal"
+    queue = capture.UrlQueue([url])
+    error = capture.BrowserCommandError("eval failed", ["eval", "1"])
+    delays = []
+    for attempt in (1, 2, 3):
+        assert queue.get() == url
+        item = {"url": url, "attempts": queue.start_attempt(url)}
+        assert item["attempts"] == attempt
+        assert capture.handle_page_failure(queue, item, error, "agent-1", {}, retries=3)
+        [(ready_at, _)] = queue._delayed
+        delays.append(ready_at - time.monotonic())
+        # Skip the wait: make the retry due now.
+        queue._delayed = [(0.0, url)]
+    assert delays == pytest.approx([2.0, 4.0, 8.0], abs=0.1)
+    assert queue.get() == url
+    item = {"url": url, "attempts": queue.start_attempt(url)}
+    assert not capture.handle_page_failure(queue, item, error, "agent-1", {}, retries=3)
+    assert item["failureClass"] == "eval"
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import gzip
+import json
+import pathlib
+import subprocess
+import sys
+from typing import Any
+
+from conftest import LocalServer
+
+import lovelysunday_capture as capture
+
+CONFIG_DIR = pathlib.Path(__file__).resolve().parents[1]
+BODY = b"body { background: url(/sunflower.png); }\n" * 200
+PAGE_URL = "https://www.lovelysunday.co/journal/brunch"
+HTML = "<!doctype html><title>Brunch</title><h1>Brunch</h1>"
+
+
+def write_capture(root: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> dict[str, Any]:
+    local_server.serve(
+        "/site.css",
+        gzip.compress(BODY),
+        {"Content-Type": "text/css; charset=utf-8", "Content-Encoding": "gzip", "ETag": '"css-1"', "X-Served-By": "local"},
+    )
+    warc = capture.WarcWriter(root / "warc", "capture")
+    try:
+        record = capture.download_one_asset(
+            local_server.url("/site.css"), root / "assets" / "downloads", root, client=client, warc=warc
+        )
+        warc.write_resource(PAGE_URL, HTML.encode("utf-8"), "text/html; charset=utf-8")
+    finally:
+        warc.close()
+    return record
+
+
+def test_exchange_round_trips_through_the_index(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    record = write_capture(tmp_path, local_server, client)
+    url = local_server.url("/site.css")
+    assert record["status"] == "success"
+    assert "file" not in record
+    assert not list((tmp_path / "assets").rglob("*.part"))
+
+    index_lines = (tmp_path / "warc" / "index.cdxj").read_text(encoding="utf-8").splitlines()
+    assert index_lines == sorted(index_lines)
+    assert not (tmp_path / "warc" / capture.WARC_INDEX_JOURNAL).exists()
+
+    archive = capture.WarcArchive(tmp_path / "warc")
+    assert archive.urls() == sorted([url, PAGE_URL])
+    entry = archive.index[url]
+    assert (entry["mime"], entry["status"], entry["sha256"]) == ("text/css", 200, record["sha256"])
+    assert {key: entry[key] for key in ("filename", "offset", "length")} == record["warc"]
+
+    response = archive.get(url)
+    assert response is not None
+    assert response.headers["WARC-Type"] == "response"
+    assert response.headers["WARC-Target-URI"] == url
+    assert response.http_status == 200
+    assert response.body == BODY
+    headers = dict(response.http_headers)
+    assert headers["Content-Type"] == "text/css; charset=utf-8"
+    assert headers["ETag"] == '"css-1"'
+    assert headers["X-Served-By"] == "local"
+    # The body is stored decoded, so the headers must describe the decoded bytes.
+    assert "Content-Encoding" not in headers
+    assert headers["Content-Length"] == str(len(BODY))
+
+    page = archive.get(PAGE_URL)
+    assert page is not None
+    assert page.headers["WARC-Type"] == "resource"
+    assert (page.http_status, page.http_headers, page.body) == (None, [], HTML.encode("utf-8"))
+    assert archive.get(PAGE_URL + "/missing") is None
+
+
+def test_records_of_an_interrupted_run_are_read_from_the_journal(tmp_path: pathlib.Path) -> None:
+    warc = capture.WarcWriter(tmp_path, "capture")
+    warc.write_resource(PAGE_URL, HTML.encode("utf-8"), "text/html")
+    # No close(): index.cdxj is never written, and the journal ends in a torn line.
+    with (tmp_path / capture.WARC_INDEX_JOURNAL).open("a", encoding="utf-8") as journal:
+        journal.write('co,lovelysunday)/about 2026 {"url": "https://www.lovely')
+    assert not (tmp_path / "index.cdxj").exists()
+
+    archive = capture.WarcArchive(tmp_path)
+    assert archive.urls() == [PAGE_URL]
+    page = archive.get(PAGE_URL)
+    assert page is not None and page.body == HTML.encode("utf-8")
+
+
+def test_capture_warc_get(tmp_path: pathlib.Path, local_server: LocalServer, client: capture.HttpClient) -> None:
+    write_capture(tmp_path, local_server, client)
+    url = local_server.url("/site.css")
+
+    def run(*args: str) -> subprocess.CompletedProcess[bytes]:
+        return subprocess.run(
+            [sys.executable, str(CONFIG_DIR / "capture_warc.py"), str(tmp_path), *args], capture_output=True, cwd=CONFIG_DIR
+        )
+
+    assert run("get", url).stdout == BODY
+    headers = json.loads(run("get", url, "--headers").stdout)
+    assert headers["status"] == 200
+    assert ["ETag", '"css-1"'] in headers["http"]
+    assert headers["warc"]["WARC-Target-URI"] == url
+
+    run("get", PAGE_URL, "--output", str(tmp_path / "page.html"))
+    assert (tmp_path / "page.html").read_text(encoding="utf-8") == HTML
+
+    listing = run("list").stdout.decode().splitlines()
+    assert [line.split("\t")[-1] for line in listing] == sorted([url, PAGE_URL])
+
+    missing = run("get", PAGE_URL + "/missing")
+    assert missing.returncode == 1
+    assert b"not in archive" in missing.stderr